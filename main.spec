@@ -5,7 +5,7 @@ a = Analysis(
     ['src\\main.py'],
     pathex=[],
     binaries=[],
-    datas=[('excel_templates', 'excel_templates')],
+    datas=[('excel_templates', 'excel_templates'), ('assets', 'assets')],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
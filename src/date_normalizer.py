@@ -0,0 +1,206 @@
+"""
+Shared date normalization for the export converter and Express data entry.
+
+Exports usually carry only a handful of distinct invoice dates, so every value
+is parsed once per unique string (memoized across calls) and the common shapes
+are handled column-wise without strptime / pd.to_datetime:
+
+  layout "ymd"  (tools/export_watcher_converter.py::parse_yyyymmdd_to_ddmmyy)
+      yyyymmdd (incl. Buddhist-era years like 25681107) -> "dd/mm/yy"
+  layout "dmy"  (src/express_excel_entry.py::norm_date_to_ddmmyy)
+      ddmmyy / ddmmyyyy with or without separators (incl. Buddhist-era) -> "ddmmyy"
+
+Anything else goes through the original per-value logic (pandas guessing),
+so results are identical to the scalar functions. Each normalizer counts how
+many values took each path: empty / fast / fallback / passthrough. The cache is
+shared by all callers; pass your own Counter as `stats` to count one file only
+(converter workers normalize several files at once).
+"""
+
+import threading
+from collections import Counter
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+PATHS = ("empty", "fast", "fallback", "passthrough")
+
+_DAYS_IN_MONTH = np.array([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
+
+def _valid_ymd(y: np.ndarray, m: np.ndarray, d: np.ndarray) -> np.ndarray:
+    """Calendar check with the same (proleptic Gregorian) rules strptime applies to the literal year."""
+    ok = (y >= 1) & (m >= 1) & (m <= 12) & (d >= 1)
+    leap = ((y % 4 == 0) & (y % 100 != 0)) | (y % 400 == 0)
+    dim = _DAYS_IN_MONTH[np.clip(m, 0, 12)] + ((m == 2) & leap)
+    return ok & (d <= dim)
+
+
+# =========================
+# Slow paths (original per-value logic)
+# =========================
+def _slow_ymd(s: str):
+    """Returns (value, path) for a stripped, non-empty string."""
+    from datetime import datetime
+    if s.isdigit() and len(s) == 8:
+        try:
+            return datetime.strptime(s, "%Y%m%d").strftime("%d/%m/%y"), "fallback"
+        except Exception:
+            pass
+    try:
+        dt = pd.to_datetime(s, errors="coerce")
+        if not pd.isna(dt):
+            return dt.strftime("%d/%m/%y"), "fallback"
+    except Exception:
+        pass
+    return s, "passthrough"
+
+
+def _slow_dmy(s: str):
+    """Returns (value, path) for a stripped, non-empty string."""
+    d = ''.join(ch for ch in s if ch.isdigit())
+    if len(d) == 6:
+        return d, "fallback"
+    if len(d) == 8:
+        return d[:4] + d[-2:], "fallback"
+    try:
+        dt = pd.to_datetime(s, dayfirst=True, errors='coerce')
+        if pd.isna(dt):
+            dt = pd.to_datetime(s, errors='coerce')
+        if not pd.isna(dt):
+            return f"{dt.day:02d}{dt.month:02d}{dt.year % 100:02d}", "fallback"
+    except Exception:
+        pass
+    return s.strip(), "passthrough"
+
+
+# =========================
+# Fast paths (column-wise over unique strings)
+# =========================
+def _fast_ymd(u: pd.Series):
+    """Returns (mask, values) for unique stripped strings that are valid ASCII yyyymmdd."""
+    mask = u.str.fullmatch(r"[0-9]{8}").to_numpy(dtype=bool)
+    out = np.empty(len(u), dtype=object)
+    if mask.any():
+        cand = u[mask]
+        y = cand.str[:4].astype(np.int64).to_numpy()
+        m = cand.str[4:6].astype(np.int64).to_numpy()
+        d = cand.str[6:8].astype(np.int64).to_numpy()
+        valid = _valid_ymd(y, m, d)
+        idx = np.flatnonzero(mask)
+        mask[idx[~valid]] = False
+        cand = cand[valid]
+        out[idx[valid]] = (cand.str[6:8] + "/" + cand.str[4:6] + "/" + cand.str[2:4]).to_numpy(dtype=object)
+    return mask, out
+
+
+def _fast_dmy(u: pd.Series):
+    """Returns (mask, values) for unique stripped ASCII strings with 6 or 8 digits."""
+    ascii_mask = u.map(str.isascii).to_numpy(dtype=bool)
+    digits = u.str.replace(r"[^0-9]", "", regex=True)
+    lengths = digits.str.len().to_numpy()
+    mask = ascii_mask & ((lengths == 6) | (lengths == 8))
+    out = np.empty(len(u), dtype=object)
+    six = mask & (lengths == 6)
+    eight = mask & (lengths == 8)
+    out[six] = digits[six].to_numpy(dtype=object)
+    out[eight] = (digits[eight].str[:4] + digits[eight].str[-2:]).to_numpy(dtype=object)
+    return mask, out
+
+
+_LAYOUTS = {
+    "ymd": (_fast_ymd, _slow_ymd),
+    "dmy": (_fast_dmy, _slow_dmy),
+}
+
+
+class DateNormalizer:
+    """
+    Memoized date normalizer for one input layout ("ymd" or "dmy").
+
+    normalize(values) works on a whole column, normalize_one(value) on a single
+    cell; both share the cache. Per-path counts go to `stats` when given, else to
+    the normalizer's own (process-wide) `self.stats`.
+    """
+
+    def __init__(self, layout: str, max_cache: int = 50_000):
+        if layout not in _LAYOUTS:
+            raise ValueError(f"Unknown date layout: {layout!r} (expected one of {sorted(_LAYOUTS)})")
+        self.layout = layout
+        self.max_cache = max_cache
+        self._fast, self._slow = _LAYOUTS[layout]
+        self._cache: dict[str, tuple[str, str]] = {}
+        self._lock = threading.Lock()   # converter workers share one normalizer
+        self.stats: Counter = Counter()
+
+    # ---- keys ----
+    def _key(self, value) -> str:
+        if self.layout == "dmy":
+            return (value or "").strip()
+        return str(value).strip()
+
+    # ---- parsing ----
+    def _parse_uniques(self, keys: list[str], stats: Counter) -> None:
+        """Parse keys not in cache yet and store (value, path) for each."""
+        if len(self._cache) + len(keys) > self.max_cache:
+            self._cache.clear()
+        u = pd.Series(keys, dtype=object)
+        mask, fast_out = self._fast(u)
+        for i, key in enumerate(keys):
+            if not key:
+                self._cache[key] = ("", "empty")
+            elif mask[i]:
+                self._cache[key] = (fast_out[i], "fast")
+            else:
+                self._cache[key] = self._slow(key)
+        stats["unique_parsed"] += len(keys)
+
+    def _keys(self, values: pd.Series) -> pd.Series:
+        """Column-wise _key()."""
+        if self.layout == "dmy":
+            values = values.where(values.to_numpy(dtype=object).astype(bool), "")
+        return values.astype(str).str.strip()
+
+    def normalize(self, values: Iterable, stats: Counter = None) -> pd.Series:
+        """Normalize a column; returns a Series aligned with `values` (index kept if it is a Series)."""
+        stats = self.stats if stats is None else stats
+        s = values if isinstance(values, pd.Series) else pd.Series(list(values), dtype=object)
+        if len(s) == 0:
+            return pd.Series([], index=s.index, dtype=object)
+        codes, uniques = pd.factorize(self._keys(s.astype(object)))
+        uniques = list(uniques)
+        results = np.empty(len(uniques), dtype=object)
+        counts = np.bincount(codes, minlength=len(uniques))
+        with self._lock:
+            missing = [k for k in uniques if k not in self._cache]
+            if missing:
+                self._parse_uniques(missing, stats)
+            for i, k in enumerate(uniques):
+                value, path = self._cache[k]
+                results[i] = value
+                stats[path] += int(counts[i])
+            stats["total"] += len(codes)
+        return pd.Series(results[codes], index=s.index, dtype=object)
+
+    def normalize_one(self, value, stats: Counter = None) -> str:
+        stats = self.stats if stats is None else stats
+        key = self._key(value)
+        with self._lock:
+            hit = self._cache.get(key)
+            if hit is None:
+                self._parse_uniques([key], stats)
+                hit = self._cache[key]
+            stats[hit[1]] += 1
+            stats["total"] += 1
+        return hit[0]
+
+    # ---- reporting ----
+    def report(self, stats: Counter = None) -> str:
+        stats = self.stats if stats is None else stats
+        parts = " ".join(f"{p}={stats.get(p, 0)}" for p in PATHS)
+        return (f"[DATES:{self.layout}] total={stats.get('total', 0)} "
+                f"unique_parsed={stats.get('unique_parsed', 0)} {parts}")
+
+    def reset_stats(self) -> None:
+        self.stats.clear()
@@ -0,0 +1,240 @@
+"""
+Find known Express UI elements ("anchors") on screen, to confirm each automation step.
+
+Anchor images live in assets/anchors/<name>.png (cropped screenshots, any colour):
+  login                 the login window (username / password fields)
+  company_dialog        the company / year selection dialog
+  credit_purchase_form  the Credit Purchase "add" form
+A missing image is not an error: confirm() for it returns True without looking (logged once),
+so the workflow behaves as before until the images are added.
+
+Lookups are cheap because
+  - images are loaded once, converted to grayscale and pre-scaled to SCALES (display scaling
+    differs between machines), plus a half-size copy of each for the coarse full-screen pass;
+  - the last hit of every anchor is remembered: the next lookup first searches a small region
+    around it at the scale that matched, then a wider region, and only then the whole screen
+    (at half resolution, refined around the best spot).
+Every lookup is timed (span anchor.<name>); report() prints count / p50 / p95 per anchor.
+Screen frames come from express_screen (same capture and fallback rules).
+"""
+
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+import express_screen
+import express_timing
+
+ANCHOR_DIR = Path(__file__).resolve().parents[1] / "assets" / "anchors"
+SCALES = (1.0, 1.25, 1.5, 0.8, 1.75, 2.0)   # Windows display scaling 100-200%
+THRESHOLD = 0.85        # TM_CCOEFF_NORMED score that counts as found
+NEAR_PAD = 48           # px around the last hit searched first
+WIDE_PAD_FACTOR = 3     # then the last hit's size x this on every side
+COARSE = 0.5            # full-screen pass resolution
+POLL_INTERVAL = 0.1
+
+
+class AnchorLocator:
+    def __init__(self, anchor_dir: Path = ANCHOR_DIR, scales=SCALES, threshold: float = THRESHOLD):
+        import cv2  # opencv-python-headless (requirements.txt)
+
+        self._cv2 = cv2
+        self.anchor_dir = Path(anchor_dir)
+        self.scales = tuple(scales)
+        self.threshold = threshold
+        self.templates = {}     # name -> [(scale, full-size gray, coarse gray), ...]
+        self.last_hit = {}      # name -> {"box": (x, y, w, h), "scale": s}
+        self.latency = {}       # name -> [ms, ...]
+        self._skipped_logged = set()
+        self._lock = threading.Lock()
+        self._load()
+
+    # ---- loading ----
+    def _read_gray(self, path: Path) -> Optional[np.ndarray]:
+        # np.fromfile + imdecode: cv2.imread cannot open non-ASCII paths on Windows
+        img = self._cv2.imdecode(np.fromfile(str(path), dtype=np.uint8), self._cv2.IMREAD_GRAYSCALE)
+        return None if img is None else img.astype(np.float32)
+
+    def _load(self) -> None:
+        paths = sorted(self.anchor_dir.glob("*.png")) if self.anchor_dir.is_dir() else []
+        if not paths:
+            print(f"[ANCHOR] no anchor images in {self.anchor_dir}; step confirmation is skipped")
+            return
+        t0 = time.perf_counter()
+        for path in paths:
+            gray = self._read_gray(path)
+            if gray is None:
+                print(f"[WARN] Cannot read anchor image {path.name}; skipped")
+                continue
+            variants = []
+            for s in self.scales:
+                full = self._resize(gray, s)
+                coarse = self._resize(gray, s * COARSE)
+                if min(full.shape) >= 4 and min(coarse.shape) >= 4:
+                    variants.append((s, full, coarse))
+            self.templates[path.stem] = variants
+        print(f"[ANCHOR] loaded {len(self.templates)} anchors x {len(self.scales)} scales "
+              f"in {(time.perf_counter() - t0) * 1000:.0f} ms: {', '.join(self.templates)}")
+
+    def _resize(self, gray: np.ndarray, factor: float) -> np.ndarray:
+        if factor == 1.0:
+            return gray
+        h, w = gray.shape
+        size = (max(1, round(w * factor)), max(1, round(h * factor)))
+        interp = self._cv2.INTER_AREA if factor < 1.0 else self._cv2.INTER_LINEAR
+        return self._cv2.resize(gray, size, interpolation=interp)
+
+    def has(self, name: str) -> bool:
+        return bool(self.templates.get(name))
+
+    # ---- matching ----
+    def _best(self, gray: np.ndarray, variants) -> Optional[tuple]:
+        """Best (score, x, y, w, h, scale) of the variants inside `gray`; stops at the first hit."""
+        best = None
+        for scale, templ in variants:
+            th, tw = templ.shape
+            if gray.shape[0] < th or gray.shape[1] < tw:
+                continue
+            res = self._cv2.matchTemplate(gray, templ, self._cv2.TM_CCOEFF_NORMED)
+            _, score, _, (x, y) = self._cv2.minMaxLoc(res)
+            if best is None or score > best[0]:
+                best = (score, x, y, tw, th, scale)
+            if score >= self.threshold:
+                break
+        return best
+
+    def _grab(self, source, region) -> Optional[np.ndarray]:
+        try:
+            return express_screen.to_gray(source(region))
+        except Exception as e:
+            print(f"[WARN] Screen capture for anchor lookup failed: {e}")
+            return None
+
+    def _search_region(self, source, region, variants) -> Optional[tuple]:
+        gray = self._grab(source, region)
+        if gray is None:
+            return None
+        hit = self._best(gray, variants)
+        if hit is None:
+            return None
+        score, x, y, w, h, scale = hit
+        ox, oy = (region[0], region[1]) if region else (0, 0)
+        return score, ox + x, oy + y, w, h, scale
+
+    def _ordered(self, name: str, coarse: bool = False):
+        """Variants with the last matching scale first."""
+        last = self.last_hit.get(name, {}).get("scale")
+        variants = sorted(self.templates[name], key=lambda v: v[0] != last)
+        return [(s, c if coarse else f) for s, f, c in variants]
+
+    def _locate_once(self, name: str, source) -> Optional[dict]:
+        last = self.last_hit.get(name)
+        if last is not None:
+            x, y, w, h = last["box"]
+            for where, pad in (("near", NEAR_PAD), ("wide", WIDE_PAD_FACTOR * max(w, h))):
+                region = (max(0, x - pad), max(0, y - pad), w + 2 * pad, h + 2 * pad)
+                hit = self._search_region(source, region, self._ordered(name))
+                if hit is not None and hit[0] >= self.threshold:
+                    return self._found(name, hit, where)
+
+        # whole screen at COARSE resolution, then refine around the best spot at full size
+        gray = self._grab(source, None)
+        if gray is None:
+            return None
+        small = self._resize(gray, COARSE)
+        hit = self._best(small, self._ordered(name, coarse=True))
+        if hit is None:
+            return None
+        _, x, y, w, h, scale = hit
+        x, y, w, h = (int(round(v / COARSE)) for v in (x, y, w, h))
+        pad = NEAR_PAD
+        region = (max(0, x - pad), max(0, y - pad), w + 2 * pad, h + 2 * pad)
+        full = sorted(self._ordered(name), key=lambda v: v[0] != scale)
+        crop = gray[region[1]:region[1] + region[3], region[0]:region[0] + region[2]]
+        refined = self._best(crop, full)
+        if refined is not None and refined[0] >= self.threshold:
+            score, rx, ry, rw, rh, rs = refined
+            return self._found(name, (score, region[0] + rx, region[1] + ry, rw, rh, rs), "screen")
+        return None
+
+    def _found(self, name: str, hit: tuple, where: str) -> dict:
+        score, x, y, w, h, scale = hit
+        self.last_hit[name] = {"box": (int(x), int(y), int(w), int(h)), "scale": scale}
+        return {"name": name, "box": (int(x), int(y), int(w), int(h)), "score": float(score),
+                "scale": scale, "where": where}
+
+    # ---- public ----
+    def locate(self, name: str) -> Optional[dict]:
+        """One lookup: hit dict ({"box", "score", "scale", "where", "ms"}) or None."""
+        if not self.has(name):
+            return None
+        source = express_screen.default_source()
+        if source is None:
+            return None
+        with self._lock, express_timing.span(f"anchor.{name}"):
+            t0 = time.perf_counter()
+            hit = self._locate_once(name, source)
+            ms = (time.perf_counter() - t0) * 1000
+        self.latency.setdefault(name, []).append(ms)
+        if hit is not None:
+            hit["ms"] = ms
+        return hit
+
+    def wait(self, name: str, timeout: float, interval: float = POLL_INTERVAL) -> Optional[dict]:
+        deadline = time.monotonic() + timeout
+        while True:
+            hit = self.locate(name)
+            if hit is not None or time.monotonic() >= deadline:
+                return hit
+            time.sleep(interval)
+
+    def confirm(self, name: str, timeout: float = 5.0) -> bool:
+        """
+        True when the anchor shows up within `timeout`, or when it cannot be checked (no image,
+        no screen capture); False only when it was looked for and not found.
+        """
+        if not self.has(name) or express_screen.default_source() is None:
+            if name not in self._skipped_logged:
+                self._skipped_logged.add(name)
+                print(f"[ANCHOR] {name}: not checked (no {name}.png or no screen capture)")
+            return True
+        hit = self.wait(name, timeout)
+        if hit is None:
+            print(f"[WARN] Anchor {name} not found within {timeout:.1f}s")
+            return False
+        print(f"[ANCHOR] {name} at {hit['box'][:2]} score {hit['score']:.2f} scale {hit['scale']} "
+              f"({hit['where']}, {hit['ms']:.0f} ms)")
+        return True
+
+    def report(self) -> str:
+        lines = [f"{'anchor':<22} | {'n':>4} | {'p50 ms':>7} | {'p95 ms':>7}"]
+        for name, values in self.latency.items():
+            lines.append(f"{name:<22} | {len(values):>4} | {express_timing.percentile(values, 0.5):>7.1f} | "
+                         f"{express_timing.percentile(values, 0.95):>7.1f}")
+        return "\n".join(lines)
+
+
+_locator = None
+_locator_lock = threading.Lock()
+
+
+def get_locator() -> Optional[AnchorLocator]:
+    """Process-wide locator (templates loaded once); None without opencv."""
+    global _locator
+    with _locator_lock:
+        if _locator is None:
+            try:
+                _locator = AnchorLocator()
+            except ImportError as e:
+                print(f"[ANCHOR] opencv not available ({e}); step confirmation is skipped")
+                _locator = False
+        return _locator or None
+
+
+def confirm(name: str, timeout: float = 5.0) -> bool:
+    """confirm() on the shared locator; True when anchors cannot be used at all."""
+    locator = get_locator()
+    return True if locator is None else locator.confirm(name, timeout)
@@ -1,9 +1,15 @@
+import os
+import json
 import time
-from decimal import Decimal, InvalidOperation
-from pathlib import Path
-import pandas as pd
 import pyautogui
 import ctypes
+from pathlib import Path
+
+import express_timing
+from express_input import FieldInput
+from express_keyplan import KeyPlan, PyAutoGuiDispatcher, RecordingDispatcher
+from express_profiling import profiled
+from processed_registry import APP_DIR
 
 # =========================
 # Global config
@@ -15,8 +21,6 @@ STEP_DELAY = 0.15     # หน่วงระหว่าง step
 TYPE_INTERVAL = 0.07  # ระยะห่างในการพิมพ์ตัวอักษร
 RETRY = 2             # จำนวนครั้งที่ลองซ้ำเมื่อกรอกฟิลด์สำคัญ
 
-REQUIRED_COLS = ["Dept", "Date", "Supplier", "Invoice", "Code", "Qty", "UnitCost"]
-
 # =========================
 # Helpers (keyboard/layout)
 # =========================
@@ -54,191 +58,322 @@ def type_text(text: str, interval=TYPE_INTERVAL, delay=0.05):
 def clear_field():
     pyautogui.hotkey('ctrl', 'a'); press('delete', delay=0.05)
 
-# =========================
-# Data normalizers
-# =========================
-def _to_ddmmyy_from_digits(digits: str) -> str:
-    """รับเฉพาะตัวเลขในสตริง แล้วคืนค่า DDMMYY (6 หลัก)
-       - ถ้า len == 6: ถือว่าเป็น DDMMYY อยู่แล้ว → คืนกลับ
-       - ถ้า len == 8: ถือว่าเป็น DDMMYYYY → ตัดปี 2 หลักท้าย
-       - อื่น ๆ: พยายาม parse ด้วย pandas → แปลงเป็น DDMMYY
-    """
-    d = ''.join(ch for ch in digits if ch.isdigit())
-    if len(d) == 6:
-        # e.g. 101168
-        return d
-    if len(d) == 8:
-        # e.g. 10112568 หรือ 10112025 → ddmmyy = d[:4] + d[-2:]
-        return d[:4] + d[-2:]
-    # fallback: ใช้ pandas เดาแล้ว format
-    try:
-        dt = pd.to_datetime(digits, dayfirst=True, errors='coerce')
-        if pd.isna(dt):
-            dt = pd.to_datetime(digits, errors='coerce')
-        if not pd.isna(dt):
-            return f"{dt.day:02d}{dt.month:02d}{dt.year % 100:02d}"
-    except Exception:
-        pass
-    # ถ้าเดาไม่ได้จริง ๆ ให้คืนค่าเดิม (แต่โดยมาตรฐานควรเป็นตัวเลข 6 หลักอยู่แล้ว)
-    return digits.strip()
-
-def norm_date_to_ddmmyy(s: str) -> str:
-    """แปลงคอลัมน์ Date ให้เป็นสตริง 6 หลัก DDMMYY (ไม่มี / หรือ -)
-       รองรับ:
-       - รูปแบบที่เป็นตัวเลขล้วน: 101168, 10112025, 10112568
-       - รูปแบบมีตัวคั่น: 10/11/68, 10-11-2568, 10/11/2025 ฯลฯ
-    """
-    s = (s or "").strip()
-    if not s:
-        return s
-    return _to_ddmmyy_from_digits(s)
-
-def norm_qty(s: str) -> str:
-    s = (s or '').replace(',', '').strip()
-    if not s:
-        return '0'
-    try:
-        q = int(Decimal(s).to_integral_value())
-        return str(q)
-    except (InvalidOperation, ValueError):
-        return s
-
-def norm_cost(s: str) -> str:
-    s = (s or '').replace(',', '').strip()
-    if not s:
-        return '0.00'
-    try:
-        c = Decimal(s)
-        return f"{c:.2f}"
-    except (InvalidOperation, ValueError):
-        return s
-
-def normalize_dataframe(df: pd.DataFrame) -> pd.DataFrame:
-    # สตริปทุกคอลัมน์
-    for c in df.columns:
-        df[c] = df[c].astype(str).fillna('').map(lambda x: x.strip())
-
-    # Date -> DDMMYY (6 หลัก) ตาม requirement ใหม่
-    if "Date" in df.columns:
-        df["Date"] = df["Date"].map(norm_date_to_ddmmyy)
-
-    # Qty / UnitCost
-    if "Qty" in df.columns:
-        df["Qty"] = df["Qty"].map(norm_qty)
-    if "UnitCost" in df.columns:
-        df["UnitCost"] = df["UnitCost"].map(norm_cost)
-
-    return df
+# พิมพ์หรือวาง (paste) ตามที่ตั้งใน express.config.json "field_input"; สร้างใหม่ทุกครั้งที่เริ่ม process_excel_to_express
+_FIELDS: FieldInput | None = None
 
-def validate_required_columns(df: pd.DataFrame):
-    missing = [c for c in REQUIRED_COLS if c not in df.columns]
-    if missing:
-        raise ValueError(f"Missing required columns: {', '.join(missing)}")
+def enter_field(name: str, value, interval=TYPE_INTERVAL):
+    if _FIELDS is None:
+        type_text(value, interval=interval)
+    else:
+        _FIELDS.enter(name, value, interval)
 
 # =========================
-# Excel I/O
+# Data normalizers / Excel I/O (อยู่ใน express_template เพื่อให้ watcher ใช้ได้โดยไม่ต้อง import pyautogui)
 # =========================
-def read_excel_data(file_path: str) -> pd.DataFrame:
-    fp = Path(file_path)
-    if not fp.exists():
-        raise FileNotFoundError(f"Excel not found: {fp}")
-    df = pd.read_excel(fp, dtype=str, engine="openpyxl")
-    validate_required_columns(df)
-    df = df.fillna('')
-    df = normalize_dataframe(df)
-    return df
+from express_template import (  # noqa: E402,F401  (re-exported for existing callers)
+    DOCUMENT_KEY,
+    REQUIRED_COLS,
+    TemplateData,
+    group_documents,
+    load_template,
+    norm_cost,
+    norm_date_to_ddmmyy,
+    norm_qty,
+    normalize_dataframe,
+    read_excel_data,
+    validate_required_columns,
+)
 
 # =========================
-# Field groups
+# Field groups (compiled keystroke plans, see express_keyplan.py)
 # =========================
-def enter_header_fields(row):
+# รอเฉพาะจุดที่ Express ต้องใช้เวลา; ปุ่มที่ติดกันถูกรวมเป็นการส่งครั้งเดียว
+FOCUS_SETTLE = 0.05        # ก่อนกรอกฟิลด์ถัดไปหลังเลื่อนโฟกัส
+CONFIRM_SETTLE = STEP_DELAY  # หลัง Enter ที่ยืนยัน/ค้นหาข้อมูล
+BEFORE_CODE = 0.6          # หน้าจอรายการสินค้าเปิดช้า
+AFTER_CODE = 0.3           # รอ lookup รหัสสินค้า
+AFTER_SAVE = 0.8           # หลัง F9
+# settle = รอจนหน้าจอเปลี่ยนจาก mark แล้วนิ่ง (express_screen); ค่าด้านบนใช้เป็น sleep เดิมเมื่อจับภาพจอไม่ได้
+
+def compile_header_plan(row) -> KeyPlan:
+    plan = KeyPlan(f"header row {row.name}")
     # Dept -> tab 2
-    type_text(row['Dept'])
-    press('tab', presses=2)
+    plan.field('Dept', row['Dept'], TYPE_INTERVAL)
+    plan.press('tab', presses=2).wait(FOCUS_SETTLE, "focus")
 
     # Date (ตอนนี้เป็น DDMMYY 6 หลักแล้ว) -> Enter
-    type_text(row['Date'], interval=0.2)
-    press('enter')
+    plan.field('Date', row['Date'], 0.2)
+    plan.press('enter').wait(CONFIRM_SETTLE, "confirm")
 
-    # Supplier -> tab 1
-    type_text(row['Supplier'])
-    press('tab')
-
-    # เดินต่ออีก 3 tab ไปยัง Invoice
-    press('tab', presses=3)
+    # Supplier -> tab 1 (Express ตรวจ/ค้นหารหัสผู้ขายตอนนี้ ต้องรอก่อน) แล้วเดินต่ออีก 3 tab ไปยัง Invoice
+    plan.field('Supplier', row['Supplier'], TYPE_INTERVAL)
+    plan.press('tab').wait(CONFIRM_SETTLE, "supplier")
+    plan.press('tab', presses=3).wait(FOCUS_SETTLE, "focus")
 
     # Invoice -> enter 11
-    type_text(row['Invoice'])
-    press('enter', presses=11)
+    plan.field('Invoice', row['Invoice'], TYPE_INTERVAL)
+    plan.mark()
+    plan.press('enter', presses=11).wait(CONFIRM_SETTLE, "confirm")
+    return plan
 
-def enter_item_fields(row):
-    # ไป Code
-    time.sleep(0.6)
-    press('tab')  # 1 tab ไปช่อง Code
+def compile_item_plan(row) -> KeyPlan:
+    plan = KeyPlan(f"item row {row.name}")
+    # ไป Code: 1 tab ไปช่อง Code
+    plan.settle(BEFORE_CODE, "before_code")
+    plan.press('tab').wait(FOCUS_SETTLE, "focus")
 
     # Code + confirm
-    code_value = row['Code']
-    for attempt in range(1, RETRY + 1):
-        clear_field()
-        type_text(code_value, interval=0.5)
-        time.sleep(0.3)
-        press('enter', presses=2)
-        break
+    plan.hotkey('ctrl', 'a')
+    plan.press('delete').wait(FOCUS_SETTLE, "focus")
+    plan.field('Code', row['Code'], 0.5)
+    plan.wait(AFTER_CODE, "after_code")
+    plan.press('enter', presses=2).wait(CONFIRM_SETTLE, "confirm")
 
     # เดินไป Qty
-    press('tab', presses=2)
+    plan.press('tab', presses=2).wait(FOCUS_SETTLE, "focus")
 
     # Qty + OK popup (generic enter)
-    # qty = row['Qty']
-    # for attempt in range(1, RETRY + 1):
-    #     clear_field(); type_text(qty)
-    #     press('enter', presses=3)
-    #     break
+    # plan.field('Qty', row['Qty'], TYPE_INTERVAL); plan.press('enter', presses=3)
 
     # UnitCost
-    # unit_cost = row['UnitCost']
-    # clear_field(); type_text(unit_cost)
-    # press('tab', presses=3)
+    # plan.hotkey('ctrl', 'a'); plan.press('delete')
+    # plan.field('UnitCost', row['UnitCost'], TYPE_INTERVAL); plan.press('tab', presses=3)
+    return plan
+
+def compile_row_plans(row) -> tuple:
+    return compile_header_plan(row), compile_item_plan(row)
+
+def _dispatcher() -> PyAutoGuiDispatcher:
+    return PyAutoGuiDispatcher(field_fn=enter_field)
+
+def enter_header_fields(row, plan: KeyPlan | None = None):
+    (plan or compile_header_plan(row)).run(_dispatcher())
+
+def enter_item_fields(row, plan: KeyPlan | None = None):
+    (plan or compile_item_plan(row)).run(_dispatcher())
 
-def save_line_and_prepare_next(has_next_row: bool):
+def compile_save_plan(has_next_row: bool) -> KeyPlan:
     # Save (F9) -> Acquisition Basis (Enter)
-    press('f9')
-    time.sleep(0.8)
-    print("[INFO] Saved line")
-    press('enter')
+    plan = KeyPlan("save line")
+    plan.mark()
+    plan.press('f9').settle(AFTER_SAVE, "after_save")
+    plan.press('enter').wait(CONFIRM_SETTLE, "confirm")
     if has_next_row:
-        pyautogui.hotkey('alt', 'a'); time.sleep(0.5)
+        plan.hotkey('alt', 'a').wait(0.5, "new_entry")
+    return plan
+
+def save_line_and_prepare_next(has_next_row: bool = False, plan: KeyPlan | None = None):
+    """plan: compiled save plan, run as it is; otherwise compiled from has_next_row."""
+    (plan or compile_save_plan(has_next_row)).run(_dispatcher())
+    print("[INFO] Saved line")
 
 # =========================
 # Main row entry
 # =========================
-def enter_row_into_express(row, is_last_row: bool):
+def enter_row_into_express(row, is_last_row: bool, plans: tuple | None = None):
+    """plans: (header, item) KeyPlans compiled ahead of time; compiled here when not given."""
+    header_plan, item_plan = plans or compile_row_plans(row)
     if not _require_english_or_abort():
         raise RuntimeError("Keyboard not EN")
-    enter_header_fields(row)
-    enter_item_fields(row)
+    if _FIELDS is not None:
+        _FIELDS.start_row()
+    with express_timing.span("row.header", row=row.name):
+        enter_header_fields(row, header_plan)
+    with express_timing.span("row.item", row=row.name):
+        enter_item_fields(row, item_plan)
+    if _FIELDS is not None:
+        _FIELDS.end_row()
     # save_line_and_prepare_next(has_next_row=not is_last_row)
 
+# =========================
+# Documents: header once, then one item line per row (express_template.group_documents)
+# =========================
+# EXPRESS_GROUP_INVOICES=0: กลับไปกรอกทีละแถว (header ทุกแถว)
+GROUP_INVOICES = os.getenv("EXPRESS_GROUP_INVOICES", "1") != "0"
+BETWEEN_ROWS = 0.4
+
+def compile_document_plans(rows, has_next_doc: bool) -> tuple:
+    """(header, item, save, item, save, ...) for the rows of one document."""
+    plans = [compile_header_plan(rows[0])]
+    for j, row in enumerate(rows):
+        last_line = j == len(rows) - 1
+        plans.append(compile_item_plan(row))
+        # บรรทัดถัดไปของเอกสารเดียวกัน: F9 + Enter; บรรทัดสุดท้าย: Alt+A เปิดเอกสารใหม่ถ้ายังมี
+        plans.append(compile_save_plan(has_next_row=last_line and has_next_doc))
+    return tuple(plans)
+
+def document_rows(df) -> list:
+    """Rows of df grouped into documents ([[row, ...], ...])."""
+    return [[df.loc[i] for i in doc] for doc in group_documents(df)]
+
+def enter_document_into_express(rows, plans: tuple | None = None):
+    """rows: DataFrame rows of one document; plans: compile_document_plans(), compiled here when not given."""
+    header_plan, *line_plans = plans or compile_document_plans(rows, has_next_doc=False)
+    if not _require_english_or_abort():
+        raise RuntimeError("Keyboard not EN")
+    for j, row in enumerate(rows):
+        if _FIELDS is not None:
+            _FIELDS.start_row()
+        if j == 0:
+            with express_timing.span("row.header", row=row.name):
+                enter_header_fields(row, header_plan)
+        with express_timing.span("row.item", row=row.name):
+            enter_item_fields(row, line_plans[2 * j])
+        with express_timing.span("row.save", row=row.name):
+            save_line_and_prepare_next(plan=line_plans[2 * j + 1])
+        if _FIELDS is not None:
+            _FIELDS.end_row()
+
+def _simulate(plan_groups, between: float) -> dict:
+    sim = RecordingDispatcher(pause=pyautogui.PAUSE)
+    keys = dispatches = 0
+    for group in plan_groups:
+        for plan in group:
+            plan.run(sim)
+            keys += plan.key_events
+            dispatches += plan.dispatches
+        sim.wait(between, "between_rows")
+    return {"key_events": keys, "dispatches": dispatches, "seconds": sim.seconds}
+
+def estimate_grouping(df) -> dict:
+    """Simulated cost of entering df row by row (header + item, no save: enter_row_into_express) vs. grouped."""
+    n = len(df)
+    per_row = [compile_row_plans(row) for _, row in df.iterrows()]
+    docs = document_rows(df)
+    grouped = [compile_document_plans(rows, has_next_doc=k < len(docs) - 1) for k, rows in enumerate(docs)]
+    return {"rows": n, "documents": len(docs),
+            "per_row": _simulate(per_row, BETWEEN_ROWS), "grouped": _simulate(grouped, BETWEEN_ROWS)}
+
+def grouping_report(est: dict) -> str:
+    a, b = est["per_row"], est["grouped"]
+    return (f"[DOCS] {est['rows']} rows -> {est['documents']} documents: "
+            f"key events {a['key_events']} -> {b['key_events']} ({a['key_events'] - b['key_events']} fewer), "
+            f"input calls {a['dispatches']} -> {b['dispatches']}, "
+            f"~{a['seconds']:.1f}s -> ~{b['seconds']:.1f}s if every field is typed "
+            f"(saved ~{a['seconds'] - b['seconds']:.1f}s)")
+
 # =========================
 # Full workflow
 # =========================
-def process_excel_to_express(file_path: str, company_key: str | None = None):
+# EXPRESS_KEYPLAN_DUMP=1: เก็บ plan ของแต่ละ run ไว้ตรวจ/replay (python src/express_keyplan.py <file>)
+KEYPLAN_DUMP = os.getenv("EXPRESS_KEYPLAN_DUMP", "0") not in ("", "0")
+KEYPLAN_DIR = APP_DIR / "keyplans"
+
+def dump_keyplans(plans, file_path: str):
+    if not KEYPLAN_DUMP:
+        return
+    KEYPLAN_DIR.mkdir(parents=True, exist_ok=True)
+    out = KEYPLAN_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}-{Path(file_path).stem}.json"
+    data = [p.to_json() for row_plans in plans for p in row_plans]
+    out.write_text(json.dumps(data, ensure_ascii=False, indent=1), encoding="utf-8")
+    print(f"[KEYPLAN] saved {len(data)} plans -> {out}")
+
+@profiled("process_excel_to_express")
+def process_excel_to_express(file_path: str, company_key: str | None = None,
+                             template: TemplateData | None = None):
+    """
+    template: frame already parsed/validated by the watcher (load_template); read file_path otherwise.
+    Returns {"rows", "failed"}, or None when nothing was entered.
+    """
+    global _FIELDS
     if not _require_english_or_abort():
         print("[ERROR] Keyboard must be EN; aborting.")
-        return
+        return None
 
-    df = read_excel_data(file_path)
+    if template is not None and template.is_current():
+        df = template.frame
+        print(f"[INFO] Using parsed template: {template}")
+    else:
+        df = read_excel_data(file_path)
     print(f"[INFO] {len(df)} rows detected in Excel")
 
-    for idx, row in df.iterrows():
-        is_last = (idx == len(df) - 1)
-        try:
-            print(f"[INFO] Processing row {idx + 1}/{len(df)}  (Date={row['Date']})")
-            enter_row_into_express(row, is_last_row=is_last)
-            time.sleep(0.4)
-        except Exception as e:
-            print(f"[ERROR] Row {idx + 1} failed: {e}")
-            # raise  # ถ้าต้องการหยุดทั้งงานเมื่อเจอ error
-            continue
+    if GROUP_INVOICES:
+        return _process_documents(df, file_path)
+
+    # คอมไพล์ลำดับคีย์ของทุกแถวไว้ก่อนเริ่มกด
+    plans = [compile_row_plans(row) for _, row in df.iterrows()]
+    sim = RecordingDispatcher(pause=pyautogui.PAUSE)
+    for header_plan, item_plan in plans:
+        header_plan.run(sim)
+        item_plan.run(sim)
+    print(f"[KEYPLAN] {len(plans)} rows compiled: {len(sim.calls)} steps, "
+          f"~{sim.seconds / max(1, len(plans)):.2f}s/row if every field is typed")
+    dump_keyplans(plans, file_path)
+
+    _FIELDS = FieldInput(type_fn=lambda text, interval: type_text(text, interval=interval),
+                         clear_fn=clear_field)
+    failed = 0
+    try:
+        for (idx, row), row_plans in zip(df.iterrows(), plans):
+            is_last = (idx == len(df) - 1)
+            try:
+                print(f"[INFO] Processing row {idx + 1}/{len(df)}  (Date={row['Date']})")
+                enter_row_into_express(row, is_last_row=is_last, plans=row_plans)
+                express_timing.sleep(BETWEEN_ROWS, "between_rows")
+            except Exception as e:
+                print(f"[ERROR] Row {idx + 1} failed: {e}")
+                failed += 1
+                # raise  # ถ้าต้องการหยุดทั้งงานเมื่อเจอ error
+                continue
+    finally:
+        _FIELDS.restore_clipboard()
+        print(_FIELDS.report())
+        _FIELDS = None
+
+    print("[DONE] Excel data entry completed.")
+    return {"rows": len(df), "failed": failed}
+
+def _process_documents(df, file_path: str) -> dict:
+    """process_excel_to_express with rows grouped into documents (one header per invoice)."""
+    global _FIELDS
+    docs = document_rows(df)
+    plans = [compile_document_plans(rows, has_next_doc=k < len(docs) - 1) for k, rows in enumerate(docs)]
+    print(grouping_report(estimate_grouping(df)))
+    dump_keyplans(plans, file_path)
+
+    _FIELDS = FieldInput(type_fn=lambda text, interval: type_text(text, interval=interval),
+                         clear_fn=clear_field)
+    failed = 0
+    try:
+        for k, (rows, doc_plans) in enumerate(zip(docs, plans)):
+            head = rows[0]
+            try:
+                print(f"[INFO] Processing document {k + 1}/{len(docs)}: Invoice={head['Invoice']} "
+                      f"({len(rows)} lines, rows {', '.join(str(r.name + 1) for r in rows)})")
+                enter_document_into_express(rows, doc_plans)
+                express_timing.sleep(BETWEEN_ROWS, "between_rows")
+            except Exception as e:
+                # หน้าจอของเอกสารนี้ไม่แน่นอนแล้ว: นับทุกแถวของเอกสารเป็น failed
+                print(f"[ERROR] Document {k + 1} (Invoice={head['Invoice']}) failed: {e}")
+                failed += len(rows)
+                continue
+    finally:
+        _FIELDS.restore_clipboard()
+        print(_FIELDS.report())
+        _FIELDS = None
 
     print("[DONE] Excel data entry completed.")
+    return {"rows": len(df), "failed": failed, "documents": len(docs)}
+
+# =========================
+# Dry run: python src/express_excel_entry.py --dry-run template.xlsx
+# =========================
+def main(argv=None):
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Show how a template would be entered, without touching the keyboard.")
+    ap.add_argument("--dry-run", action="store_true", required=True, help="only plan and estimate (required)")
+    ap.add_argument("files", nargs="+", help="template .xlsx files")
+    args = ap.parse_args(argv)
+    for path in args.files:
+        df = read_excel_data(path)
+        print(f"== {path}")
+        for k, rows in enumerate(document_rows(df), 1):
+            head = rows[0]
+            print(f"  doc {k:>3}: " + " | ".join(f"{c}={head[c]}" for c in DOCUMENT_KEY)
+                  + f"  lines={len(rows)} rows={[r.name + 1 for r in rows]}")
+        print(grouping_report(estimate_grouping(df)))
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
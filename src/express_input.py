@@ -0,0 +1,227 @@
+"""
+Per-field input strategy for data entry (src/express_excel_entry.py).
+
+  type   pyautogui.typewrite, one character per `interval` (the original behaviour)
+  paste  put the value on the clipboard, Ctrl+V, then verify with Ctrl+A / Ctrl+C;
+         if the field does not read back the value, it is cleared and typed instead
+  auto   paste values that cannot be typed (non-ASCII) or are longer than the break-even
+         length, type the rest; fields typed slower than AUTO_MAX_INTERVAL (Date, Code) are
+         slowed down on purpose for Express's lookups and are always typed
+
+A paste with verification costs a fixed ~0.25s (clipboard settles + three hotkeys), typing
+costs a small fixed overhead + `interval` per character, so short codes (Dept "BKK") are
+faster typed. The break-even (plus PASTE_MIN_SAVING, ~3.6 chars at 0.07s/char before any
+measurement) starts from that estimate and is re-measured from the entered fields
+(successful pastes vs. typed fields, kept for the whole process).
+
+Which mode each field uses comes from "field_input" in express.config.json, e.g.
+    "field_input": {"default": "auto", "Date": "type", "Code": "type", "verify": true}
+A field whose paste fails verification FIELD_FALLBACK_AFTER times is typed for the rest
+of the run. Without pyperclip every field is typed.
+
+FieldInput also keeps keystroke time per field and per row (report()), with the typing
+time a pasted value would have cost, so the saving is visible in the log.
+"""
+
+import json
+import math
+import time
+from pathlib import Path
+
+import pyautogui
+
+import express_timing
+
+try:
+    import pyperclip
+except ImportError:  # pyperclip comes with pyautogui (mouseinfo); paste mode just turns off without it
+    pyperclip = None
+
+CONFIG_FILE = Path(__file__).resolve().parents[1] / "express.config.json"
+
+MODES = ("type", "paste", "auto")
+DEFAULT_FIELD_MODES = {"default": "type"}
+FIELD_FALLBACK_AFTER = 2     # failed paste verifications before a field is typed for the rest of the run
+CLIPBOARD_SETTLE = 0.05      # seconds for the target app to pick up clipboard changes
+TYPE_OVERHEAD = 0.1          # fixed seconds per typed field (pyautogui.PAUSE + type_text delay), until measured
+PASTE_MIN_SAVING = 0.1       # "auto" pastes only when that saves this much (a failed check costs a retype)
+AUTO_MAX_INTERVAL = 0.1      # "auto" types fields with a slower interval (Date 0.2, Code 0.5: Express looks them up)
+
+# measured fixed costs for "auto", shared by every FieldInput of the process: [total seconds, samples]
+_COSTS = {"paste": [0.0, 0], "type": [0.0, 0]}
+
+
+def load_field_modes(config_file: Path = CONFIG_FILE) -> dict:
+    """"field_input" section of express.config.json merged over DEFAULT_FIELD_MODES."""
+    modes = dict(DEFAULT_FIELD_MODES)
+    try:
+        with Path(config_file).open("r", encoding="utf-8") as f:
+            modes.update(json.load(f).get("field_input") or {})
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"[WARN] Cannot read field_input from {config_file}: {e}")
+    return modes
+
+
+class FieldInput:
+    """Enters field values with the configured strategy and measures keystroke time."""
+
+    def __init__(self, type_fn, clear_fn, modes: dict = None):
+        self._type = type_fn       # (text, interval) -> None
+        self._clear = clear_fn     # () -> None, empties the focused field
+        modes = load_field_modes() if modes is None else modes
+        self.verify = bool(modes.get("verify", True))
+        self.modes = {}
+        for field, mode in modes.items():
+            if field == "verify":
+                continue
+            if mode not in MODES:
+                print(f"[WARN] field_input: unknown mode {mode!r} for {field}; using 'type'")
+                mode = "type"
+            self.modes[field] = mode
+        self.default_mode = self.modes.pop("default", "type")
+        if pyperclip is None and {"paste", "auto"} & {self.default_mode, *self.modes.values()}:
+            print("[WARN] pyperclip not available; all fields will be typed")
+        self._failures = {}
+        self._saved_clipboard = None
+        self.stats = {}             # field -> {"mode", "n", "seconds", "typed_estimate", "fallbacks"}
+        self.row_seconds = []       # keystroke time per row
+        self.row_typed_estimate = []
+        self._row = None
+        self._interval = 0.0        # last typing interval seen, for report()
+
+    def mode_for(self, field: str, text: str = "", interval: float = 0.0) -> str:
+        if pyperclip is None:
+            return "type"
+        mode = self.modes.get(field, self.default_mode)
+        if mode == "auto":
+            if interval > AUTO_MAX_INTERVAL:
+                mode = "type"
+            else:
+                mode = "paste" if not text.isascii() or len(text) > self.break_even(interval) else "type"
+        if mode == "paste" and self._failures.get(field, 0) >= FIELD_FALLBACK_AFTER:
+            return "type"
+        return mode
+
+    # ---- paste vs. type costs ----
+    def paste_cost(self) -> float:
+        total, n = _COSTS["paste"]
+        if n:
+            return total / n
+        return CLIPBOARD_SETTLE + pyautogui.PAUSE + (CLIPBOARD_SETTLE + 2 * pyautogui.PAUSE if self.verify else 0.0)
+
+    @staticmethod
+    def type_overhead() -> float:
+        total, n = _COSTS["type"]
+        return total / n if n else TYPE_OVERHEAD
+
+    def break_even(self, interval: float) -> float:
+        """Length above which pasting is faster than typing at `interval` s/char."""
+        if interval <= 0:
+            return math.inf
+        return max(0.0, (self.paste_cost() + PASTE_MIN_SAVING - self.type_overhead()) / interval)
+
+    # ---- entry ----
+    def enter(self, field: str, value, interval: float) -> None:
+        """Enter `value` into the focused field (`interval` = per-character delay when typing)."""
+        text = value if isinstance(value, str) else str(value)
+        self._interval = interval
+        mode = self.mode_for(field, text, interval)
+        fell_back = False
+        t0 = time.perf_counter()
+        with express_timing.span(f"field.{field}", mode=mode, chars=len(text)):
+            if mode == "paste" and not self._paste(field, text):
+                mode, fell_back = "type", True
+                self._clear()
+                self._type(text, interval)
+            elif mode == "type":
+                self._type(text, interval)
+        seconds = time.perf_counter() - t0
+        if not fell_back:
+            # fixed cost of this field for the "auto" break-even (typing: minus the per-character part)
+            cost = _COSTS[mode]
+            cost[0] += seconds if mode == "paste" else max(0.0, seconds - len(text) * interval)
+            cost[1] += 1
+        self._record(field, mode, seconds, len(text) * interval)
+
+    def _paste(self, field: str, text: str) -> bool:
+        if self._saved_clipboard is None:
+            try:
+                self._saved_clipboard = pyperclip.paste()
+            except Exception:
+                self._saved_clipboard = ""
+        try:
+            pyperclip.copy(text)
+            time.sleep(CLIPBOARD_SETTLE)
+            pyautogui.hotkey("ctrl", "v")
+            if not self.verify:
+                return True
+            pyautogui.hotkey("ctrl", "a")
+            pyautogui.hotkey("ctrl", "c")
+            time.sleep(CLIPBOARD_SETTLE)
+            got = pyperclip.paste()
+        except Exception as e:
+            got = None
+            print(f"[WARN] Paste into {field} failed: {e}")
+        if got is not None and got.strip() == text.strip():
+            return True
+        n = self._failures[field] = self._failures.get(field, 0) + 1
+        print(f"[WARN] Paste check failed for {field} (got {got!r}); typing it instead"
+              + (" from now on" if n >= FIELD_FALLBACK_AFTER else ""))
+        self.stats.setdefault(field, self._new_stat("paste"))["fallbacks"] += 1
+        return False
+
+    def restore_clipboard(self) -> None:
+        """Put back what the user had on the clipboard before the first paste."""
+        if self._saved_clipboard is not None and pyperclip is not None:
+            try:
+                pyperclip.copy(self._saved_clipboard)
+            except Exception:
+                pass
+            self._saved_clipboard = None
+
+    # ---- measurements ----
+    @staticmethod
+    def _new_stat(mode: str) -> dict:
+        return {"mode": mode, "n": 0, "seconds": 0.0, "typed_estimate": 0.0, "fallbacks": 0}
+
+    def _record(self, field: str, mode: str, seconds: float, typed_estimate: float) -> None:
+        st = self.stats.setdefault(field, self._new_stat(mode))
+        st["mode"] = mode
+        st["n"] += 1
+        st["seconds"] += seconds
+        st["typed_estimate"] += seconds if mode == "type" else typed_estimate
+        if self._row is not None:
+            self._row[0] += seconds
+            self._row[1] += typed_estimate if mode == "paste" else seconds
+
+    def start_row(self) -> None:
+        self._row = [0.0, 0.0]
+
+    def end_row(self) -> None:
+        if self._row is not None:
+            self.row_seconds.append(self._row[0])
+            self.row_typed_estimate.append(self._row[1])
+        self._row = None
+
+    def report(self) -> str:
+        lines = [f"{'field':<10} | {'mode':<5} | {'n':>4} | {'avg s':>6} | {'typed s':>7} | fallbacks"]
+        for field, st in self.stats.items():
+            n = st["n"] or 1
+            lines.append(f"{field:<10} | {st['mode']:<5} | {st['n']:>4} | {st['seconds'] / n:>6.2f} | "
+                         f"{st['typed_estimate'] / n:>7.2f} | {st['fallbacks']}")
+        if self.row_seconds:
+            rows = len(self.row_seconds)
+            avg = sum(self.row_seconds) / rows
+            typed = sum(self.row_typed_estimate) / rows
+            lines.insert(0, f"[INPUT] field keystroke time per row: {avg:.2f}s over {rows} rows "
+                            f"(all typed ~{typed:.2f}s, saved ~{typed - avg:.2f}s/row)")
+        else:
+            lines.insert(0, "[INPUT] no rows entered")
+        if "auto" in (self.default_mode, *self.modes.values()):
+            lines.append(f"[INPUT] auto: paste above ~{self.break_even(self._interval):.1f} chars "
+                         f"(paste {self.paste_cost():.2f}s/field over {_COSTS['paste'][1]} pastes, "
+                         f"typing {self.type_overhead():.2f}s + {self._interval:.2f}s/char over "
+                         f"{_COSTS['type'][1]} fields)")
+        return "\n".join(lines)
@@ -0,0 +1,254 @@
+"""
+Compiled keystroke plans for Express data entry and menu navigation.
+
+A KeyPlan is a list of steps built ahead of time (before any key is sent):
+  {"op": "keys",   "keys": [...], "interval": s}   one batched press() call
+  {"op": "hotkey", "keys": [...]}                  e.g. ctrl+a
+  {"op": "field",  "name": ..., "value": ..., "interval": s}   typed or pasted (express_input)
+  {"op": "wait",   "seconds": s, "label": ...}     only where the Express UI needs time
+  {"op": "mark"}                                   screen baseline before a UI-changing key
+  {"op": "settle", "seconds": s, "label": ...}     wait until the screen changed from the mark
+                                                   and went still (express_screen); `seconds`
+                                                   is the fixed sleep used without capture
+Adjacent key presses with the same interval merge into one step, adjacent waits into one
+wait, so every segment costs one input call (and one pyautogui.PAUSE) instead of one per
+helper call.
+
+Plans are plain data: describe() prints them, to_json()/from_json() save and load them,
+and run() sends them through a dispatcher:
+  PyAutoGuiDispatcher  the real keyboard (pyautogui, waits via express_timing.sleep)
+  RecordingDispatcher  no input; records the calls and a simulated duration, for tests
+
+Inspect / replay a saved plan without touching the keyboard:
+    python src/express_keyplan.py plan.json
+"""
+
+import json
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+KEY_INTERVAL = 0.02   # between presses inside one batch (same as press() in express_excel_entry)
+
+
+class KeyPlan:
+    def __init__(self, name: str = "", steps: Optional[List[dict]] = None):
+        self.name = name
+        self.steps: List[dict] = []
+        for step in steps or []:
+            self._append(dict(step))
+
+    # ---- building ----
+    def _append(self, step: dict) -> "KeyPlan":
+        last = self.steps[-1] if self.steps else None
+        if last is not None and last["op"] == step["op"] == "keys" and last["interval"] == step["interval"]:
+            last["keys"].extend(step["keys"])
+        elif last is not None and last["op"] == step["op"] == "wait":
+            last["seconds"] += step["seconds"]
+            if step.get("label") and step["label"] not in last["label"].split("+"):
+                last["label"] = f"{last['label']}+{step['label']}" if last["label"] else step["label"]
+        else:
+            if step["op"] in ("keys", "hotkey"):
+                step["keys"] = list(step["keys"])
+            self.steps.append(step)
+        return self
+
+    def press(self, key: str, presses: int = 1, interval: float = KEY_INTERVAL) -> "KeyPlan":
+        return self._append({"op": "keys", "keys": [key] * presses, "interval": interval})
+
+    def hotkey(self, *keys: str) -> "KeyPlan":
+        return self._append({"op": "hotkey", "keys": list(keys)})
+
+    def field(self, name: str, value, interval: float) -> "KeyPlan":
+        return self._append({"op": "field", "name": name, "value": "" if value is None else str(value),
+                             "interval": interval})
+
+    def wait(self, seconds: float, label: str = "") -> "KeyPlan":
+        if seconds > 0:
+            self._append({"op": "wait", "seconds": seconds, "label": label})
+        return self
+
+    def mark(self) -> "KeyPlan":
+        return self._append({"op": "mark"})
+
+    def settle(self, seconds: float, label: str) -> "KeyPlan":
+        return self._append({"op": "settle", "seconds": seconds, "label": label})
+
+    def extend(self, other: "KeyPlan") -> "KeyPlan":
+        for step in other.steps:
+            self._append(dict(step, keys=list(step["keys"])) if "keys" in step else dict(step))
+        return self
+
+    # ---- running ----
+    def run(self, dispatcher) -> None:
+        for step in self.steps:
+            op = step["op"]
+            if op == "keys":
+                dispatcher.keys(step["keys"], step["interval"])
+            elif op == "hotkey":
+                dispatcher.hotkey(step["keys"])
+            elif op == "field":
+                dispatcher.field(step["name"], step["value"], step["interval"])
+            elif op == "wait":
+                dispatcher.wait(step["seconds"], step.get("label") or "plan")
+            elif op == "mark":
+                dispatcher.mark()
+            elif op == "settle":
+                dispatcher.settle(step["seconds"], step.get("label") or "plan")
+            else:
+                raise ValueError(f"unknown plan step: {step!r}")
+
+    # ---- inspection ----
+    @property
+    def key_events(self) -> int:
+        n = 0
+        for step in self.steps:
+            if step["op"] in ("keys", "hotkey"):
+                n += len(step["keys"])
+            elif step["op"] == "field":
+                n += len(step["value"])
+        return n
+
+    @property
+    def dispatches(self) -> int:
+        return sum(1 for step in self.steps if step["op"] in ("keys", "hotkey", "field"))
+
+    def describe(self) -> str:
+        lines = [f"KeyPlan {self.name!r}: {len(self.steps)} steps, {self.dispatches} input calls, "
+                 f"{self.key_events} key events"]
+        for i, step in enumerate(self.steps):
+            op = step["op"]
+            if op == "keys":
+                detail = _runs(step["keys"]) + f" @{step['interval']}s"
+            elif op == "hotkey":
+                detail = "+".join(step["keys"])
+            elif op == "field":
+                detail = f"{step['name']}={step['value']!r} @{step['interval']}s"
+            elif op == "mark":
+                detail = "screen baseline"
+            elif op == "settle":
+                detail = f"until ready (fixed {step['seconds']:.2f}s) {step.get('label', '')}"
+            else:
+                detail = f"{step['seconds']:.2f}s {step.get('label', '')}"
+            lines.append(f"  {i:>3} {op:<6} {detail}")
+        return "\n".join(lines)
+
+    def to_json(self) -> dict:
+        return {"name": self.name, "steps": self.steps}
+
+    @classmethod
+    def from_json(cls, data: dict) -> "KeyPlan":
+        return cls(data.get("name", ""), data.get("steps", []))
+
+    def __repr__(self):
+        return f"KeyPlan({self.name!r}, steps={len(self.steps)}, dispatches={self.dispatches})"
+
+
+def _runs(keys) -> str:
+    """['tab', 'tab', 'enter'] -> 'tab x2, enter'"""
+    out = []
+    for k in keys:
+        if out and out[-1][0] == k:
+            out[-1][1] += 1
+        else:
+            out.append([k, 1])
+    return ", ".join(k if n == 1 else f"{k} x{n}" for k, n in out)
+
+
+# =========================
+# Dispatchers
+# =========================
+class PyAutoGuiDispatcher:
+    """Sends plans to the real keyboard; fields go through field_fn (typing or paste, see express_input)."""
+
+    def __init__(self, field_fn=None):
+        import pyautogui
+
+        import express_timing
+
+        self._pyautogui = pyautogui
+        self._timing = express_timing
+        self._field = field_fn   # (name, value, interval) -> None
+
+    def keys(self, keys, interval):
+        self._pyautogui.press(list(keys), interval=interval)
+
+    def hotkey(self, keys):
+        self._pyautogui.hotkey(*keys)
+
+    def field(self, name, value, interval):
+        if self._field is None:
+            raise RuntimeError(f"plan has a field step ({name}) but the dispatcher has no field_fn")
+        self._field(name, value, interval)
+
+    def wait(self, seconds, label):
+        self._timing.sleep(seconds, label)
+
+    def mark(self):
+        import express_screen
+
+        express_screen.mark()
+
+    def settle(self, seconds, label):
+        import express_screen
+
+        express_screen.wait_screen_settled(label, fallback=seconds)
+
+
+class RecordingDispatcher:
+    """
+    Records what would be sent and a simulated duration: each input call costs `pause`
+    (pyautogui.PAUSE) plus its per-key intervals; typed fields add `type_delay` after typing.
+    Settle steps are counted at their fixed fallback time.
+    """
+
+    def __init__(self, pause: float = 0.05, type_delay: float = 0.05):
+        self.pause = pause
+        self.type_delay = type_delay
+        self.calls = []
+        self.seconds = 0.0
+
+    def keys(self, keys, interval):
+        self.calls.append(("keys", list(keys)))
+        self.seconds += len(keys) * interval + self.pause
+
+    def hotkey(self, keys):
+        self.calls.append(("hotkey", list(keys)))
+        self.seconds += self.pause
+
+    def field(self, name, value, interval):
+        self.calls.append(("field", name, value))
+        self.seconds += len(value) * interval + self.type_delay + self.pause
+
+    def wait(self, seconds, label):
+        self.calls.append(("wait", seconds, label))
+        self.seconds += seconds
+
+    def mark(self):
+        self.calls.append(("mark",))
+
+    def settle(self, seconds, label):
+        self.calls.append(("settle", seconds, label))
+        self.seconds += seconds
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        print("usage: python src/express_keyplan.py plan.json [plan.json ...]")
+        return 2
+    for path in argv:
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        plans = data if isinstance(data, list) else [data]
+        total = RecordingDispatcher()
+        for d in plans:
+            plan = KeyPlan.from_json(d)
+            print(plan.describe())
+            plan.run(total)
+        print(f"[KEYPLAN] {path}: {len(plans)} plan(s), {len(total.calls)} calls, "
+              f"simulated {total.seconds:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
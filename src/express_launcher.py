@@ -12,7 +12,11 @@ from tkinter import simpledialog, messagebox
 
 import pyautogui
 
-from express_menu import open_credit_purchase_add
+import express_anchors
+import express_screen
+import express_timing
+from express_menu import open_credit_purchase_add, start_new_credit_purchase
+from express_session import get_session
 from express_excel_entry import process_excel_to_express
 
 APP_NAME = "ExpressAutomation"  # ชื่อ service ใน Windows Credential Manager
@@ -34,6 +38,9 @@ pyautogui.PAUSE = 0.05
 PROJECT_ROOT = Path(__file__).resolve().parents[1]   # .../ExpressAutomation
 EXCEL_DEFAULT = PROJECT_ROOT / "excel_templates" / "express_import_template.xlsx"
 CONFIG_FILE = PROJECT_ROOT / "express.config.json"   # optional
+LAUNCH_TIMEOUT = 30.0   # วินาที สูงสุดที่รอหน้าต่าง login หลังเปิดโปรแกรม
+LAUNCH_SETTLE = 1.0     # หน้าต่าง login ต้องนิ่งนานเท่านี้ (กัน splash ที่ค้างภาพชั่วครู่)
+ANCHOR_TIMEOUT = 10.0   # วินาที ที่รอให้เห็นหน้าจอถัดไป (assets/anchors)
 
 # =========================
 # Keyboard layout helpers
@@ -165,10 +172,12 @@ def launch_express(express_path: Optional[str]) -> bool:
         print("[ERROR] Express executable not found. ตั้งค่าแมพไดรฟ์ Z: หรือระบุ express_path/ENV/express.config.json")
         return False
     try:
+        express_screen.mark(region=None)   # ทั้งจอ: หน้าต่าง Express ยังไม่มี
         subprocess.Popen([exe])
         print(f"[INFO] Launched Express: {exe}")
-        # รอ UI เบื้องต้น
-        time.sleep(3)
+        # รอ UI เบื้องต้น: จนหน้าต่าง login ขึ้นและนิ่ง (จับภาพจอไม่ได้ = sleep 3s เหมือนเดิม)
+        express_screen.wait_screen_settled("launch_ui", fallback=3, timeout=LAUNCH_TIMEOUT,
+                                           settle=LAUNCH_SETTLE)
         return True
     except Exception as e:
         print(f"[ERROR] Failed to launch Express: {e}")
@@ -226,63 +235,174 @@ def apply_search_key(search_key: Optional[str]) -> None:
         time.sleep(0.35)
 
 # =========================
-# Main entry
+# Session start (launch -> login -> company -> menu)
 # =========================
-def run_full_workflow(
-    file_path: Optional[str] = None,
-    search_key: Optional[str] = None,
-    express_path: Optional[str] = None
-):
-    """Main automation entry.
-    - file_path: Excel path from watcher
-    - search_key: e.g., 'EDS2025' parsed from filename
-    - express_path: optional override (default is Z:\ExpressI.exe via resolver)
-    """
-    print("[START] Express Automation Workflow")
-    print(f"[ARGS] file_path={file_path} | search_key={search_key} | express_path={express_path}")
-
-    # เงื่อนไขบังคับ: ต้องเป็นภาษาอังกฤษก่อนเริ่มทุกอย่าง
-    if not require_keyboard_english():
-        return
-
+def start_session(search_key: Optional[str], express_path: Optional[str]) -> bool:
+    """เปิด Express ใหม่ -> ล็อกอิน -> เลือกบริษัท -> เมนูซื้อเชื่อ (เพิ่มรายการ)"""
     # เปิดโปรแกรม
-    if not launch_express(express_path):
-        return
+    with express_timing.span("launch_express"):
+        launched = launch_express(express_path)
+    if not launched:
+        return False
 
     # ล็อกอิน
-    time.sleep(2.0)
-    if not enter_credentials():
-        return
+    express_screen.wait_screen_settled("before_login", fallback=2.0, require_change=False)
+    express_anchors.confirm("login", timeout=LAUNCH_TIMEOUT)   # ไม่มีภาพ anchor = ข้าม
+    with express_timing.span("enter_credentials"):
+        logged_in = enter_credentials()
+    if not logged_in:
+        return False
 
     # ขั้นตอนเลือกบริษัท/ปี ด้วย search_key
     try:
-        apply_search_key(search_key)
+        if search_key:
+            express_anchors.confirm("company_dialog", timeout=ANCHOR_TIMEOUT)
+        with express_timing.span("apply_search_key"):
+            apply_search_key(search_key)
     except Exception as e:
         print(f"[ERROR] search_key step failed: {e}")
-        return
+        return False
 
     # เข้าเมนูซื้อเชื่อ -> เพิ่มรายการ
     # (หากองค์กรต้องเปลี่ยนลำดับ สามารถย้ายจุดนี้ได้)
     print(f"[INFO] Navigating to Credit Purchase Add menu...")
-    open_credit_purchase_add()
-    time.sleep(1.2)
+    with express_timing.span("open_credit_purchase_add"):
+        opened = open_credit_purchase_add()
+    express_timing.sleep(1.2, "after_menu")
+    return opened
+
+# =========================
+# Main entry
+# =========================
+def run_full_workflow(
+    file_path: Optional[str] = None,
+    search_key: Optional[str] = None,
+    express_path: Optional[str] = None,
+    template=None
+) -> Optional[dict]:
+    """Main automation entry; returns process_excel_to_express()'s result, None when nothing was entered.
+    - file_path: Excel path from watcher
+    - search_key: e.g., 'EDS2025' parsed from filename
+    - express_path: optional override (default is Z:\ExpressI.exe via resolver)
+    - template: TemplateData already parsed by the watcher (express_template.load_template);
+      when given, the Excel file is not read again
+    """
+    # แต่ละขั้นตอนถูกจับเวลาเป็น span (express_timing) และสรุป p50/p95 เมื่อจบ run
+    with express_timing.run(Path(file_path).name if file_path else "workflow"):
+        print("[START] Express Automation Workflow")
+        print(f"[ARGS] file_path={file_path} | search_key={search_key} | express_path={express_path}")
+
+        # เงื่อนไขบังคับ: ต้องเป็นภาษาอังกฤษก่อนเริ่มทุกอย่าง
+        if not require_keyboard_english():
+            return None
+
+        session = get_session()
+        if not open_entry_screen(session, search_key, express_path):
+            return None
+        result = enter_template(file_path, search_key, template, session)
+        if result is not None:
+            print("[DONE] Express launched, logged in, company selected, and Excel data processed!")
+        return result
+
+def run_batch_workflow(items, search_key: Optional[str], express_path: Optional[str] = None, on_done=None):
+    """Several templates of one company in one Express session (main.py batches them by search_key).
+    - items: [(file_path, template)]
+    - on_done(index, result, error): called after each template that was attempted
+      (result = process_excel_to_express() return value, error = repr of the exception);
+      templates after an exception are not attempted and get no call. When the keyboard
+      check fails nothing is attempted and every template gets (None, "keyboard layout is not English")
+    Launch / login / company / menu happen once; later templates only start a new entry (Alt+A).
+    """
+    label = f"batch {search_key} x{len(items)}"
+    with express_timing.run(label):
+        print(f"[START] Express batch {search_key}: {len(items)} templates")
+        if not require_keyboard_english():
+            # เหมือน run_full_workflow: ไม่ได้กรอก -> แจ้งทุกไฟล์ว่าล้มเหลว (ไม่คืนเข้าคิวให้วนซ้ำ)
+            for i in range(len(items)):
+                if on_done:
+                    on_done(i, None, "keyboard layout is not English")
+            return
+        session = get_session()
+        t_batch = time.perf_counter()
+        setup_seconds, entry_seconds = [], []
+        last_ok = False
+        for i, (file_path, template) in enumerate(items):
+            try:
+                with express_timing.span("template", file=Path(file_path).name, index=i):
+                    t0 = time.perf_counter()
+                    # ไฟล์ก่อนหน้าในชุดนี้กรอกเสร็จบนหน้าจอนี้แล้ว -> Alt+A ได้เลย ไม่ต้องตรวจ session
+                    ready = last_ok and start_new_credit_purchase()
+                    if not ready and not open_entry_screen(session, search_key, express_path):
+                        raise RuntimeError("Credit Purchase entry screen could not be opened")
+                    t1 = time.perf_counter()
+                    result = enter_template(file_path, search_key, template, session)
+                    last_ok = result is not None and not result["failed"]
+                    setup_seconds.append(t1 - t0)
+                    entry_seconds.append(time.perf_counter() - t1)
+            except Exception as e:
+                if on_done:
+                    on_done(i, None, repr(e))
+                raise
+            if on_done:
+                on_done(i, result, None)
+        full_start = (session.state or {}).get("start_seconds") or max(setup_seconds, default=None)
+        print(batch_report(search_key, time.perf_counter() - t_batch, setup_seconds, entry_seconds, full_start))
+
+def batch_report(search_key: Optional[str], wall: float, setup_seconds: list, entry_seconds: list,
+                 full_start: Optional[float]) -> str:
+    """Batch wall time vs. the per-file baseline, where every template pays a full start of its own."""
+    n = len(entry_seconds)
+    line = (f"[BATCH] {search_key}: {n} templates in {wall:.1f}s "
+            f"(setup {sum(setup_seconds):.1f}s, entry {sum(entry_seconds):.1f}s)")
+    if full_start is None:
+        return line + "; per-file baseline n/a (no full start measured yet)"
+    # แบบเดิม: เปิด/ล็อกอิน/เลือกบริษัท/เมนู ใหม่ทุกไฟล์ + เวลากรอกเท่าเดิม
+    baseline = n * full_start + sum(entry_seconds)
+    return (line + f"; per-file baseline ~{n} x {full_start:.1f}s start + {sum(entry_seconds):.1f}s entry "
+            f"= {baseline:.1f}s (saved ~{baseline - wall:.1f}s)")
+
+def open_entry_screen(session, search_key: Optional[str], express_path: Optional[str]) -> bool:
+    """หน้าจอซื้อเชื่อ (เพิ่มรายการ) พร้อมกรอก: ใช้ Express ที่ล็อกอินบริษัทเดียวกันค้างไว้ (Alt+A) หรือเริ่มใหม่ทั้งหมด"""
+    with express_timing.span("session_check"):
+        reused = session.can_reuse(search_key)
+    if reused:
+        with express_timing.span("start_new_entry"):
+            ready = start_new_credit_purchase()
+        if not ready:
+            print("[ERROR] Could not open a new Credit Purchase entry in the open session")
+            session.forget()
+        return ready
+    t0 = time.perf_counter()
+    if not start_session(search_key, express_path):
+        return False
+    session.started(search_key, seconds=time.perf_counter() - t0)
+    return True
 
+def enter_template(file_path: Optional[str], search_key: Optional[str], template, session) -> Optional[dict]:
+    """กรอกข้อมูลหนึ่ง template ลงหน้าจอที่เปิดไว้; คืนผลของ process_excel_to_express (None = ไม่ได้กรอก)"""
     # ไฟล์ Excel (dynamic)
     excel_file = Path(file_path) if file_path else EXCEL_DEFAULT
-    if not excel_file.exists():
+    if template is None and not excel_file.exists():
         print(f"[ERROR] Excel file not found: {excel_file}")
-        return
+        return None
     print(f"[INFO] Using Excel file: {excel_file}")
 
     # ประมวลผลข้อมูล Excel → กรอกลง Express
+    result = None
     try:
         # พยายามส่ง company_key เข้าไปก่อน ถ้า signature ยังไม่รองรับจะ fallback
         print(f"[INFO] Processing Excel to Express with company_key={search_key}...")
-        process_excel_to_express(str(excel_file), company_key=search_key)
+        with express_timing.span("data_entry"):
+            result = process_excel_to_express(str(excel_file), company_key=search_key, template=template)
     except TypeError:
         print(f"[INFO] Processing Excel to Express without company_key...")
-        process_excel_to_express(str(excel_file))
-    print("[DONE] Express launched, logged in, company selected, and Excel data processed!")
+        result = process_excel_to_express(str(excel_file))
+    except Exception:
+        session.finished(ok=False)
+        raise
+    # แถวที่ error ทำให้หน้าจอไม่แน่นอน -> รอบหน้าเริ่ม session ใหม่
+    session.finished(ok=result is not None and not result["failed"])
+    return result
 
 if __name__ == "__main__":
     run_full_workflow()
@@ -1,14 +1,39 @@
 import time
 import pyautogui
 
+import express_anchors
+from express_keyplan import KeyPlan, PyAutoGuiDispatcher
+
 # ปรับได้ตามเครื่อง/เครือข่าย
 DEFAULT_KEY_INTERVAL = 0.05     # เวลาคั่นแต่ละคีย์
 STEP_DELAY = 0.25               # เวลาคั่นแต่ละสเต็ป
 RETRY = 3                       # จำนวนครั้งที่ลองซ้ำ
+FORM_TIMEOUT = 5.0              # วินาที ที่รอให้เห็นฟอร์มซื้อเชื่อ (anchor credit_purchase_form)
 
 pyautogui.PAUSE = DEFAULT_KEY_INTERVAL
 pyautogui.FAILSAFE = True  # มุมซ้ายบน = emergency stop
 
+def compile_credit_purchase_add_plan() -> KeyPlan:
+    plan = KeyPlan("credit purchase add")
+    plan.hotkey('alt', '1').wait(STEP_DELAY, "menu")          # 1) เปิดเมนูซื้อ
+    plan.press('4').wait(STEP_DELAY, "menu")                  # 2) เลือก 'ซื้อเชื่อ'
+    plan.mark()                                               # ภาพหน้าจอก่อน Alt+A
+    plan.hotkey('alt', 'a')                                   # 3) เพิ่มรายการใหม่
+    plan.settle(STEP_DELAY + 0.5 + 1.5, "screen_load")        # รอจนหน้าจอโหลดเสร็จ (เดิม sleep 2.25s)
+    return plan
+
+CREDIT_PURCHASE_ADD_PLAN = compile_credit_purchase_add_plan()
+
+def compile_new_entry_plan() -> KeyPlan:
+    # ฟอร์มซื้อเชื่อเปิดอยู่แล้ว (session เดิม): Alt+A เริ่มเอกสารใหม่
+    plan = KeyPlan("new credit purchase")
+    plan.mark()
+    plan.hotkey('alt', 'a')
+    plan.settle(STEP_DELAY + 0.5, "new_entry")
+    return plan
+
+NEW_ENTRY_PLAN = compile_new_entry_plan()
+
 def _press_with_pause(*keys, delay=STEP_DELAY):
     """กดคีย์แล้วพักสั้น ๆ เพื่อให้ UI ทัน"""
     if len(keys) == 1:
@@ -29,22 +54,32 @@ def open_credit_purchase_add():
 
     for attempt in range(1, RETRY + 1):
         try:
-            # Step 1: Open Purchase menu
-            _press_with_pause('alt', '1')
-
-            # Step 2: Select Credit Purchase
-            _press_with_pause('4')
-
-            # Step 3: Add new record
-            _press_with_pause('alt', 'a', delay=STEP_DELAY + 0.5)
-
-            # เผื่อหน้าจอโหลด
-            time.sleep(1.5)
+            # Alt+1 -> 4 -> Alt+A แล้วรอหน้าจอโหลด (ดู compile_credit_purchase_add_plan)
+            CREDIT_PURCHASE_ADD_PLAN.run(PyAutoGuiDispatcher())
+            # ยืนยันว่าฟอร์มขึ้นจริง (ถ้าไม่มีภาพ anchor จะผ่านเลย)
+            if not express_anchors.confirm("credit_purchase_form", timeout=FORM_TIMEOUT):
+                raise RuntimeError("Credit Purchase form not visible")
             print("[INFO] Ready to input data.")
-            return
+            return True
         except Exception as e:
             print(f"[WARN] Menu navigation attempt {attempt}/{RETRY} failed: {e}")
             time.sleep(0.5)
 
     # ถ้าไม่สำเร็จใน RETRY ครั้ง
     print("[ERROR] Failed to navigate to Credit Purchase Add screen after retries.")
+    return False
+
+def start_new_credit_purchase():
+    """
+    ใช้กับ Express ที่ล็อกอินค้างไว้ (express_session): กด Alt+A บนฟอร์มซื้อเชื่อเดิม
+    ถ้าไม่เห็นฟอร์มใหม่ ค่อยเข้าเมนูใหม่ทั้งหมด (open_credit_purchase_add)
+    """
+    print("[INFO] Starting a new Credit Purchase entry in the open session...")
+    try:
+        NEW_ENTRY_PLAN.run(PyAutoGuiDispatcher())
+        if express_anchors.confirm("credit_purchase_form", timeout=FORM_TIMEOUT):
+            print("[INFO] Ready to input data.")
+            return True
+    except Exception as e:
+        print(f"[WARN] New entry failed: {e}")
+    return open_credit_purchase_add()
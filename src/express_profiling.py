@@ -0,0 +1,184 @@
+"""
+On-demand profiling of the converter / watcher hot paths.
+
+    @profiled("convert_and_write")
+    def convert_and_write(...): ...
+
+Off by default: the wrapper is a flag check on cached settings (express.config.json is
+stat'ed at most every CONFIG_CHECK_SECONDS). Switch it on without touching code with
+  - env EXPRESS_PROFILE=1 (read when the process starts), or
+  - "profiling": {"enabled": true, "keep": 20, "top": 40} in express.config.json, which is
+    re-read when the file changes (picked up within CONFIG_CHECK_SECONDS, or at once with
+    reload_settings()), so a running watcher can be switched on and off.
+
+Each profiled call (only the outermost one per thread, nested profiled functions run
+plain inside it) gets its own folder under %APPDATA%/ExpressAutomation/profiles/:
+  profile.prof  cProfile stats (pstats / snakeviz)
+  profile.txt   top functions by cumulative time
+  alloc.txt     tracemalloc: allocations made during the call by line, plus the peak
+  meta.json     name, argument summary, seconds, peak traced memory
+Only the newest `keep` folders are kept. cProfile and tracemalloc are process-wide, so one
+call is profiled at a time; calls in other threads meanwhile run unprofiled.
+"""
+
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import shutil
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+from processed_registry import APP_DIR
+
+PROFILE_DIR = APP_DIR / "profiles"
+CONFIG_FILE = Path(__file__).resolve().parents[1] / "express.config.json"
+DEFAULTS = {"enabled": False, "keep": 20, "top": 40}
+ENV_ENABLED = os.getenv("EXPRESS_PROFILE", "0") not in ("", "0")
+CONFIG_CHECK_SECONDS = 2.0
+
+_local = threading.local()
+_profile_lock = threading.Lock()   # one profile at a time (cProfile / tracemalloc are process-wide)
+_config_cache = {"mtime": None, "settings": dict(DEFAULTS), "checked_at": None, "effective": None}
+_config_lock = threading.Lock()
+_seq = 0
+
+
+def settings() -> dict:
+    """
+    Profiling settings from express.config.json + EXPRESS_PROFILE. Between checks (every
+    CONFIG_CHECK_SECONDS) this is a dict lookup; treat the result as read-only.
+    """
+    checked_at = _config_cache["checked_at"]
+    if checked_at is not None and time.monotonic() - checked_at < CONFIG_CHECK_SECONDS:
+        return _config_cache["effective"]
+    return reload_settings(force=False)
+
+
+def reload_settings(force: bool = True) -> dict:
+    """Stat express.config.json now and re-read it if it changed (always with force=True)."""
+    with _config_lock:
+        try:
+            mtime = CONFIG_FILE.stat().st_mtime
+        except OSError:
+            mtime = None
+        if force or mtime != _config_cache["mtime"]:
+            cfg = dict(DEFAULTS)
+            if mtime is not None:
+                try:
+                    with CONFIG_FILE.open("r", encoding="utf-8") as f:
+                        cfg.update(json.load(f).get("profiling") or {})
+                except Exception as e:
+                    print(f"[WARN] Cannot read profiling settings from {CONFIG_FILE}: {e}")
+            _config_cache.update(mtime=mtime, settings=cfg)
+        s = dict(_config_cache["settings"])
+        s["enabled"] = bool(s.get("enabled")) or ENV_ENABLED
+        _config_cache.update(effective=s, checked_at=time.monotonic())
+    return s
+
+
+def _describe(args) -> str:
+    """Short label for the job: file name of the first path-like argument."""
+    for a in args:
+        if isinstance(a, (str, Path)):
+            return Path(a).name
+    return ""
+
+
+def _job_dir(name: str, label: str) -> Path:
+    global _seq
+    _seq += 1
+    safe = "".join(ch if ch.isalnum() or ch in "-_." else "_" for ch in f"{name}-{label}".strip("-"))[:80]
+    path = PROFILE_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{_seq:04d}-{safe}"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _rotate(keep: int) -> None:
+    try:
+        dirs = sorted((p for p in PROFILE_DIR.iterdir() if p.is_dir()), key=lambda p: p.name)
+    except FileNotFoundError:
+        return
+    for old in dirs[:-keep] if keep > 0 else []:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+def _write_outputs(out: Path, prof: cProfile.Profile, before, after, peak: int, top: int, meta: dict) -> None:
+    prof.dump_stats(str(out / "profile.prof"))
+    buf = io.StringIO()
+    pstats.Stats(prof, stream=buf).sort_stats("cumulative").print_stats(top)
+    (out / "profile.txt").write_text(buf.getvalue(), encoding="utf-8")
+
+    lines = [f"peak traced memory: {peak / 1024 / 1024:.1f} MiB", "",
+             f"top {top} allocation changes by line (all threads):"]
+    for stat in after.compare_to(before, "lineno")[:top]:
+        lines.append(str(stat))
+    (out / "alloc.txt").write_text("\n".join(lines) + "\n", encoding="utf-8")
+    (out / "meta.json").write_text(json.dumps(meta, indent=2, ensure_ascii=False), encoding="utf-8")
+
+
+def _run_profiled(name: str, fn, args, kwargs, cfg: dict):
+    label = _describe(args)
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    before = tracemalloc.take_snapshot()
+    prof = cProfile.Profile()
+    t0 = time.perf_counter()
+    error = None
+    try:
+        prof.enable()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            prof.disable()
+    except BaseException as e:
+        error = repr(e)
+        raise
+    finally:
+        seconds = time.perf_counter() - t0
+        try:
+            after = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            if started_tracing:
+                tracemalloc.stop()
+            out = _job_dir(name, label)
+            meta = {"name": name, "job": label, "seconds": seconds, "peak_traced_bytes": peak,
+                    "thread": threading.current_thread().name, "error": error,
+                    "finished_at": time.strftime("%Y-%m-%d %H:%M:%S")}
+            _write_outputs(out, prof, before, after, peak, int(cfg.get("top", 40)), meta)
+            _rotate(int(cfg.get("keep", 20)))
+            print(f"[PROFILE] {name}({label}) {seconds:.2f}s peak {peak / 1024 / 1024:.1f} MiB -> {out}")
+        except Exception as e:
+            print(f"[WARN] Could not write profile for {name}: {e}")
+
+
+def profiled(name: str):
+    """Decorator: profile calls to the function when profiling is switched on (see module docstring)."""
+
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if getattr(_local, "active", False):
+                return fn(*args, **kwargs)
+            cfg = settings()
+            if not cfg["enabled"]:
+                return fn(*args, **kwargs)
+            if not _profile_lock.acquire(blocking=False):
+                print(f"[PROFILE] {name} not profiled: another call is being profiled")
+                return fn(*args, **kwargs)
+            _local.active = True
+            try:
+                return _run_profiled(name, fn, args, kwargs, cfg)
+            finally:
+                _local.active = False
+                _profile_lock.release()
+
+        return wrapper
+
+    return decorate
@@ -0,0 +1,271 @@
+"""
+Screen-state waits: return as soon as the Express UI is ready instead of sleeping a fixed time.
+
+    mark()                                # before the keystroke / launch that changes the screen
+    pyautogui.hotkey('alt', 'a')
+    wait_screen_settled("screen_load", fallback=1.5)
+
+By default the foreground window is watched (pygetwindow), so other windows and the taskbar
+do not keep the region busy. Frames are reduced to a downscaled grayscale image
+(HASH_SIZE x HASH_SIZE block means). Two frames differ by the block that changed most,
+in fully-changed pixels (max block difference x block area / 255), so a small field that
+changes counts the same in a small dialog and in a maximized window, while a caret blink
+(a few dozen pixels) stays below CHANGE_PIXELS.
+Conditions:
+  ScreenSettled   the region differs from the baseline by more than CHANGE_PIXELS, then
+                  stays still for `settle` s
+  HashMatches     the average hash of the region is within `max_bits` of a stored reference
+  TemplateVisible cv2.matchTemplate finds a template image above `threshold`
+
+wait_until() polls the frame source until the condition holds or `timeout` passes (then the
+caller carries on as before, with a warning). wait_screen_settled() times out at the old fixed
+sleep unless the caller asks for longer (the launch waits), so a wait is never slower than the
+sleep it replaced. Without screen capture (no display, PIL/ImageGrab missing, or
+EXPRESS_SCREEN_WAIT=0) it sleeps the old fixed `fallback` instead. The frame source
+(set_source / source=), clock and sleep are injectable; tools/bench_screen_wait.py drives it
+with synthetic frames.
+"""
+
+import os
+import threading
+import time
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+
+import express_timing
+
+POLL_INTERVAL = 0.05     # seconds between frames
+HASH_SIZE = 16           # downscaled frame is HASH_SIZE x HASH_SIZE
+CHANGE_PIXELS = 64.0     # fully-changed pixels in one block that count as a change (caret ~30)
+SETTLE_SECONDS = 0.3     # screen must stay still this long
+ENABLED = os.getenv("EXPRESS_SCREEN_WAIT", "1") != "0"
+
+Region = Optional[Tuple[int, int, int, int]]   # left, top, width, height; None = whole screen
+ACTIVE = "active"                              # region of the foreground window when the wait starts
+
+_local = threading.local()
+_capture = {"checked": False, "source": None}
+_capture_lock = threading.Lock()
+
+
+# =========================
+# Frames
+# =========================
+def to_gray(frame) -> np.ndarray:
+    """PIL image or array (H, W[, 3|4]) -> float32 grayscale array."""
+    if hasattr(frame, "convert"):
+        return np.asarray(frame.convert("L"), dtype=np.float32)
+    a = np.asarray(frame, dtype=np.float32)
+    if a.ndim == 3:
+        a = a[..., :3] @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+    return a
+
+
+def downscale(gray: np.ndarray, size: int = HASH_SIZE) -> np.ndarray:
+    """Block means on a size x size grid (area resize without cv2/PIL)."""
+    h, w = gray.shape
+    if h < size or w < size:
+        gray = np.repeat(np.repeat(gray, -(-size // h), axis=0), -(-size // w), axis=1)
+        h, w = gray.shape
+    ys = np.linspace(0, h, size + 1).astype(int)
+    xs = np.linspace(0, w, size + 1).astype(int)
+    rows = np.add.reduceat(gray, ys[:-1], axis=0) / np.diff(ys)[:, None]
+    return np.add.reduceat(rows, xs[:-1], axis=1) / np.diff(xs)[None, :]
+
+
+def frame_distance(a: np.ndarray, b: np.ndarray, block_area: float = 1.0) -> float:
+    """Change between two downscaled frames: the most-changed block, in fully-changed pixels."""
+    return float(np.max(np.abs(a - b))) * block_area / 255.0
+
+
+def average_hash(gray: np.ndarray, size: int = HASH_SIZE) -> np.ndarray:
+    small = downscale(gray, size)
+    return (small > small.mean()).ravel()
+
+
+def hash_distance(a: np.ndarray, b: np.ndarray) -> int:
+    return int(np.count_nonzero(a != b))
+
+
+# =========================
+# Conditions
+# =========================
+class ScreenSettled:
+    """Ready when the region has changed from `baseline` and then stayed still for `settle` seconds."""
+
+    def __init__(self, baseline: Optional[np.ndarray] = None, settle: float = SETTLE_SECONDS,
+                 change_pixels: float = CHANGE_PIXELS, require_change: bool = True):
+        self.baseline = baseline
+        self.settle = settle
+        self.change_pixels = change_pixels
+        self.changed = not require_change
+        self._last = None
+        self._still_since = None
+
+    def check(self, gray: np.ndarray, now: float) -> bool:
+        small = downscale(gray)
+        area = gray.shape[0] * gray.shape[1] / float(HASH_SIZE * HASH_SIZE)
+        if self.baseline is None:
+            self.baseline = small
+        if not self.changed:
+            if frame_distance(small, self.baseline, area) <= self.change_pixels:
+                return False
+            self.changed = True
+        if self._last is None or frame_distance(small, self._last, area) > self.change_pixels:
+            self._still_since = now
+        self._last = small
+        return now - self._still_since >= self.settle
+
+
+class HashMatches:
+    """Ready when the region's average hash is within `max_bits` of `reference` (from average_hash)."""
+
+    def __init__(self, reference: np.ndarray, max_bits: int = 8):
+        self.reference = np.asarray(reference, dtype=bool)
+        self.max_bits = max_bits
+
+    def check(self, gray: np.ndarray, now: float) -> bool:
+        return hash_distance(average_hash(gray), self.reference) <= self.max_bits
+
+
+class TemplateVisible:
+    """Ready when cv2.matchTemplate finds `template` (grayscale array) with score >= threshold."""
+
+    def __init__(self, template: np.ndarray, threshold: float = 0.85):
+        import cv2  # opencv-python-headless (requirements.txt)
+
+        self._cv2 = cv2
+        self.template = to_gray(template)
+        self.threshold = threshold
+        self.score = None
+
+    def check(self, gray: np.ndarray, now: float) -> bool:
+        th, tw = self.template.shape
+        if gray.shape[0] < th or gray.shape[1] < tw:
+            return False
+        res = self._cv2.matchTemplate(gray, self.template, self._cv2.TM_CCOEFF_NORMED)
+        self.score = float(res.max())
+        return self.score >= self.threshold
+
+
+# =========================
+# Frame source
+# =========================
+def _pil_grab(region: Region = None):
+    from PIL import ImageGrab
+
+    bbox = None if region is None else (region[0], region[1], region[0] + region[2], region[1] + region[3])
+    return ImageGrab.grab(bbox=bbox)
+
+
+def set_source(source: Optional[Callable]) -> None:
+    """Replace the screen grabber (region -> frame); None means no capture, i.e. fixed sleeps."""
+    with _capture_lock:
+        _capture.update(checked=True, source=source)
+
+
+def default_source() -> Optional[Callable]:
+    """Screen grabber, or None when capture does not work here (checked once, logged once)."""
+    with _capture_lock:
+        if not _capture["checked"]:
+            _capture["checked"] = True
+            if not ENABLED:
+                print("[SCREEN] screen waits disabled (EXPRESS_SCREEN_WAIT=0); using fixed sleeps")
+            else:
+                try:
+                    _pil_grab((0, 0, 8, 8))
+                    _capture["source"] = _pil_grab
+                except Exception as e:
+                    print(f"[SCREEN] screen capture unavailable ({e}); using fixed sleeps")
+        return _capture["source"]
+
+
+def active_window_region() -> Region:
+    """Bounding box of the foreground window (pygetwindow, Windows), else None for the whole screen."""
+    try:
+        import pygetwindow
+
+        win = pygetwindow.getActiveWindow()
+        if win is not None and win.width > 0 and win.height > 0:
+            return (max(0, win.left), max(0, win.top), win.width, win.height)
+    except Exception:
+        pass
+    return None
+
+
+# =========================
+# Waiting
+# =========================
+def wait_until(condition, timeout: float, fallback: float, label: str, region: Region = None,
+               source: Optional[Callable] = None, interval: float = POLL_INTERVAL,
+               clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep) -> dict:
+    """
+    Poll frames until condition.check(gray, seconds_since_start) is true.
+    Returns {"ok", "method": "screen" | "timeout" | "fixed", "seconds", "frames"}.
+    """
+    source = source or default_source()
+    start = clock()
+    frames = 0
+    with express_timing.span(f"wait.{label}", fallback=fallback):
+        if source is None:
+            sleep(fallback)
+            return {"ok": True, "method": "fixed", "seconds": fallback, "frames": 0}
+        while True:
+            try:
+                frame = source(region)
+            except Exception as e:
+                print(f"[SCREEN] capture failed during {label} ({e}); sleeping the rest of {fallback}s")
+                sleep(max(0.0, fallback - (clock() - start)))
+                return {"ok": True, "method": "fixed", "seconds": clock() - start, "frames": frames}
+            frames += 1
+            elapsed = clock() - start
+            if condition.check(to_gray(frame), elapsed):
+                return {"ok": True, "method": "screen", "seconds": elapsed, "frames": frames}
+            if elapsed >= timeout:
+                print(f"[SCREEN] {label}: not ready after {elapsed:.1f}s ({frames} frames); continuing")
+                return {"ok": False, "method": "timeout", "seconds": elapsed, "frames": frames}
+            sleep(interval)
+
+
+def _resolve(region) -> Region:
+    return active_window_region() if region == ACTIVE else region
+
+
+def mark(region=ACTIVE) -> Optional[np.ndarray]:
+    """
+    Capture the baseline for the next wait_screen_settled() in this thread; call it before the
+    key press / launch that changes the screen. The wait then watches the same region.
+    """
+    region = _resolve(region)
+    source = default_source()
+    baseline = None
+    if source is not None:
+        try:
+            baseline = downscale(to_gray(source(region)))
+        except Exception:
+            baseline = None
+    _local.mark = (baseline, region) if baseline is not None else None
+    return baseline
+
+
+def wait_screen_settled(label: str, fallback: float, timeout: Optional[float] = None,
+                        require_change: Optional[bool] = None, region=ACTIVE,
+                        settle: float = SETTLE_SECONDS) -> dict:
+    """
+    Wait until the screen reacted and went still (replaces a fixed sleep of `fallback` seconds).
+    The baseline and region come from this thread's last mark(); without a mark only stillness
+    is required (require_change=False) and `region` is watched. `timeout` defaults to `fallback`.
+    """
+    marked = getattr(_local, "mark", None)
+    _local.mark = None
+    baseline = None
+    if marked is not None:
+        baseline, region = marked
+    else:
+        region = _resolve(region)
+    if require_change is None:
+        require_change = baseline is not None
+    timeout = fallback if timeout is None else timeout
+    cond = ScreenSettled(baseline=baseline, settle=settle, require_change=require_change)
+    return wait_until(cond, timeout=timeout, fallback=fallback, label=label, region=region)
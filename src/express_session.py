@@ -0,0 +1,201 @@
+"""
+Keep one logged-in Express window between templates.
+
+After a full start (launch -> login -> company -> Credit Purchase) the window and its
+search_key are remembered in %APPDATA%/ExpressAutomation/express_session.json, so a restarted
+watcher finds the same window again. The next template with the same search_key skips launch,
+login and company selection and only starts a new Credit Purchase entry
+(express_menu.start_new_credit_purchase).
+
+A full start happens instead when
+  - the search_key (company/year) differs from the session's,
+  - the health check fails: window gone, renamed, cannot be brought to the foreground,
+    idle longer than max_idle_minutes, or the previous run ended with errors,
+  - reuse is switched off ("session": {"reuse": false} in express.config.json or
+    EXPRESS_SESSION_REUSE=0), or pygetwindow is not available.
+With "close_on_switch": true the old window is closed before a new one is launched;
+by default it is left open, as before sessions existed.
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+from processed_registry import APP_DIR
+
+SESSION_FILE = APP_DIR / "express_session.json"
+CONFIG_FILE = Path(__file__).resolve().parents[1] / "express.config.json"
+DEFAULTS = {"reuse": True, "window_title": "Express", "max_idle_minutes": 60, "close_on_switch": False}
+ENV_REUSE = os.getenv("EXPRESS_SESSION_REUSE", "1") != "0"
+ACTIVATE_SETTLE = 0.3   # seconds for the window manager to bring the window forward
+
+
+def load_settings(config_file: Path = CONFIG_FILE) -> dict:
+    """"session" section of express.config.json merged over DEFAULTS."""
+    settings = dict(DEFAULTS)
+    try:
+        with Path(config_file).open("r", encoding="utf-8") as f:
+            settings.update(json.load(f).get("session") or {})
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"[WARN] Cannot read session settings from {config_file}: {e}")
+    settings["reuse"] = bool(settings.get("reuse")) and ENV_REUSE
+    return settings
+
+
+def _pygetwindow():
+    try:
+        import pygetwindow  # comes with pyautogui on Windows
+    except ImportError:
+        return None
+    return pygetwindow
+
+
+class ExpressSession:
+    def __init__(self, settings: dict = None, state_file: Path = SESSION_FILE):
+        self.settings = load_settings() if settings is None else settings
+        self.state_file = Path(state_file)
+        self.state = self._load_state()   # {"search_key", "hwnd", "title", "started_at", "last_used", "runs",
+                                          #  "healthy", "start_seconds"}
+
+    # ---- persistence ----
+    def _load_state(self) -> Optional[dict]:
+        try:
+            with self.state_file.open("r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"[WARN] Ignoring unreadable session file {self.state_file}: {e}")
+            return None
+
+    def _save_state(self) -> None:
+        try:
+            self.state_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.state_file.with_suffix(".tmp")
+            tmp.write_text(json.dumps(self.state, ensure_ascii=False, indent=2), encoding="utf-8")
+            os.replace(tmp, self.state_file)
+        except OSError as e:
+            print(f"[WARN] Could not save session state: {e}")
+
+    def forget(self) -> None:
+        self.state = None
+        try:
+            self.state_file.unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"[WARN] Could not remove session state: {e}")
+
+    # ---- windows ----
+    def express_windows(self) -> list:
+        gw = _pygetwindow()
+        if gw is None:
+            return []
+        title = self.settings["window_title"].lower()
+        return [w for w in gw.getAllWindows() if w.title and title in w.title.lower()]
+
+    def _window(self):
+        hwnd = (self.state or {}).get("hwnd")
+        for w in self.express_windows():
+            if getattr(w, "_hWnd", None) == hwnd:
+                return w
+        return None
+
+    def health(self) -> tuple:
+        """(ok, reason); brings the session window to the foreground when ok."""
+        if self.state is None:
+            return False, "no session"
+        gw = _pygetwindow()
+        if gw is None:
+            return False, "pygetwindow not available"
+        if not self.state.get("healthy", True):
+            return False, "previous run ended with errors"
+        idle = time.time() - self.state.get("last_used", 0)
+        if idle > float(self.settings["max_idle_minutes"]) * 60:
+            return False, f"idle {idle / 60:.0f} min"
+        win = self._window()
+        if win is None:
+            return False, "window gone"
+        try:
+            if win.isMinimized:
+                win.restore()
+            win.activate()
+        except Exception as e:
+            return False, f"cannot activate window ({e})"
+        time.sleep(ACTIVATE_SETTLE)
+        active = gw.getActiveWindow()
+        if active is None or getattr(active, "_hWnd", None) != self.state["hwnd"]:
+            return False, "window not in foreground"
+        return True, "ok"
+
+    # ---- lifecycle ----
+    def can_reuse(self, search_key: Optional[str]) -> bool:
+        """True when the remembered window is logged in to `search_key` and healthy."""
+        if not self.settings["reuse"] or self.state is None:
+            return False
+        if self.state.get("search_key") != search_key:
+            print(f"[SESSION] company changed {self.state.get('search_key')} -> {search_key}; starting a new session")
+            self.close()
+            return False
+        ok, why = self.health()
+        if not ok:
+            print(f"[SESSION] health check failed ({why}); starting a new session")
+            self.close()
+            return False
+        print(f"[SESSION] reusing Express session {search_key} (run {self.state.get('runs', 0) + 1}, "
+              f"started {time.strftime('%H:%M', time.localtime(self.state['started_at']))})")
+        return True
+
+    def started(self, search_key: Optional[str], seconds: Optional[float] = None) -> None:
+        """Remember the window after a full launch -> login -> company -> menu start (taking `seconds`)."""
+        if not self.settings["reuse"]:
+            return
+        gw = _pygetwindow()
+        win = gw.getActiveWindow() if gw is not None else None
+        title = self.settings["window_title"].lower()
+        if win is None or title not in (win.title or "").lower():
+            candidates = self.express_windows()
+            win = candidates[-1] if candidates else None
+        if win is None:
+            print("[SESSION] Express window not found; this session will not be reused")
+            self.forget()
+            return
+        now = time.time()
+        self.state = {"search_key": search_key, "hwnd": getattr(win, "_hWnd", None), "title": win.title,
+                      "started_at": now, "last_used": now, "runs": 0, "healthy": True,
+                      "start_seconds": seconds}
+        self._save_state()
+
+    def finished(self, ok: bool) -> None:
+        """After data entry; a run with errors leaves the UI in an unknown state, so it is not reused."""
+        if self.state is None:
+            return
+        self.state["last_used"] = time.time()
+        self.state["runs"] = self.state.get("runs", 0) + 1
+        self.state["healthy"] = bool(ok)
+        self._save_state()
+
+    def close(self) -> None:
+        """Forget the session; with close_on_switch also close its window."""
+        win = self._window() if self.state is not None and self.settings.get("close_on_switch") else None
+        if win is not None:
+            try:
+                win.close()
+                print(f"[SESSION] closed Express window {win.title!r}")
+            except Exception as e:
+                print(f"[WARN] Could not close Express window: {e}")
+        self.forget()
+
+
+_session = None
+
+
+def get_session() -> ExpressSession:
+    global _session
+    if _session is None:
+        _session = ExpressSession()
+    return _session
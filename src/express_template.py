@@ -0,0 +1,200 @@
+"""
+Template (excel_templates/*.xlsx) reading shared by the watcher (src/main.py) and the
+data-entry step (src/express_excel_entry.py). No pyautogui here, so the watcher can
+import it without touching the GUI stack.
+
+  - read_template_header(): header row only (openpyxl read-only), for schema checks
+  - load_template(): full parse + validation + normalization, done once per template;
+    the resulting TemplateData is handed through run_full_workflow into
+    process_excel_to_express instead of re-reading the file there.
+  - group_documents(): rows sharing one invoice header, entered as one multi-line document
+"""
+
+import time
+from decimal import Decimal, InvalidOperation
+from collections import Counter
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import pandas as pd
+
+import express_timing
+from express_profiling import profiled
+from date_normalizer import DateNormalizer
+
+REQUIRED_COLS = ["Dept", "Date", "Supplier", "Invoice", "Code", "Qty", "UnitCost"]
+
+# =========================
+# Header-only read
+# =========================
+def _header_cell(v, idx: int) -> str:
+    # same placeholder pandas gives blank header cells
+    if v is None or (isinstance(v, str) and not v.strip()):
+        return f"Unnamed: {idx}"
+    return str(v)
+
+def read_template_header(path: Path) -> Tuple[List[str], Optional[int]]:
+    """
+    Column names of the first sheet + approximate data row count (None if unknown).
+    .xlsx/.xlsm: openpyxl read-only, stops after the first non-blank row (the header,
+    like pd.read_excel skips leading blank rows). Other formats: pd.read_excel(nrows=0).
+    """
+    path = Path(path)
+    if path.suffix.lower() not in (".xlsx", ".xlsm"):
+        return [str(c) for c in pd.read_excel(path, nrows=0).columns], None
+
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        for row_idx, row in enumerate(ws.iter_rows(values_only=True), start=1):
+            if all(v is None or (isinstance(v, str) and not v.strip()) for v in row):
+                continue
+            header = list(row)
+            while header and header[-1] is None:
+                header.pop()
+            # max_row comes from the sheet's <dimension>; may be missing or include blank rows
+            rows = ws.max_row - row_idx if ws.max_row else None
+            return [_header_cell(v, i) for i, v in enumerate(header)], rows
+        return [], 0
+    finally:
+        wb.close()
+
+def missing_columns(columns, required=REQUIRED_COLS) -> List[str]:
+    cols = set(columns)
+    return [c for c in required if c not in cols]
+
+# =========================
+# Data normalizers
+# =========================
+# Date column parser (memoized per unique value; see date_normalizer.py)
+_DATES = DateNormalizer("dmy")
+
+def norm_date_to_ddmmyy(s: str) -> str:
+    """แปลงคอลัมน์ Date ให้เป็นสตริง 6 หลัก DDMMYY (ไม่มี / หรือ -)
+       รองรับ:
+       - รูปแบบที่เป็นตัวเลขล้วน: 101168, 10112025, 10112568
+       - รูปแบบมีตัวคั่น: 10/11/68, 10-11-2568, 10/11/2025 ฯลฯ
+    """
+    return _DATES.normalize_one(s)
+
+def norm_qty(s: str) -> str:
+    s = (s or '').replace(',', '').strip()
+    if not s:
+        return '0'
+    try:
+        q = int(Decimal(s).to_integral_value())
+        return str(q)
+    except (InvalidOperation, ValueError):
+        return s
+
+def norm_cost(s: str) -> str:
+    s = (s or '').replace(',', '').strip()
+    if not s:
+        return '0.00'
+    try:
+        c = Decimal(s)
+        return f"{c:.2f}"
+    except (InvalidOperation, ValueError):
+        return s
+
+@profiled("normalize_dataframe")
+def normalize_dataframe(df: pd.DataFrame) -> pd.DataFrame:
+    # สตริปทุกคอลัมน์
+    for c in df.columns:
+        df[c] = df[c].astype(str).fillna('').map(lambda x: x.strip())
+
+    # Date -> DDMMYY (6 หลัก) ตาม requirement ใหม่
+    if "Date" in df.columns:
+        # นับแยกต่อไฟล์: _DATES ใช้ร่วมกันหลายเธรด (pipeline workers)
+        date_stats = Counter()
+        df["Date"] = _DATES.normalize(df["Date"], stats=date_stats)
+        print(_DATES.report(date_stats))
+
+    # Qty / UnitCost
+    if "Qty" in df.columns:
+        df["Qty"] = df["Qty"].map(norm_qty)
+    if "UnitCost" in df.columns:
+        df["UnitCost"] = df["UnitCost"].map(norm_cost)
+
+    return df
+
+def validate_required_columns(df: pd.DataFrame):
+    missing = missing_columns(df.columns)
+    if missing:
+        raise ValueError(f"Missing required columns: {', '.join(missing)}")
+
+# =========================
+# Documents (rows sharing one invoice header)
+# =========================
+DOCUMENT_KEY = ("Dept", "Date", "Supplier", "Invoice")
+
+def group_documents(df: pd.DataFrame) -> List[list]:
+    """
+    Index labels of `df` grouped into documents: consecutive rows with the same
+    (Dept, Date, Supplier, Invoice) share one header, so documents and rows stay in file order.
+    The same key further down the file starts a document of its own; rows with a blank Invoice
+    are never merged.
+    """
+    groups = []
+    prev = None
+    for idx, key in zip(df.index, df[list(DOCUMENT_KEY)].itertuples(index=False, name=None)):
+        if key[-1] and key == prev:
+            groups[-1].append(idx)
+        else:
+            groups.append([idx])
+        prev = key
+    return groups
+
+# =========================
+# Excel I/O
+# =========================
+def read_excel_data(file_path: str) -> pd.DataFrame:
+    fp = Path(file_path)
+    if not fp.exists():
+        raise FileNotFoundError(f"Excel not found: {fp}")
+    with express_timing.span("parse", file=fp.name):
+        df = pd.read_excel(fp, dtype=str, engine="openpyxl")
+    with express_timing.span("validate"):
+        validate_required_columns(df)
+    with express_timing.span("normalize", rows=len(df)):
+        df = df.fillna('')
+        df = normalize_dataframe(df)
+    return df
+
+class TemplateData:
+    """
+    A template parsed, validated and normalized once; `frame` is what gets typed into Express.
+    mtime=None: built in memory (converter pipeline mode), `path` is only its audit copy.
+    """
+
+    def __init__(self, path: Path, frame: pd.DataFrame, mtime: Optional[float], parse_seconds: float):
+        self.path = Path(path)
+        self.frame = frame
+        self.mtime = mtime
+        self.parse_seconds = parse_seconds
+
+    @property
+    def rows(self) -> int:
+        return len(self.frame)
+
+    def is_current(self) -> bool:
+        """False if the file changed on disk after it was parsed."""
+        if self.mtime is None:
+            return True
+        try:
+            return self.path.stat().st_mtime == self.mtime
+        except FileNotFoundError:
+            return False
+
+    def __repr__(self):
+        return f"TemplateData({self.path.name!r}, rows={self.rows}, parsed in {self.parse_seconds:.2f}s)"
+
+def load_template(path: Path) -> TemplateData:
+    """read_excel_data + the file's mtime at parse time; raises like read_excel_data."""
+    path = Path(path)
+    t0 = time.perf_counter()
+    mtime = path.stat().st_mtime
+    frame = read_excel_data(str(path))
+    return TemplateData(path, frame, mtime, time.perf_counter() - t0)
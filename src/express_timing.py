@@ -0,0 +1,163 @@
+"""
+Lightweight per-stage timing for the Express workflow.
+
+    with express_timing.run("EDS-2025-RR.xlsx"):      # one workflow run (per thread)
+        with express_timing.span("launch_express"):
+            ...
+        express_timing.sleep(2.0, "after_launch")      # fixed sleeps show up as sleep.<label>
+
+Every span becomes one JSON line in %APPDATA%/ExpressAutomation/timings/spans-YYYYMMDD.jsonl
+({"run", "span", "start", "seconds", "depth", ...fields}). When the outermost run() ends, a summary
+table (count / total / p50 / p95 / max / share of the run per span name) is printed and a
+{"span": "run", ...} record with the same numbers is written. Nested run() calls join the
+outer run. Spans outside any run are only written to the JSON lines file.
+Records are kept in memory and appended in one go when the outermost run ends, when
+BUFFER_MAX records are waiting, or at exit (flush()), so timing a row costs no file I/O.
+EXPRESS_TIMING=0 turns everything into no-ops.
+"""
+
+import atexit
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from processed_registry import APP_DIR
+
+TIMINGS_DIR = APP_DIR / "timings"
+ENABLED = os.getenv("EXPRESS_TIMING", "1") != "0"
+BUFFER_MAX = 5000   # records held before a flush outside run() ends
+
+_local = threading.local()
+_write_lock = threading.Lock()
+_buffer = []
+_run_ids = itertools.count(1)
+
+
+def percentile(values, q: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    k = min(len(values) - 1, max(0, int(round(q * (len(values) - 1)))))
+    return values[k]
+
+
+def _write(record: dict) -> None:
+    with _write_lock:
+        _buffer.append(record)
+        full = len(_buffer) >= BUFFER_MAX
+    if full:
+        flush()
+
+
+def flush() -> None:
+    """Append the buffered records to today's JSON lines file."""
+    with _write_lock:
+        records = _buffer[:]
+        _buffer.clear()
+        if not records:
+            return
+        path = TIMINGS_DIR / f"spans-{time.strftime('%Y%m%d')}.jsonl"
+        try:
+            TIMINGS_DIR.mkdir(parents=True, exist_ok=True)
+            with path.open("a", encoding="utf-8") as f:
+                f.writelines(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in records)
+        except OSError as e:
+            print(f"[WARN] Could not write {len(records)} timing records: {e}")
+
+
+atexit.register(flush)
+
+
+class Run:
+    def __init__(self, label: str):
+        self.label = label
+        self.id = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(_run_ids)}"
+        self.spans = {}   # name -> [seconds, ...]
+        self.order = []   # span names in first-seen order
+        self.started = time.perf_counter()
+
+    def add(self, name: str, seconds: float) -> None:
+        if name not in self.spans:
+            self.spans[name] = []
+            self.order.append(name)
+        self.spans[name].append(seconds)
+
+    def summary(self) -> dict:
+        wall = time.perf_counter() - self.started
+        stages = {}
+        for name in self.order:
+            values = self.spans[name]
+            total = sum(values)
+            stages[name] = {"n": len(values), "total": total, "p50": percentile(values, 0.5),
+                            "p95": percentile(values, 0.95), "max": max(values),
+                            "share": total / wall if wall else 0.0}
+        return {"wall": wall, "stages": stages}
+
+    def report(self, summary: dict) -> str:
+        lines = [f"[TIMING] run {self.label} ({self.id}): {summary['wall']:.2f}s wall",
+                 f"{'span':<28} | {'n':>5} | {'total s':>8} | {'p50 s':>7} | {'p95 s':>7} | {'max s':>7} | {'share':>6}",
+                 "-" * 86]
+        for name, st in summary["stages"].items():
+            lines.append(f"{name[:28]:<28} | {st['n']:>5} | {st['total']:>8.2f} | {st['p50']:>7.3f} | "
+                         f"{st['p95']:>7.3f} | {st['max']:>7.3f} | {st['share']:>6.1%}")
+        lines.append("(nested spans are also counted in their parents, so shares can add up to more than 100%)")
+        return "\n".join(lines)
+
+
+def current_run() -> Optional[Run]:
+    return getattr(_local, "run", None)
+
+
+@contextmanager
+def run(label: str):
+    """Group spans into one run; the outermost run() prints/writes the summary when it ends."""
+    outer = current_run()
+    if outer is not None or not ENABLED:
+        yield outer
+        return
+    r = Run(label)
+    _local.run = r
+    try:
+        yield r
+    finally:
+        _local.run = None
+        summary = r.summary()
+        _write({"run": r.id, "span": "run", "label": label, "seconds": summary["wall"],
+                "stages": summary["stages"]})
+        flush()
+        print(r.report(summary))
+
+
+@contextmanager
+def span(name: str, **fields):
+    """Time the block as `name`; extra keyword fields go into its JSON line (e.g. row=3)."""
+    if not ENABLED:
+        yield
+        return
+    depth = getattr(_local, "depth", 0)
+    _local.depth = depth + 1
+    start = time.time()
+    t0 = time.perf_counter()
+    try:
+        yield
+    except BaseException as e:
+        fields["error"] = type(e).__name__
+        raise
+    finally:
+        seconds = time.perf_counter() - t0
+        _local.depth = depth
+        r = current_run()
+        if r is not None:
+            r.add(name, seconds)
+        _write({"run": r.id if r else None, "span": name, "start": start, "seconds": seconds,
+                "depth": depth, **fields})
+
+
+def sleep(seconds: float, label: str) -> None:
+    """time.sleep recorded as span sleep.<label>, so fixed waits are visible in the summary."""
+    with span(f"sleep.{label}", planned=seconds):
+        time.sleep(seconds)
@@ -0,0 +1,211 @@
+"""
+File-readiness detection shared by both watchers (src/main.py and
+tools/export_watcher_converter.py).
+
+A file is ready when its writer is done with it:
+  - Linux: inotify on the parent folder. IN_CLOSE_WRITE / IN_MOVED_TO for the
+    file means ready at once; otherwise ready after `stable_seconds` without an
+    IN_MODIFY (no sleeping in between, the kernel wakes us up), and, when no
+    event came at all (writers on a network share send none), a second stat()
+    that still shows the same size/mtime.
+  - elsewhere: stat() polling with adaptive backoff (fast first checks, slower
+    while the file keeps changing). Ready once size/mtime have not changed for
+    `stable_seconds` between two of our own samples.
+The quiet period is measured on our clock. The file's mtime can only shorten the
+first one, down to MIN_QUIET_FRACTION of `stable_seconds` (an mtime from a server
+clock or kept by a copier says nothing reliable about when the last write was),
+so there is always at least one unchanged re-sample. The file must also open for
+reading.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+# inotify flags (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+_WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+POLL_MIN_INTERVAL = 0.05
+POLL_BACKOFF = 1.6
+MIN_QUIET_FRACTION = 0.5   # an old mtime shortens the first quiet period to no less than this share
+
+_libc = None
+
+
+def inotify_available() -> bool:
+    global _libc
+    if not sys.platform.startswith("linux"):
+        return False
+    if _libc is None:
+        try:
+            lib = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            lib.inotify_init1
+            lib.inotify_add_watch
+            _libc = lib
+        except (OSError, AttributeError):
+            _libc = False
+    return bool(_libc)
+
+
+def _can_open(path: Path) -> bool:
+    if path.is_dir():
+        return True
+    try:
+        with path.open("rb"):
+            return True
+    except OSError:
+        return False
+
+
+def _mtime_age(st) -> float:
+    return max(0.0, time.time() - st.st_mtime)
+
+
+def _first_quiet(st, stable_seconds: float) -> float:
+    """Quiet period before the first re-sample: stable_seconds, shortened by the mtime age down to the floor."""
+    return max(stable_seconds * MIN_QUIET_FRACTION, stable_seconds - _mtime_age(st))
+
+
+def _signature(st) -> tuple:
+    return (st.st_size, st.st_mtime_ns)
+
+
+def _wait_inotify(path: Path, deadline: float, stable_seconds: float, info: dict) -> Optional[bool]:
+    """True/False when decided, None if inotify could not be set up (caller falls back to polling)."""
+    fd = _libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    if fd < 0:
+        return None
+    try:
+        wd = _libc.inotify_add_watch(fd, os.fsencode(str(path.parent)), _WATCH_MASK)
+        if wd < 0:
+            return None
+        name = os.fsencode(path.name)
+
+        # check after the watch exists so no close/modify can slip through unseen
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return False
+        sig = _signature(st)
+        quiet_until = time.monotonic() + _first_quiet(st, stable_seconds)
+        modified = False   # IN_MODIFY seen: the writer is local and the quiet period is the kernel's
+
+        while True:
+            now = time.monotonic()
+            if now >= deadline:
+                info["method"] = "timeout"
+                return False
+            if now >= quiet_until:
+                if not modified:
+                    # no events: re-sample, the file may be written from another machine
+                    try:
+                        st = path.stat()
+                    except FileNotFoundError:
+                        info["method"] = "gone"
+                        return False
+                    if _signature(st) != sig:
+                        sig = _signature(st)
+                        quiet_until = now + stable_seconds
+                        continue
+                if _can_open(path):
+                    info["method"] = "inotify-quiet"
+                    return True
+                quiet_until = now + POLL_MIN_INTERVAL
+            readable, _, _ = select.select([fd], [], [], min(deadline, quiet_until) - now)
+            if not readable:
+                continue
+            try:
+                data = os.read(fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(data):
+                _, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                ev_name = data[offset + _EVENT_HEADER.size: offset + _EVENT_HEADER.size + length].rstrip(b"\0")
+                offset += _EVENT_HEADER.size + length
+                if ev_name != name:
+                    continue
+                if mask & (IN_DELETE | IN_MOVED_FROM):
+                    info["method"] = "gone"
+                    return False
+                if mask & (IN_CLOSE_WRITE | IN_MOVED_TO) and _can_open(path):
+                    info["method"] = "inotify-close" if mask & IN_CLOSE_WRITE else "inotify-moved"
+                    return True
+                if mask & IN_MODIFY:
+                    modified = True
+                    quiet_until = time.monotonic() + stable_seconds
+    finally:
+        os.close(fd)
+
+
+def _wait_polling(path: Path, deadline: float, stable_seconds: float, max_interval: float, info: dict) -> bool:
+    interval = POLL_MIN_INTERVAL
+    last_sig = None
+    stable_since = None
+    while True:
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            info["method"] = "gone"
+            return False
+        except OSError:
+            st = None
+        now = time.monotonic()
+        sig = _signature(st) if st else None
+        if sig is None or sig != last_sig:
+            if last_sig is None and sig is not None and stable_since is None:
+                # first look: an old mtime shortens the first quiet period, the re-sample stays
+                stable_since = now - (stable_seconds - _first_quiet(st, stable_seconds))
+            else:
+                stable_since = now
+                interval = POLL_MIN_INTERVAL
+            last_sig = sig
+        if sig is not None and now - stable_since >= stable_seconds and _can_open(path):
+            info["method"] = "poll"
+            return True
+        if now >= deadline:
+            info["method"] = "timeout"
+            return False
+        wait = min(interval, max_interval, deadline - now)
+        if sig is not None:
+            wait = min(wait, max(POLL_MIN_INTERVAL, stable_since + stable_seconds - now))
+        time.sleep(max(0.0, wait))
+        interval = min(max_interval, interval * POLL_BACKOFF)
+
+
+def wait_file_ready(path: Path, timeout: float = 20.0, stable_seconds: float = 1.0,
+                    max_interval: float = 0.5, use_inotify: Optional[bool] = None,
+                    info: Optional[dict] = None) -> bool:
+    """
+    Wait until `path` is finished being written (see module docstring).
+    Returns False if it disappears or is not ready within `timeout`.
+    `info` (optional dict) receives {"method": ..., "waited": seconds}.
+    """
+    info = {} if info is None else info
+    started = time.monotonic()
+    deadline = started + timeout
+    path = Path(path)
+    try:
+        if not path.exists():
+            info["method"] = "gone"
+            return False
+        ready = None
+        if path.is_file() and use_inotify is not False and inotify_available():
+            ready = _wait_inotify(path, deadline, stable_seconds, info)
+        if ready is None:
+            ready = _wait_polling(path, deadline, stable_seconds, max_interval, info)
+        return ready
+    finally:
+        info["waited"] = time.monotonic() - started
@@ -0,0 +1,272 @@
+"""
+Durable queue of Express workflow jobs (one job = one template in excel_templates/, or
+one export in the converter's pipeline mode, which keeps a queue of its own).
+
+Jobs live in SQLite (%APPDATA%/ExpressAutomation/jobs.sqlite3 by default), so
+templates queued while Express was busy are still there after a restart; jobs
+that were running when the process died go back to the queue on open.
+
+  - one queued job per file: repeated events for the same path merge into it (matched on
+    path_key, the normcased absolute path; `path` keeps the file's own spelling for callers)
+    (events counter goes up, queue position is kept, mtime/rows are refreshed)
+  - next job = fewest rows first (shortest job first), ties in arrival order;
+    a job waiting longer than `max_wait` goes ahead of everything so big
+    templates cannot starve
+  - claim_matching() takes the queued jobs of one batch at once (e.g. same
+    company/year), release() puts jobs a batch did not start back in the queue
+  - depth / wait time / service time go to a JSON metrics file after every change
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from processed_registry import APP_DIR
+
+DEFAULT_DB = APP_DIR / "jobs.sqlite3"
+DEFAULT_METRICS = APP_DIR / "queue_metrics.json"
+
+SJF_MAX_WAIT_SECONDS = 600.0   # after this, FIFO beats shortest-job-first
+METRICS_WINDOW = 200           # finished jobs used for wait/service percentiles
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    path        TEXT    NOT NULL,          -- absolute path as given (original case)
+    path_key    TEXT,                      -- os.path.normcase(path): one queued job per file
+    name        TEXT    NOT NULL,
+    mtime       REAL,
+    rows        INTEGER,
+    events      INTEGER NOT NULL DEFAULT 1,
+    state       TEXT    NOT NULL,          -- queued | running | done | failed | gone
+    enqueued_at REAL    NOT NULL,
+    started_at  REAL,
+    finished_at REAL,
+    error       TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs(state, rows, id);
+"""
+
+_INDEXES = """
+DROP INDEX IF EXISTS jobs_one_queued;
+CREATE UNIQUE INDEX IF NOT EXISTS jobs_one_queued_key ON jobs(path_key) WHERE state = 'queued';
+"""
+
+
+def _percentile(values, q: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    k = min(len(values) - 1, max(0, int(round(q * (len(values) - 1)))))
+    return values[k]
+
+
+class JobQueue:
+    def __init__(self, db_path: Path = DEFAULT_DB, metrics_path: Optional[Path] = DEFAULT_METRICS,
+                 max_wait: float = SJF_MAX_WAIT_SECONDS):
+        db_path = Path(db_path)
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = db_path
+        self.metrics_path = Path(metrics_path) if metrics_path else None
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        columns = {r[1] for r in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "path_key" not in columns:
+            # older queue files stored the normcased path in `path`
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN path_key TEXT")
+            self._conn.execute("UPDATE jobs SET path_key = path")
+        self._conn.executescript(_INDEXES)
+        with self._lock:
+            # crash/restart while running: run it again (the registry guards against double entry),
+            # unless a newer job for the same file is already queued
+            self._conn.execute(
+                "UPDATE jobs SET state='failed', finished_at=?, error='interrupted; newer job queued' "
+                "WHERE state='running' AND path_key IN (SELECT path_key FROM jobs WHERE state='queued')",
+                (time.time(),),
+            )
+            cur = self._conn.execute("UPDATE jobs SET state='queued', started_at=NULL WHERE state='running'")
+            self.recovered = cur.rowcount
+        self._write_metrics()
+
+    @staticmethod
+    def _key(p: Path) -> str:
+        return os.path.normcase(str(Path(p).resolve()))
+
+    # ---- producer side ----
+    def coalesce(self, p: Path, mtime: Optional[float] = None) -> bool:
+        """Merge an event into a queued job for the same file if it is unchanged; True if merged."""
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE jobs SET events = events + 1 WHERE state='queued' AND path_key=? AND (? IS NULL OR mtime=?)",
+                (self._key(p), mtime, mtime),
+            )
+        return cur.rowcount > 0
+
+    def enqueue(self, p: Path, rows: Optional[int] = None, mtime: Optional[float] = None,
+                name: Optional[str] = None) -> int:
+        """Queue a job for `p` (or refresh the one already queued); returns the job id. name defaults to p.name."""
+        p = Path(p).resolve()
+        key = self._key(p)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT id FROM jobs WHERE state='queued' AND path_key=?", (key,)).fetchone()
+            if row:
+                job_id = row[0]
+                self._conn.execute("UPDATE jobs SET events = events + 1, path=?, rows=?, mtime=?, name=? WHERE id=?",
+                                   (str(p), rows, mtime, name or p.name, job_id))
+            else:
+                job_id = self._conn.execute(
+                    "INSERT INTO jobs (path, path_key, name, mtime, rows, state, enqueued_at) "
+                    "VALUES (?, ?, ?, ?, ?, 'queued', ?)",
+                    (str(p), key, name or p.name, mtime, rows, now),
+                ).lastrowid
+        self._wakeup.set()
+        self._write_metrics()
+        return job_id
+
+    # ---- consumer side ----
+    def claim(self, timeout: Optional[float] = None) -> Optional[dict]:
+        """Take the next job (state -> running); waits up to `timeout` seconds, None if nothing came."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            self._wakeup.clear()
+            job = self._claim_next()
+            if job is not None:
+                self._write_metrics()
+                return job
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return None
+            self._wakeup.wait(remaining)
+
+    def _claim_next(self) -> Optional[dict]:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id, path, name, mtime, rows, events, enqueued_at FROM jobs WHERE state='queued' "
+                    "ORDER BY (enqueued_at <= ?) DESC, "
+                    "CASE WHEN enqueued_at <= ? THEN enqueued_at END, "
+                    "rows IS NULL, rows, id LIMIT 1",
+                    (now - self.max_wait, now - self.max_wait),
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute("UPDATE jobs SET state='running', started_at=? WHERE id=?", (now, row[0]))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        keys = ("id", "path", "name", "mtime", "rows", "events", "enqueued_at")
+        job = dict(zip(keys, row))
+        job["wait"] = now - job["enqueued_at"]
+        return job
+
+    def claim_matching(self, match, limit: Optional[int] = None) -> list:
+        """Take every queued job whose file name satisfies match(name), in claim order (for batches)."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT id, path, name, mtime, rows, events, enqueued_at FROM jobs WHERE state='queued' "
+                    "ORDER BY rows IS NULL, rows, id"
+                ).fetchall()
+                rows = [r for r in rows if match(r[2])][:limit]
+                self._conn.executemany("UPDATE jobs SET state='running', started_at=? WHERE id=?",
+                                       [(now, r[0]) for r in rows])
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        keys = ("id", "path", "name", "mtime", "rows", "events", "enqueued_at")
+        jobs = [dict(zip(keys, r)) for r in rows]
+        for job in jobs:
+            job["wait"] = now - job["enqueued_at"]
+        if jobs:
+            self._write_metrics()
+        return jobs
+
+    def release(self, job_id: int) -> None:
+        """Put a claimed job back in the queue (not started, e.g. its batch stopped early)."""
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE jobs SET state='queued', started_at=NULL WHERE id=? AND state='running' "
+                "AND path_key NOT IN (SELECT path_key FROM jobs WHERE state='queued')", (job_id,))
+            if cur.rowcount == 0:
+                self._conn.execute("UPDATE jobs SET state='failed', finished_at=?, error='released; newer job queued' "
+                                   "WHERE id=? AND state='running'", (time.time(), job_id))
+        self._wakeup.set()
+        self._write_metrics()
+
+    def finish(self, job_id: int, state: str = "done", error: Optional[str] = None) -> None:
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET state=?, finished_at=?, error=? WHERE id=?",
+                               (state, time.time(), error, job_id))
+        self._write_metrics()
+
+    # ---- metrics ----
+    def depth(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jobs WHERE state='queued'").fetchone()[0]
+
+    def metrics(self) -> dict:
+        now = time.time()
+        with self._lock:
+            depth, oldest = self._conn.execute(
+                "SELECT COUNT(*), MIN(enqueued_at) FROM jobs WHERE state='queued'").fetchone()
+            running = self._conn.execute("SELECT COUNT(*) FROM jobs WHERE state='running'").fetchone()[0]
+            recent = self._conn.execute(
+                "SELECT started_at - enqueued_at, finished_at - started_at, state, events FROM jobs "
+                "WHERE finished_at IS NOT NULL AND started_at IS NOT NULL ORDER BY id DESC LIMIT ?",
+                (METRICS_WINDOW,),
+            ).fetchall()
+            totals = dict(self._conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+        waits = [r[0] for r in recent]
+        services = [r[1] for r in recent if r[2] == "done"]
+        return {
+            "updated_at": now,
+            "depth": depth,
+            "running": running,
+            "oldest_queued_age_s": (now - oldest) if oldest else 0.0,
+            "wait_s": {"p50": _percentile(waits, 0.5), "p95": _percentile(waits, 0.95), "n": len(waits)},
+            "service_s": {"p50": _percentile(services, 0.5), "p95": _percentile(services, 0.95),
+                          "n": len(services)},
+            "events_merged": sum(r[3] - 1 for r in recent),
+            "totals": totals,
+        }
+
+    def report(self) -> str:
+        m = self.metrics()
+
+        def fmt(v):
+            return "-" if v is None else f"{v:.1f}s"
+
+        return (f"[QUEUE] depth={m['depth']} running={m['running']} "
+                f"wait p50={fmt(m['wait_s']['p50'])} p95={fmt(m['wait_s']['p95'])} "
+                f"service p50={fmt(m['service_s']['p50'])} p95={fmt(m['service_s']['p95'])}")
+
+    def _write_metrics(self) -> None:
+        if not self.metrics_path:
+            return
+        try:
+            tmp = self.metrics_path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(self.metrics(), indent=2), encoding="utf-8")
+            os.replace(tmp, self.metrics_path)
+        except OSError as e:
+            print(f"[WARN] Could not write queue metrics: {e}")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -1,14 +1,25 @@
+import os
 import time
 import re
-import pandas as pd
+import importlib
 from pathlib import Path
-from typing import Optional, Tuple, Dict
+from typing import TYPE_CHECKING, Optional, Tuple, Dict
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
-from tkinter import messagebox, Tk
 import threading
 import shutil
 
+import file_ready
+import express_timing
+from processed_registry import LRUCache, ProcessedRegistry
+from job_queue import JobQueue
+
+# pandas/openpyxl (express_template), tkinter and the GUI automation stack (express_launcher:
+# pyautogui, keyring, opencv) are imported lazily / pre-warmed in the background, so the
+# watcher is observing before they have loaded
+if TYPE_CHECKING:
+    from express_template import TemplateData
+
 # ========================
 # CONFIG
 # ========================
@@ -20,8 +31,24 @@ PROCESSED_FOLDER.mkdir(parents=True, exist_ok=True)
 
 EXPECTED_COLUMNS = ["Dept", "Date", "Supplier", "Invoice", "Code", "Qty", "UnitCost"]
 
-# ดีบ๊าวน์รวมไฟล์ (กัน spam เล็กน้อย แม้เรามี RUN_LOCK แล้ว)
+# ดีบ๊าวน์การตรวจ schema (กัน popup ซ้ำ); event ของไฟล์ที่อยู่ในคิวแล้วจะถูกรวมเป็น job เดียว
 MIN_INTERVAL_SECONDS = 5.0
+DEBOUNCE_CACHE_SIZE = 1024   # จำนวน path ที่จำเวลา debounce ไว้ในหน่วยความจำ
+
+# Polling fallback: back off while the folder is idle
+POLL_MAX_INTERVAL = 15.0
+POLL_BACKOFF = 1.5
+POLL_REPORT_EVERY = 30   # idle cycles between scan-cost reports
+
+# โหลดโมดูลหนัก ๆ ล่วงหน้าใน background หลังเริ่ม watch (EXPRESS_PREWARM=0 เพื่อปิด)
+PREWARM = os.getenv("EXPRESS_PREWARM", "1") != "0"
+PREWARM_MODULES = ("express_template", "express_launcher")
+
+# รวมไฟล์ของบริษัท/ปีเดียวกันที่เข้าคิวภายในช่วงเวลานี้ เป็นชุดเดียว (Express session เดียว); 0 = ปิด
+BATCH_WINDOW_SECONDS = float(os.getenv("EXPRESS_BATCH_WINDOW", "2.0"))
+# หยุดรอเมื่อไม่มีไฟล์ใหม่ของชุดเข้ามานานเท่านี้ (ไม่มีไฟล์รออยู่เลย = เริ่มทันที)
+BATCH_GAP_SECONDS = float(os.getenv("EXPRESS_BATCH_GAP", "0.5"))
+BATCH_MAX_JOBS = 20
 
 RE_FILENAME = re.compile(r"^([A-Za-z]+)-(\d{4})(?:-[A-Za-z0-9._-]+)?$", re.IGNORECASE)
 
@@ -30,6 +57,7 @@ RE_FILENAME = re.compile(r"^([A-Za-z]+)-(\d{4})(?:-[A-Za-z0-9._-]+)?$", re.IGNOR
 # ========================
 def show_popup(title: str, message: str):
     try:
+        from tkinter import messagebox, Tk
         root = Tk()
         root.withdraw()
         messagebox.showinfo(title, message)
@@ -41,21 +69,8 @@ def show_popup(title: str, message: str):
 # Utils
 # ========================
 def wait_file_ready(path: Path, timeout=10, interval=0.2) -> bool:
-    start = time.time()
-    last_size = -1
-    while time.time() - start < timeout:
-        if not path.exists():
-            return False
-        try:
-            size = path.stat().st_size
-            if size == last_size:
-                with path.open("rb"):
-                    return True
-            last_size = size
-        except Exception:
-            pass
-        time.sleep(interval)
-    return False
+    """Template is ready once it has been quiet for `interval` seconds and opens (see file_ready)."""
+    return file_ready.wait_file_ready(path, timeout=timeout, stable_seconds=interval, max_interval=interval)
 
 def is_excel_file(path: Path) -> bool:
     return path.suffix.lower() in (".xlsx", ".xls")
@@ -68,13 +83,20 @@ def parse_filename_for_search_key(filename_no_ext: str):
     year = m.group(2)
     return company, year, f"{company}{year}"
 
-def validate_excel_schema(path: Path) -> bool:
+def validate_excel_schema(path: Path, info: Optional[dict] = None) -> bool:
+    """`info` (optional dict) receives {"rows": approx data rows or None, "mtime": ...}."""
     try:
         if not wait_file_ready(path):
             show_popup("⚠️ File Busy", f"File '{path.name}' is not ready to read yet.")
             return False
-        df = pd.read_excel(path)
-        missing = [c for c in EXPECTED_COLUMNS if c not in df.columns]
+        from express_template import missing_columns, read_template_header
+        # อ่านแค่แถว header (openpyxl read-only) ไม่ต้องโหลดทั้งไฟล์
+        with express_timing.span("validate_header", file=path.name):
+            columns, rows = read_template_header(path)
+        if info is not None:
+            info["rows"] = rows
+            info["mtime"] = path.stat().st_mtime
+        missing = missing_columns(columns, EXPECTED_COLUMNS)
         if missing:
             show_popup("❌ Template Error", f"Missing columns: {', '.join(missing)}")
             return False
@@ -86,12 +108,26 @@ def validate_excel_schema(path: Path) -> bool:
         show_popup("❌ Read Error", f"Cannot read '{path.name}'\nError: {e}")
         return False
 
+def load_template_or_popup(path: Path) -> Optional["TemplateData"]:
+    """Parse + normalize the template once; the result goes all the way to process_excel_to_express."""
+    from express_template import load_template
+    try:
+        template = load_template(path)
+    except PermissionError:
+        show_popup("⚠️ File Locked", f"Cannot read '{path.name}'. Please close the file and try again.")
+        return None
+    except Exception as e:
+        show_popup("❌ Read Error", f"Cannot read '{path.name}'\nError: {e}")
+        return None
+    print(f"[INFO] Parsed {path.name}: {template.rows} rows in {template.parse_seconds:.2f}s")
+    return template
+
 # ========================
-# Debounce & processed registry & run-lock
+# Debounce & processed registry & job queue
 # ========================
-_last_run: Dict[str, float] = {}
-_processed_by_mtime: Dict[str, float] = {}   # key=abs path, value=last mtime processed
-RUN_LOCK = threading.Lock()                  # กันยิงซ้อนระหว่างกำลังรัน
+_last_run = LRUCache(DEBOUNCE_CACHE_SIZE)   # key=abs path, value=last run time (bounded)
+REGISTRY = ProcessedRegistry()               # ไฟล์ที่กรอกแล้ว (SQLite, อยู่รอดหลัง restart)
+JOBS = JobQueue()                            # คิวงาน Express (SQLite, อยู่รอดหลัง restart); worker เดียวรันทีละไฟล์
 
 def should_run_now(p: Path, min_interval=MIN_INTERVAL_SECONDS) -> bool:
     key = str(p.resolve())
@@ -99,95 +135,52 @@ def should_run_now(p: Path, min_interval=MIN_INTERVAL_SECONDS) -> bool:
     last = _last_run.get(key, 0.0)
     if (now - last) < min_interval:
         return False
-    _last_run[key] = now
+    _last_run.put(key, now)
     return True
 
-def already_processed(p: Path) -> bool:
-    key = str(p.resolve())
-    try:
-        mtime = p.stat().st_mtime
-    except FileNotFoundError:
-        return False
-    last_m = _processed_by_mtime.get(key)
-    if last_m is not None and abs(last_m - mtime) < 1e-6:
-        return True
-    return False
+def already_processed(p: Path, mtime: Optional[float] = None) -> bool:
+    return REGISTRY.is_processed(p, mtime=mtime)
 
 def mark_processed(p: Path):
-    key = str(p.resolve())
-    try:
-        _processed_by_mtime[key] = p.stat().st_mtime
-    except FileNotFoundError:
-        pass
+    REGISTRY.mark(p)
 
 # ========================
 # Handler
 # ========================
 class ExcelHandler(FileSystemEventHandler):
-    def _maybe_process(self, p: Path, event_name: str):
+    def _maybe_process(self, p: Path, event_name: str) -> bool:
+        """True when the file is taken care of (queued, merged into a queued job, already processed)."""
         if not is_excel_file(p):
-            return
+            return False
 
         # ข้ามถ้าประมวลผลไฟล์นี้ (mtime เดิม) ไปแล้ว
         if already_processed(p):
-            print(f"[SKIP] already processed (mtime same): {p.name}")
-            return
+            print(f"[SKIP] already processed (registry: same file or content): {p.name}")
+            return True
+
+        # อยู่ในคิวแล้ว (ไฟล์ไม่เปลี่ยน) -> รวม event เข้ากับ job เดิม
+        try:
+            mtime = p.stat().st_mtime
+        except FileNotFoundError:
+            return False
+        if JOBS.coalesce(p, mtime):
+            print(f"[QUEUE] merged {event_name} event into queued job: {p.name}")
+            return True
 
         # กัน spam เบื้องต้น
         if not should_run_now(p):
             print(f"[SKIP] too frequent: {p.name}")
-            return
+            return False
 
         print(f"[EVENT:{event_name}] {p}")
 
-        if not validate_excel_schema(p):
-            return
-
-        company, year, search_key = parse_filename_for_search_key(p.stem)
-        if search_key:
-            print(f"[INFO] Parsed search_key from filename: {search_key}")
-        else:
-            show_popup(
-                "ℹ️ Filename Hint",
-                "Recommended pattern is COMPANY-YYYY-<anything>.xlsx\n"
-                "Example: EDS-2025-RR.xlsx  → search_key = EDS2025\n"
-                f"Received: {p.name}"
-            )
-
-        # ---- RUN LOCK: ถ้ากำลังรันอยู่ ให้ข้ามครั้งนี้ ----
-        if not RUN_LOCK.acquire(blocking=False):
-            print("[SKIP] Workflow is already running. This event will be ignored.")
-            return
-
-        try:
-            # เรียก workflow
-            print(f"[DONE] Sending function with parameters: file_path={p}, search_key={search_key}")
-            try:
-                from express_launcher import run_full_workflow
-                print(f"[INFO] Launching workflow for template {p.name} with search_key={search_key}")
-                run_full_workflow(file_path=str(p), search_key=search_key)
-                print(f"[INFO] Workflow finished for {p.name}")
-            except TypeError:
-                from express_launcher import run_full_workflow
-                run_full_workflow()
-
-            # ทำเครื่องหมายว่าไฟล์นี้ (mtime นี้) ถูกประมวลผลแล้ว
-            mark_processed(p)
-
-            # ย้ายไฟล์เข้าโฟลเดอร์ processed/ เพื่อกัน event ซ้ำในอนาคต
-            target = PROCESSED_FOLDER / p.name
-            try:
-                # ถ้าซ้ำชื่อ ให้เติม timestamp
-                if target.exists():
-                    ts = time.strftime("%Y%m%d-%H%M%S")
-                    target = PROCESSED_FOLDER / f"{p.stem}-{ts}{p.suffix}"
-                shutil.move(str(p), str(target))
-                print(f"[INFO] Moved processed file to: {target}")
-            except Exception as e:
-                print(f"[WARN] Could not move file to processed/: {e}")
+        info = {}
+        if not validate_excel_schema(p, info):
+            return False
 
-        finally:
-            RUN_LOCK.release()
+        job_id = JOBS.enqueue(p, rows=info.get("rows"), mtime=info.get("mtime"))
+        print(f"[QUEUE] job #{job_id} {p.name} rows~{info.get('rows')} (depth={JOBS.depth()})")
+        return True
 
     def on_created(self, event):
         if not event.is_directory:
@@ -202,30 +195,276 @@ class ExcelHandler(FileSystemEventHandler):
         if not event.is_directory:
             self._maybe_process(Path(event.dest_path), "moved")
 
+# ========================
+# Workflow worker (คิวเดียว รันทีละ job)
+# ========================
+def prepare_job(p: Path) -> tuple:
+    """Checks before a queued template is entered: (state, None) when it should not run, (None, template) otherwise."""
+    if not p.exists():
+        print(f"[SKIP] queued file is gone: {p.name}")
+        return "gone", None
+    if already_processed(p):
+        print(f"[SKIP] already processed (registry: same file or content): {p.name}")
+        return "done", None
+    with express_timing.span("ready_wait"):
+        ready = wait_file_ready(p)
+    if not ready:
+        show_popup("⚠️ File Busy", f"File '{p.name}' is not ready to read yet.")
+        return "failed", None
+
+    template = load_template_or_popup(p)
+    if template is None:
+        return "failed", None
+    return None, template
+
+def finish_file(p: Path):
+    # ทำเครื่องหมายว่าไฟล์นี้ (mtime นี้) ถูกประมวลผลแล้ว
+    mark_processed(p)
+
+    # ย้ายไฟล์เข้าโฟลเดอร์ processed/ เพื่อกัน event ซ้ำในอนาคต
+    target = PROCESSED_FOLDER / p.name
+    try:
+        # ถ้าซ้ำชื่อ ให้เติม timestamp
+        if target.exists():
+            ts = time.strftime("%Y%m%d-%H%M%S")
+            target = PROCESSED_FOLDER / f"{p.stem}-{ts}{p.suffix}"
+        shutil.move(str(p), str(target))
+        print(f"[INFO] Moved processed file to: {target}")
+    except Exception as e:
+        print(f"[WARN] Could not move file to processed/: {e}")
+
+def run_job(p: Path):
+    """Run the Express workflow for one queued template; returns the final job state."""
+    state, template = prepare_job(p)
+    if state is not None:
+        return state
+
+    company, year, search_key = parse_filename_for_search_key(p.stem)
+    if search_key:
+        print(f"[INFO] Parsed search_key from filename: {search_key}")
+    else:
+        show_popup(
+            "ℹ️ Filename Hint",
+            "Recommended pattern is COMPANY-YYYY-<anything>.xlsx\n"
+            "Example: EDS-2025-RR.xlsx  → search_key = EDS2025\n"
+            f"Received: {p.name}"
+        )
+
+    # เรียก workflow
+    print(f"[DONE] Sending function with parameters: file_path={p}, search_key={search_key}")
+    try:
+        from express_launcher import run_full_workflow
+        print(f"[INFO] Launching workflow for template {p.name} with search_key={search_key}")
+        result = run_full_workflow(file_path=str(p), search_key=search_key, template=template)
+        print(f"[INFO] Workflow finished for {p.name}")
+    except TypeError:
+        from express_launcher import run_full_workflow
+        result = run_full_workflow()
+
+    # ยังไม่ได้กรอก (คีย์บอร์ดไม่ใช่ EN / เปิดหน้าจอไม่ได้): ไม่บันทึก ไม่ย้าย -> วางไฟล์ใหม่เพื่อลองอีกครั้ง
+    if result is None:
+        print(f"[WARN] {p.name} was not entered; left in {WATCH_FOLDER.name}/ (drop it again to retry)")
+        return "failed"
+    finish_file(p)
+    return "done"
+
+# ========================
+# Batches: templates of one company/year in one Express session
+# ========================
+def batch_key(name: str) -> Optional[str]:
+    return parse_filename_for_search_key(Path(name).stem)[2]
+
+def collect_batch(first: dict) -> list:
+    """
+    The claimed job plus the queued jobs with the same search_key. Returns at once when none is
+    queued; otherwise keeps collecting while more arrive (at most BATCH_GAP_SECONDS apart,
+    BATCH_WINDOW_SECONDS in total).
+    """
+    key = batch_key(first["name"])
+    jobs = [first]
+    if not key or BATCH_WINDOW_SECONDS <= 0:
+        return jobs
+    deadline = time.monotonic() + BATCH_WINDOW_SECONDS
+    quiet_until = None
+    while len(jobs) < BATCH_MAX_JOBS:
+        claimed = JOBS.claim_matching(lambda name: batch_key(name) == key, limit=BATCH_MAX_JOBS - len(jobs))
+        now = time.monotonic()
+        if claimed:
+            jobs += claimed
+            quiet_until = now + BATCH_GAP_SECONDS
+        elif quiet_until is None:
+            break   # ไม่มีไฟล์ของชุดนี้รออยู่ -> ไม่ต้องรอ
+        remaining = min(deadline, quiet_until) - now
+        if remaining <= 0:
+            break
+        time.sleep(min(0.1, remaining))
+    return jobs
+
+def run_batch(jobs: list):
+    """Run a group of same-search_key jobs through express_launcher.run_batch_workflow."""
+    search_key = batch_key(jobs[0]["name"])
+    print(f"[BATCH] {search_key}: {len(jobs)} templates -> " + ", ".join(j["name"] for j in jobs))
+    ready = []
+    for job in jobs:
+        p = Path(job["path"])
+        try:
+            state, template = prepare_job(p)
+        except Exception as e:
+            print(f"[ERROR] Could not prepare {job['name']}: {e}")
+            state, template = "failed", None
+        if template is None:
+            JOBS.finish(job["id"], state)
+        else:
+            ready.append((job, p, template))
+    if not ready:
+        return
+
+    pending = {job["id"] for job, _, _ in ready}
+
+    def on_done(i, result, error):
+        job, p, _ = ready[i]
+        pending.discard(job["id"])
+        if error is not None or result is None:
+            JOBS.finish(job["id"], "failed", error or "not entered")
+            return
+        finish_file(p)
+        JOBS.finish(job["id"], "done")
+
+    try:
+        from express_launcher import run_batch_workflow
+        run_batch_workflow([(str(p), template) for _, p, template in ready], search_key, on_done=on_done)
+    except Exception as e:
+        print(f"[ERROR] Batch {search_key} stopped: {e}")
+    finally:
+        # ไฟล์ที่ยังไม่ได้เริ่ม กลับเข้าคิว (รอบถัดไปเริ่ม session ใหม่)
+        for job_id in pending:
+            JOBS.release(job_id)
+        if pending:
+            print(f"[BATCH] {len(pending)} templates returned to the queue")
+
+def workflow_worker():
+    """Single consumer of JOBS: Express can only run one workflow at a time."""
+    while True:
+        job = JOBS.claim()
+        jobs = collect_batch(job)
+        t0 = time.perf_counter()
+        if len(jobs) > 1:
+            run_batch(jobs)
+            print(f"[QUEUE] batch of {len(jobs)} jobs finished in {time.perf_counter() - t0:.1f}s")
+            print(JOBS.report())
+            continue
+        p = Path(job["path"])
+        print(f"[QUEUE] start job #{job['id']} {job['name']} rows~{job['rows']} "
+              f"events={job['events']} waited {job['wait']:.1f}s")
+        state, error = "failed", None
+        try:
+            with express_timing.run(job["name"]):
+                state = run_job(p)
+        except Exception as e:
+            error = repr(e)
+            print(f"[ERROR] Workflow failed for {job['name']}: {e}")
+        finally:
+            JOBS.finish(job["id"], state, error)
+        print(f"[QUEUE] job #{job['id']} {state} in {time.perf_counter() - t0:.1f}s")
+        print(JOBS.report())
+
+# ========================
+# Background pre-warm of heavy modules
+# ========================
+PREWARMED = threading.Event()
+
+def prewarm(modules=PREWARM_MODULES):
+    """Import the automation modules off the main thread so the first job does not pay for them."""
+    t0 = time.perf_counter()
+    timings = []
+    for name in modules:
+        t = time.perf_counter()
+        try:
+            importlib.import_module(name)
+            timings.append(f"{name} {time.perf_counter() - t:.2f}s")
+        except Exception as e:
+            # ไม่เป็นไร: job แรกจะ import เองอีกครั้งและแสดง error ตามปกติ
+            timings.append(f"{name} FAILED ({e})")
+    # ภาพ anchor (cv2 + template ที่ย่อ/ขยายไว้แล้ว) โหลดครั้งเดียวตรงนี้
+    t = time.perf_counter()
+    try:
+        importlib.import_module("express_anchors").get_locator()
+        timings.append(f"anchors {time.perf_counter() - t:.2f}s")
+    except Exception as e:
+        timings.append(f"anchors FAILED ({e})")
+    PREWARMED.set()
+    print(f"[PREWARM] ready in {time.perf_counter() - t0:.2f}s: {', '.join(timings)}")
+
 # ========================
 # Polling fallback (scans folder periodically)
 # ========================
-def poll_folder(handler: ExcelHandler, interval: float = 2.0):
+class FolderSnapshot:
     """
-    Periodically scan WATCH_FOLDER for excel files and call handler._maybe_process
-    This is a fallback in case filesystem events are missed.
+    Index of a folder built with os.scandir: name -> (size, mtime, inode).
+    scan() rescans and returns only what changed since the previous scan, so callers
+    don't stat/resolve every file each cycle (scandir already carries the stat data).
     """
+
+    def __init__(self, folder: Path):
+        self.folder = folder
+        self.entries: Dict[str, Tuple[int, float, int]] = {}
+
+    def scan(self) -> Tuple[Dict[str, Tuple[int, float, int]], list]:
+        current: Dict[str, Tuple[int, float, int]] = {}
+        with os.scandir(self.folder) as it:
+            for entry in it:
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                st = entry.stat(follow_symlinks=False)
+                # DirEntry.inode() costs an extra stat on Windows; size+mtime are enough there
+                inode = entry.inode() if os.name != "nt" else 0
+                current[entry.name] = (st.st_size, st.st_mtime, inode)
+        changed = {n: sig for n, sig in current.items() if self.entries.get(n) != sig}
+        removed = [n for n in self.entries if n not in current]
+        self.entries = current
+        return changed, removed
+
+    def forget(self, name: str) -> None:
+        """Drop `name` from the index so the next scan reports it as changed again."""
+        self.entries.pop(name, None)
+
+def poll_folder(handler: ExcelHandler, interval: float = 2.0, max_interval: float = POLL_MAX_INTERVAL):
+    """
+    Fallback in case filesystem events are missed: rescan WATCH_FOLDER with a snapshot
+    index and hand new/changed excel files to handler._maybe_process. Files it did not
+    queue (too frequent, busy, bad schema, error) are handed over again every cycle. The interval
+    backs off (up to max_interval) while the folder is idle and resets on any change.
+    Scan cost is reported on changes and every POLL_REPORT_EVERY cycles.
+    """
+    snapshot = FolderSnapshot(WATCH_FOLDER)
+    delay = interval
+    cycles = 0
     while True:
         try:
-            for f in WATCH_FOLDER.iterdir():
+            t0 = time.perf_counter()
+            changed, removed = snapshot.scan()
+            scan_ms = (time.perf_counter() - t0) * 1000
+            cycles += 1
+
+            for name, (_size, mtime, _inode) in changed.items():
+                f = WATCH_FOLDER / name
                 try:
-                    if not f.is_file():
-                        continue
-                    if not is_excel_file(f):
+                    if not is_excel_file(f) or already_processed(f, mtime=mtime):
                         continue
-                    # if not already processed and not too frequent -> call handler
-                    if not already_processed(f) and should_run_now(f):
-                        print(f"[POLL] detected file -> {f.name}")
-                        # call same internal handler (event_name 'polled')
-                        handler._maybe_process(f, "polled")
+                    print(f"[POLL] detected file -> {f.name}")
+                    # call same internal handler (event_name 'polled'); it applies the debounce
+                    if not handler._maybe_process(f, "polled"):
+                        # ยังไม่ได้เข้าคิว -> ลองใหม่รอบถัดไป แม้ไฟล์จะไม่เปลี่ยน
+                        snapshot.forget(name)
                 except Exception as e:
                     print(f"[POLL ERROR] checking {f}: {e}")
-            time.sleep(interval)
+                    snapshot.forget(name)
+
+            delay = interval if (changed or removed) else min(max_interval, delay * POLL_BACKOFF)
+            if changed or removed or cycles % POLL_REPORT_EVERY == 0:
+                print(f"[POLL] scan {scan_ms:.1f}ms entries={len(snapshot.entries)} "
+                      f"changed={len(changed)} removed={len(removed)} next={delay:.1f}s")
+            time.sleep(delay)
         except Exception as e:
             print(f"[POLL ERROR] {e}")
             time.sleep(interval)
@@ -234,11 +473,22 @@ def poll_folder(handler: ExcelHandler, interval: float = 2.0):
 # Main
 # ========================
 if __name__ == "__main__":
-    print(f"[WATCHING] {WATCH_FOLDER}")
+    print(f"[REGISTRY] {REGISTRY.db_path} opened in {REGISTRY.open_ms:.1f}ms "
+          f"(~{REGISTRY.approx_records()} records)")
+    print(f"[QUEUE] {JOBS.db_path} depth={JOBS.depth()} recovered={JOBS.recovered} "
+          f"metrics -> {JOBS.metrics_path}")
     observer = Observer()
     handler = ExcelHandler()
     observer.schedule(handler, str(WATCH_FOLDER), recursive=False)
     observer.start()
+    print(f"[WATCHING] {WATCH_FOLDER}")
+
+    if PREWARM:
+        threading.Thread(target=prewarm, name="prewarm", daemon=True).start()
+
+    # worker เดียวสำหรับรัน workflow ตามคิว
+    worker = threading.Thread(target=workflow_worker, daemon=True)
+    worker.start()
 
     # start poller thread as fallback
     poller = threading.Thread(target=poll_folder, args=(handler,), daemon=True)
@@ -0,0 +1,164 @@
+"""
+Persistent registry of templates that were already typed into Express.
+
+Records live in SQLite (%APPDATA%/ExpressAutomation/processed.sqlite3 by default)
+keyed by path + mtime + content hash, so a restart or crash does not make the
+watcher re-enter templates still sitting in excel_templates/. A file counts as
+processed when the same path+mtime was recorded, or when a file with the same
+content (SHA-256) was recorded under any name within the last
+HASH_WINDOW_HOURS (EXPRESS_REGISTRY_HASH_HOURS, default 24): a duplicate drop
+or a restored copy is skipped, while the same content submitted again later
+is entered again. Only templates that were actually typed get recorded
+(main.finish_file), so a run that stopped early can be retried.
+
+Nothing is loaded up front: lookups go to indexed queries, with a small LRU in
+front of them, so opening the registry takes milliseconds whatever its size.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+APP_DIR = Path(os.getenv("APPDATA", str(Path.home()))) / "ExpressAutomation"
+DEFAULT_DB = APP_DIR / "processed.sqlite3"
+HASH_WINDOW_HOURS = float(os.getenv("EXPRESS_REGISTRY_HASH_HOURS", "24"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS processed (
+    path         TEXT    NOT NULL,
+    mtime_us     INTEGER NOT NULL,
+    content_hash TEXT    NOT NULL,
+    size         INTEGER NOT NULL,
+    processed_at REAL    NOT NULL,
+    PRIMARY KEY (path, mtime_us, content_hash)
+);
+CREATE INDEX IF NOT EXISTS processed_hash ON processed(content_hash);
+"""
+
+
+class LRUCache:
+    """Bounded dict: least recently used keys are dropped beyond maxsize."""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._data: "OrderedDict" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+def file_sha256(path: Path, block: int = 1024 * 1024) -> str:
+    h = hashlib.sha256()
+    with Path(path).open("rb") as f:
+        for chunk in iter(lambda: f.read(block), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _mtime_us(mtime: float) -> int:
+    return int(round(mtime * 1_000_000))
+
+
+class ProcessedRegistry:
+    def __init__(self, db_path: Path = DEFAULT_DB, cache_size: int = 1024,
+                 hash_window_hours: float = HASH_WINDOW_HOURS):
+        t0 = time.perf_counter()
+        self.hash_window = hash_window_hours * 3600
+        db_path = Path(db_path)
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        # (path, mtime_us) -> (processed?, content hash or None)
+        self._cache = LRUCache(cache_size)
+        self.open_ms = (time.perf_counter() - t0) * 1000
+
+    @staticmethod
+    def _key(p: Path) -> str:
+        return os.path.normcase(str(Path(p).resolve()))
+
+    def approx_records(self) -> int:
+        with self._lock:
+            row = self._conn.execute("SELECT MAX(rowid) FROM processed").fetchone()
+        return row[0] or 0
+
+    def _hash_for(self, p: Path, cached) -> str:
+        if cached and cached[1]:
+            return cached[1]
+        return file_sha256(p)
+
+    def is_processed(self, p: Path, mtime: Optional[float] = None) -> bool:
+        p = Path(p)
+        if mtime is None:
+            try:
+                mtime = p.stat().st_mtime
+            except FileNotFoundError:
+                return False
+        path_key = self._key(p)
+        key = (path_key, _mtime_us(mtime))
+        cached = self._cache.get(key)
+        if cached is not None and cached[0]:
+            return True
+
+        with self._lock:
+            hit = self._conn.execute("SELECT 1 FROM processed WHERE path=? AND mtime_us=? LIMIT 1", key).fetchone()
+        if hit:
+            self._cache.put(key, (True, None))
+            return True
+
+        # same content recorded recently under another name/mtime (e.g. restored after a crash)?
+        if self.hash_window <= 0:
+            return False
+        try:
+            digest = self._hash_for(p, cached)
+        except FileNotFoundError:
+            return False
+        with self._lock:
+            hit = self._conn.execute("SELECT 1 FROM processed WHERE content_hash=? AND processed_at>=? LIMIT 1",
+                                     (digest, time.time() - self.hash_window)).fetchone()
+        # keep the digest only: a hash hit expires with the window, so it is looked up again next time
+        self._cache.put(key, (False, digest))
+        return bool(hit)
+
+    def mark(self, p: Path) -> None:
+        p = Path(p)
+        try:
+            st = p.stat()
+        except FileNotFoundError:
+            return
+        key = (self._key(p), _mtime_us(st.st_mtime))
+        digest = self._hash_for(p, self._cache.get(key))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO processed (path, mtime_us, content_hash, size, processed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key[0], key[1], digest, st.st_size, time.time()),
+            )
+        self._cache.put(key, (True, digest))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
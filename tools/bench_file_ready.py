@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+tools/bench_file_ready.py
+
+Measure how long each readiness strategy takes to notice that a writer has finished:
+latency = time processing could start - time the writer closed the file.
+
+Strategies:
+  legacy-converter  old converter loop (size stable for 1.0s, 0.5s sleeps)
+  legacy-main       old main.py loop (same size twice, 0.2s sleeps)
+  shared-converter  src/file_ready.py with the converter's settings (inotify where available)
+  shared-main       src/file_ready.py with main.py's settings
+  shared-*-poll     same, forced to adaptive polling (what non-Linux machines get)
+
+Then every shared strategy is run against a writer that keeps the file's mtime an hour in
+the past (a server clock behind ours, or a copier keeping the source mtime): it must not
+call the file ready before the writer closed it.
+
+Run:
+    python tools/bench_file_ready.py --trials 5
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+import file_ready  # noqa: E402
+
+
+def legacy_converter_wait(path: Path, timeout=20.0) -> bool:
+    start = time.time()
+    last_size = -1
+    stable_since = None
+    while time.time() - start < timeout:
+        if not path.exists():
+            return False
+        try:
+            size = path.stat().st_size
+        except Exception:
+            size = -1
+        now = time.time()
+        if size == last_size:
+            if stable_since is None:
+                stable_since = now
+            elif now - stable_since >= 1.0:
+                return True
+        else:
+            stable_since = None
+        last_size = size
+        time.sleep(0.5)
+    return False
+
+
+def legacy_main_wait(path: Path, timeout=10, interval=0.2) -> bool:
+    start = time.time()
+    last_size = -1
+    while time.time() - start < timeout:
+        if not path.exists():
+            return False
+        try:
+            size = path.stat().st_size
+            if size == last_size:
+                with path.open("rb"):
+                    return True
+            last_size = size
+        except Exception:
+            pass
+        time.sleep(interval)
+    return False
+
+
+STRATEGIES = {
+    "legacy-converter": legacy_converter_wait,
+    "legacy-main": legacy_main_wait,
+    "shared-converter": lambda p: file_ready.wait_file_ready(p, timeout=20.0, stable_seconds=1.0, max_interval=0.5),
+    "shared-main": lambda p: file_ready.wait_file_ready(p, timeout=10, stable_seconds=0.2, max_interval=0.2),
+    "shared-converter-poll": lambda p: file_ready.wait_file_ready(p, timeout=20.0, stable_seconds=1.0,
+                                                                  max_interval=0.5, use_inotify=False),
+    "shared-main-poll": lambda p: file_ready.wait_file_ready(p, timeout=10, stable_seconds=0.2,
+                                                             max_interval=0.2, use_inotify=False),
+}
+
+
+def one_trial(folder: Path, wait_fn, chunks: int, chunk_bytes: int, gap: float,
+              mtime_offset: float = 0.0) -> float:
+    """Writer streams chunks then closes; the waiter starts when the file appears (like a created event)."""
+    path = folder / f"bench-{time.monotonic_ns()}.xlsx"
+    closed = {}
+    f = path.open("wb")
+
+    def writer():
+        for _ in range(chunks):
+            f.write(b"x" * chunk_bytes)
+            f.flush()
+            if mtime_offset:
+                os.utime(path, (time.time() + mtime_offset,) * 2)
+            time.sleep(gap)
+        f.close()
+        closed["t"] = time.monotonic()
+
+    t = threading.Thread(target=writer)
+    t.start()
+    ok = wait_fn(path)
+    ready_at = time.monotonic()
+    t.join()
+    path.unlink()
+    if not ok:
+        raise RuntimeError("file never became ready")
+    return ready_at - closed["t"]
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark write-completion -> processing-start latency")
+    ap.add_argument("--trials", type=int, default=5)
+    ap.add_argument("--chunks", type=int, default=10, help="writes per file")
+    ap.add_argument("--chunk-bytes", type=int, default=64 * 1024)
+    ap.add_argument("--gap", type=float, default=0.05, help="seconds between writes")
+    ap.add_argument("--only", nargs="+", choices=sorted(STRATEGIES), default=list(STRATEGIES))
+    args = ap.parse_args(argv)
+
+    print(f"[BENCH] inotify available: {file_ready.inotify_available()}")
+    print(f"{'strategy':<22} | {'median s':>8} | {'min s':>6} | {'max s':>6}")
+    print("-" * 52)
+    with tempfile.TemporaryDirectory() as d:
+        for name in args.only:
+            lat = [one_trial(Path(d), STRATEGIES[name], args.chunks, args.chunk_bytes, args.gap)
+                   for _ in range(args.trials)]
+            print(f"{name:<22} | {statistics.median(lat):>8.3f} | {min(lat):>6.3f} | {max(lat):>6.3f}")
+
+        print()
+        print(f"{'mtime 1h behind':<22} | {'median s':>8} | {'min s':>6} | result")
+        print("-" * 52)
+        early = 0
+        for name in (n for n in args.only if n.startswith("shared")):
+            lat = [one_trial(Path(d), STRATEGIES[name], args.chunks, args.chunk_bytes, args.gap, mtime_offset=-3600)
+                   for _ in range(args.trials)]
+            early += min(lat) < 0
+            print(f"{name:<22} | {statistics.median(lat):>8.3f} | {min(lat):>6.3f} | "
+                  f"{'EARLY (ready while still written)' if min(lat) < 0 else 'ok'}")
+    return 1 if early else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+tools/bench_html_reader.py
+
+Equivalence checks and throughput benchmark for tools/html_table_reader.py against
+pd.read_html(header=0)[0] (needs lxml, or bs4 + html5lib, for the reference side).
+
+Run:
+    python tools/bench_html_reader.py --check              # equivalence cases only
+    python tools/bench_html_reader.py --rows 100000        # synthetic export benchmark
+    python tools/bench_html_reader.py --check --rows 100000
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from html_table_reader import iter_first_table_rows, read_first_html_table  # noqa: E402
+
+HEAD = '<html><head><meta http-equiv=Content-Type content="text/html; charset=utf-8"></head><body>'
+TAIL = "</body></html>"
+
+# (name, html) pairs; each must give the same frame as pd.read_html(header=0)[0]
+CASES = [
+    ("basic", "<table><tr><td>A</td><td>B</td></tr><tr><td>1</td><td>x</td></tr></table>"),
+    ("th header", "<table><tr><th>A</th><th>B</th></tr><tr><td>1</td><td>2</td></tr></table>"),
+    ("thead/tbody", "<table><thead><tr><th>A</th><th>B</th></tr></thead>"
+                    "<tbody><tr><td>1</td><td>2</td></tr><tr><td>3</td><td>4</td></tr></tbody></table>"),
+    ("thousands + decimals", "<table><tr><td>Amount</td><td>Qty</td></tr>"
+                             "<tr><td>1,234.50</td><td>1,000</td></tr><tr><td>12.00</td><td>3</td></tr></table>"),
+    ("leading zeros as text", "<table><tr><td>Ship-to-Branch-Code</td><td>Local Invoice No</td></tr>"
+                              "<tr><td>0002198490</td><td>IV-001</td></tr></table>"),
+    ("blank cells -> NaN", "<table><tr><td>A</td><td>B</td></tr><tr><td></td><td> </td></tr>"
+                           "<tr><td>x</td><td>NA</td></tr></table>"),
+    ("whitespace and <br>", "<table><tr><td> Invoice\n  No </td><td>B</td></tr>"
+                            "<tr><td>a<br>b</td><td>c   d</td></tr></table>"),
+    ("entities", "<table><tr><td>A&amp;B</td><td>C</td></tr><tr><td>&lt;1&gt;</td><td>&#3585;</td></tr></table>"),
+    ("colspan", "<table><tr><td colspan=2>AB</td><td>C</td></tr><tr><td>1</td><td>2</td><td>3</td></tr></table>"),
+    ("rowspan", "<table><tr><td>A</td><td>B</td></tr><tr><td rowspan=2>x</td><td>1</td></tr>"
+                "<tr><td>2</td></tr></table>"),
+    ("trailing rowspan", "<table><tr><td>A</td><td>B</td></tr><tr><td rowspan=3>x</td><td>1</td></tr></table>"),
+    ("ragged rows", "<table><tr><td>A</td><td>B</td><td>C</td></tr><tr><td>1</td></tr></table>"),
+    ("duplicate headers", "<table><tr><td>A</td><td>A</td></tr><tr><td>1</td><td>2</td></tr></table>"),
+    ("hidden cells", '<table><tr><td>A</td><td style="display:none">H</td><td>B</td></tr>'
+                     '<tr><td>1</td><td style="display: none">h</td><td>2</td></tr></table>'),
+    ("nested table text", "<table><tr><td>A</td><td>B</td></tr>"
+                          "<tr><td><table><tr><td>in</td></tr></table></td><td>2</td></tr></table>"),
+    ("only first table", "<table><tr><td>A</td></tr><tr><td>1</td></tr></table>"
+                         "<table><tr><td>Z</td></tr><tr><td>9</td></tr></table>"),
+    ("thai text", "<table><tr><td>ชื่อ</td><td>B</td></tr><tr><td>สาขา กรุงเทพ</td><td>1</td></tr></table>"),
+    ("comments", "<!--[if gte mso 9]><xml><table><tr><td>no</td></tr></table></xml><![endif]-->"
+                 "<table><tr><td>A</td><!-- <td>x</td> --><td>B</td></tr><tr><td>1</td><td>2</td></tr></table>"),
+    ("upper-case tags", "<TABLE><TR><TD>A</TD><TD>B</TD></TR><TR><TD>1</TD><td>2</td></TR></TABLE>"),
+    ("quoted > in attribute", '<table><tr><td title="a>b">A</td><td>B</td></tr>'
+                              '<tr><td class=\'x>y\'>1</td><td>2</td></tr></table>'),
+    ("implicit closes", "<table><tr><td>A<td>B<tr><td>1<td>2</table>"),
+]
+
+EXPORT_COLUMNS = ["Ship-to-Branch-Code", "Ship-to-Branch-Name", "Invoice Date", "Local Invoice No",
+                  "Invoice No", "Amount"]
+BRANCHES = ["0002198490", "0006093962", "0005785271", "0002266232", "0004374861"]
+
+
+def write_html(path: Path, body: str) -> Path:
+    path.write_text(HEAD + body + TAIL, encoding="utf-8")
+    return path
+
+
+def run_checks(tmp: Path) -> int:
+    try:
+        pd.read_html(write_html(tmp / "probe.htm", CASES[0][1]), header=0)
+    except ImportError as e:
+        print(f"[CHECK] skipped: pd.read_html unavailable ({e})")
+        return 0
+
+    failures = 0
+    for i, (name, body) in enumerate(CASES):
+        path = write_html(tmp / f"case{i}.htm", body)
+        expected = pd.read_html(path, header=0)[0]
+        try:
+            got = read_first_html_table(path)
+            pd.testing.assert_frame_equal(got, expected)
+            # tags and comments cut at every block boundary (after the 4 KB sniffed head) give the same rows
+            padded = write_html(tmp / f"case{i}-padded.htm", " " * 4096 + body)
+            assert list(iter_first_table_rows(padded, block_bytes=7)) == list(iter_first_table_rows(path)), \
+                "rows differ with 7-byte blocks"
+            print(f"[CHECK:OK]   {name}")
+        except AssertionError as e:
+            failures += 1
+            print(f"[CHECK:FAIL] {name}\n{e}\n-- got --\n{got}\n-- expected --\n{expected}")
+    print(f"[CHECK] {len(CASES) - failures}/{len(CASES)} cases equal to pd.read_html")
+    return failures
+
+
+def write_synthetic_export(path: Path, rows: int) -> Path:
+    """Portal-style HTML export: one big table followed by a small summary table."""
+    with path.open("w", encoding="utf-8") as f:
+        f.write(HEAD + "<table border=1>\n<tr>")
+        f.write("".join(f"<td>{c}</td>" for c in EXPORT_COLUMNS))
+        f.write("</tr>\n")
+        for i in range(rows):
+            code = BRANCHES[i % len(BRANCHES)]
+            f.write(f"<tr><td>{code}</td><td>สาขา {i % 5}</td><td>202511{1 + i % 28:02d}</td>"
+                    f"<td>IV{i:09d}</td><td>{i:09d}</td><td>{(i % 9000) + 1:,}.25</td></tr>\n")
+        f.write("</table>\n<table><tr><td>Total</td></tr><tr><td>0</td></tr></table>" + TAIL)
+    return path
+
+
+def run_bench(tmp: Path, rows: int, repeat: int) -> None:
+    path = write_synthetic_export(tmp / f"export_{rows}.htm", rows)
+    size_mb = path.stat().st_size / (1024 * 1024)
+    print(f"[BENCH] synthetic export: {rows} rows, {size_mb:.1f} MB")
+
+    readers = [("html_table_reader", read_first_html_table),
+               ("pd.read_html", lambda p: pd.read_html(p, header=0)[0])]
+    results = {}
+    for name, fn in readers:
+        best = None
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            try:
+                df = fn(path)
+            except ImportError as e:
+                print(f"[BENCH] {name}: skipped ({e})")
+                break
+            dt = time.perf_counter() - t0
+            best = dt if best is None else min(best, dt)
+        if best is not None:
+            results[name] = (best, df)
+            print(f"[BENCH] {name:<18} {best:7.2f}s  {rows / best:9.0f} rows/s  {size_mb / best:6.1f} MB/s")
+
+    if len(results) == 2:
+        ours, ref = results["html_table_reader"], results["pd.read_html"]
+        same = ours[1].equals(ref[1]) and list(ours[1].columns) == list(ref[1].columns)
+        print(f"[BENCH] speed-up x{ref[0] / ours[0]:.1f}; frames equal: {same}")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="html_table_reader equivalence checks and benchmark")
+    ap.add_argument("--check", action="store_true", help="run equivalence cases against pd.read_html")
+    ap.add_argument("--rows", type=int, default=None, help="benchmark with a synthetic export of N rows")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args(argv)
+    if not args.check and args.rows is None:
+        args.check, args.rows = True, 100_000
+
+    failures = 0
+    with tempfile.TemporaryDirectory() as d:
+        tmp = Path(d)
+        if args.check:
+            failures = run_checks(tmp)
+        if args.rows:
+            run_bench(tmp, args.rows, args.repeat)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+tools/bench_screen_wait.py
+
+Drives src/express_screen.py with synthetic frame sequences on a simulated clock, so the
+screen-state waits can be checked on Linux without a display or Express:
+
+  fast_login      login window appears at 0.8s (launch_ui, settle 1.0s, fixed sleep 3.0s)
+  slow_splash     splash with a spinner 0.3-4.2s, login window after it (fixed 3.0s is too early;
+                  launch waits keep their 30s timeout, so this one is allowed to take longer)
+  dialog_noise    dialog at 0.4s while a caret blinks and the taskbar clock ticks (settle 0.3s)
+  field_update    1024x768 window, one 200x20 field changes by 100 gray levels at 0.15s
+                  (an in-row wait, fixed sleep 0.6s)
+  caret_only      1024x768 window where only the caret blinks: must not count as a change
+  never_ready     nothing changes: must time out at the fixed sleep, not later
+  no_capture      no frame source: sleeps the fixed fallback
+  capture_breaks  the grabber fails after a few frames: sleeps the rest of the fallback
+  hash_match      waits for a stored average hash of the entry screen
+  template_match  cv2.matchTemplate on the OK button (skipped without opencv)
+
+Each case reports when the UI was really ready, when the wait returned, the old fixed sleep
+and the time saved. A case fails if the wait returned before the UI was ready or later than
+ready + settle + 2 frames, or (nothing to wait for) later than its timeout. Apart from the launch
+cases the timeout is the fixed sleep, as in wait_screen_settled(), so no wait costs more than the
+sleep it replaced. Exit code 1 if any case fails. Needs numpy (opencv optional).
+
+Run:
+    python tools/bench_screen_wait.py
+    python tools/bench_screen_wait.py --interval 0.1
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+os.environ.setdefault("EXPRESS_TIMING", "0")   # no span files from a benchmark
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+import numpy as np  # noqa: E402
+
+import express_screen  # noqa: E402
+
+W, H = 320, 240
+
+
+class FakeClock:
+    """time.monotonic / time.sleep replacement: sleeping only advances the clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def clock(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += max(0.0, seconds)
+
+
+# =========================
+# Synthetic screens
+# =========================
+def desktop() -> np.ndarray:
+    img = np.tile(np.linspace(40, 90, W, dtype=np.float32), (H, 1))
+    img[-16:, :] = 25                     # taskbar
+    return img
+
+
+def draw_login(img: np.ndarray) -> np.ndarray:
+    img = img.copy()
+    img[60:180, 80:240] = 225             # window
+    img[60:76, 80:240] = 60               # title bar
+    img[100:112, 120:220] = 255           # username
+    img[124:136, 120:220] = 255           # password
+    img[150:166, 180:228] = 150           # OK button
+    img[154:162, 192:216] = 30
+    return img
+
+
+def draw_dialog(img: np.ndarray) -> np.ndarray:
+    img = img.copy()
+    img[40:200, 40:280] = 235
+    img[40:56, 40:280] = 70
+    for y in range(70, 190, 14):          # grid lines of the entry screen
+        img[y, 48:272] = 120
+    return img
+
+
+def draw_splash(img: np.ndarray, t: float) -> np.ndarray:
+    img = img.copy()
+    img[70:170, 90:230] = 180
+    img[100:140, 140:180] = 255                               # spinner: dark quadrant turns 8x/s
+    q = int(t * 8) % 4
+    y, x = 100 + 20 * (q // 2), 140 + 20 * (q % 2 if q // 2 == 0 else 1 - q % 2)
+    img[y:y + 20, x:x + 20] = 0
+    img[150:158, 100:100 + int(120 * min(1.0, t / 4.0))] = 60  # progress bar
+    return img
+
+
+def big_window() -> np.ndarray:
+    """Maximized 1024x768 entry window with one 200x20 field."""
+    img = np.full((768, 1024), 235, dtype=np.float32)
+    img[:30, :] = 70
+    img[300:320, 400:600] = 255
+    return img
+
+
+def with_caret(img: np.ndarray, t: float) -> np.ndarray:
+    """2x16 caret in the field, blinking at 2 Hz."""
+    img = img.copy()
+    if int(t * 2) % 2 == 0:
+        img[302:318, 402:404] = 0
+    return img
+
+
+def with_noise(img: np.ndarray, t: float) -> np.ndarray:
+    """Blinking caret (2 Hz) and a taskbar clock that changes every second."""
+    img = img.copy()
+    if int(t * 2) % 2 == 0:
+        img[102:110, 124] = 0
+    digit = int(t) % 10
+    img[-12:-4, W - 30:W - 30 + 2 * digit + 2] = 200
+    return img
+
+
+# =========================
+# Cases
+# =========================
+def case_fast_login(t):
+    return draw_login(desktop()) if t >= 0.8 else desktop()
+
+
+def case_slow_splash(t):
+    if t < 0.3:
+        return desktop()
+    if t < 4.2:
+        return draw_splash(desktop(), t - 0.3)
+    return draw_login(desktop())
+
+
+def case_dialog_noise(t):
+    return with_noise(draw_dialog(desktop()) if t >= 0.4 else desktop(), t)
+
+
+def case_field_update(t):
+    img = big_window()
+    if t >= 0.15:
+        img[300:320, 400:600] = 155
+    return img
+
+
+def case_caret_only(t):
+    return with_caret(big_window(), t)
+
+
+def case_never_ready(t):
+    return desktop()
+
+
+CASES = [
+    # name, frames(t), ready at, settle, fixed sleep, timeout (launch: 30s, otherwise the fixed sleep)
+    ("fast_login", case_fast_login, 0.8, 1.0, 3.0, 30.0),
+    ("slow_splash", case_slow_splash, 4.2, 1.0, 3.0, 30.0),
+    ("dialog_noise", case_dialog_noise, 0.4, 0.3, 1.5, 1.5),
+    ("field_update", case_field_update, 0.15, 0.3, 0.6, 0.6),
+    ("caret_only", case_caret_only, None, 0.3, 0.8, 0.8),
+    ("never_ready", case_never_ready, None, 0.3, 0.8, 0.8),
+]
+
+
+def run_settled(frames, settle, fallback, timeout, interval):
+    fake = FakeClock()
+    baseline = express_screen.downscale(frames(0.0))
+    cond = express_screen.ScreenSettled(baseline=baseline, settle=settle)
+    return express_screen.wait_until(cond, timeout=timeout, fallback=fallback, label="bench",
+                                     source=lambda region: frames(fake.now),
+                                     interval=interval, clock=fake.clock, sleep=fake.sleep)
+
+
+def judge(result, ready, settle, interval, timeout):
+    if ready is None:
+        return result["method"] == "timeout" and result["seconds"] <= timeout + interval
+    return result["method"] == "screen" and ready <= result["seconds"] <= ready + settle + 2 * interval
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--interval", type=float, default=express_screen.POLL_INTERVAL, help="seconds between frames")
+    args = ap.parse_args(argv)
+
+    rows = []
+    for name, frames, ready, settle, fallback, timeout in CASES:
+        res = run_settled(frames, settle, fallback, timeout, args.interval)
+        rows.append((name, res, ready, fallback, judge(res, ready, settle, args.interval, timeout)))
+
+    # no frame source at all -> fixed sleep
+    fake = FakeClock()
+    express_screen.set_source(None)
+    res = express_screen.wait_until(express_screen.ScreenSettled(), timeout=0.8, fallback=0.8, label="bench",
+                                    clock=fake.clock, sleep=fake.sleep)
+    rows.append(("no_capture", res, None, 0.8, res["method"] == "fixed" and fake.now == 0.8))
+
+    # grabber breaks after 3 frames -> rest of the fallback
+    fake = FakeClock()
+    calls = {"n": 0}
+
+    def breaking(region):
+        calls["n"] += 1
+        if calls["n"] > 3:
+            raise OSError("screen locked")
+        return desktop()
+
+    res = express_screen.wait_until(express_screen.ScreenSettled(baseline=express_screen.downscale(desktop())),
+                                    timeout=0.8, fallback=0.8, label="bench", source=breaking,
+                                    interval=args.interval, clock=fake.clock, sleep=fake.sleep)
+    rows.append(("capture_breaks", res, None, 0.8, res["method"] == "fixed" and abs(fake.now - 0.8) < 1e-9))
+
+    # stored hash of the entry screen (caret / clock noise must stay within max_bits)
+    fake = FakeClock()
+    reference = express_screen.average_hash(draw_dialog(desktop()))
+    res = express_screen.wait_until(express_screen.HashMatches(reference), timeout=1.5, fallback=1.5,
+                                    label="bench", source=lambda region: case_dialog_noise(fake.now),
+                                    interval=args.interval, clock=fake.clock, sleep=fake.sleep)
+    rows.append(("hash_match", res, 0.4, 1.5, judge(res, 0.4, 0.0, args.interval, 1.5)))
+
+    # OK button by template matching
+    try:
+        button = draw_login(desktop())[150:166, 180:228]
+        cond = express_screen.TemplateVisible(button, threshold=0.9)
+    except ImportError:
+        print("[SKIP] template_match: opencv not installed")
+    else:
+        fake = FakeClock()
+        res = express_screen.wait_until(cond, timeout=30.0, fallback=3.0, label="bench",
+                                        source=lambda region: case_fast_login(fake.now),
+                                        interval=args.interval, clock=fake.clock, sleep=fake.sleep)
+        rows.append(("template_match", res, 0.8, 3.0, judge(res, 0.8, 0.0, args.interval, 30.0)))
+
+    print(f"{'case':<15} | {'method':<7} | {'ready s':>7} | {'waited s':>8} | {'frames':>6} | "
+          f"{'fixed s':>7} | {'saved s':>7} | result")
+    print("-" * 88)
+    failed = 0
+    for name, res, ready, fallback, ok in rows:
+        failed += not ok
+        ready_s = "-" if ready is None else f"{ready:.2f}"
+        note = "" if ready is None or fallback >= ready else " (fixed sleep too early)"
+        print(f"{name:<15} | {res['method']:<7} | {ready_s:>7} | {res['seconds']:>8.2f} | {res['frames']:>6} | "
+              f"{fallback:>7.2f} | {round(fallback - res['seconds'], 2) + 0.0:>7.2f} | {'ok' if ok else 'FAIL'}{note}")
+    print(f"[BENCH] {len(rows) - failed}/{len(rows)} cases ok")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+tools/bench_startup.py
+
+Startup and first-job latency of the template watcher (src/main.py):
+  1. `python -X importtime -c "import main"`: total import time and the heaviest modules
+  2. wall time from process start to "[WATCHING]" and to "[PREWARM] ready"
+  3. time to first job: a template is dropped into excel_templates/ after "[WATCHING]";
+     measured until the workflow is called, with and without background pre-warming
+
+Runs against a throwaway copy of the project (own excel_templates/, APPDATA), and the copy's
+express_launcher only imports the real module (paying its full import cost) and reports the
+call instead of driving Express. Needs the project's requirements installed.
+
+Run:
+    python tools/bench_startup.py
+    python tools/bench_startup.py --trials 3 --drop-after 2 --rows 500
+"""
+
+import argparse
+import os
+import queue
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SRC_DIR = PROJECT_ROOT / "src"
+
+TEMPLATE_COLUMNS = ["Dept", "Date", "Supplier", "Invoice", "Code", "Qty", "UnitCost"]
+
+LAUNCHER_SHIM = '''\
+# bench_startup.py: real import cost, no GUI automation
+from _express_launcher_real import *  # noqa: F401,F403
+
+
+def run_full_workflow(file_path=None, search_key=None, express_path=None, template=None):
+    print(f"[BENCH] workflow reached: {file_path} rows={getattr(template, 'rows', None)}", flush=True)
+'''
+
+_RE_IMPORTTIME = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def make_sandbox(root: Path) -> Path:
+    """Copy src/ into root/src with the launcher shim; returns the src dir."""
+    src = root / "src"
+    src.mkdir(parents=True)
+    for f in SRC_DIR.glob("*.py"):
+        shutil.copy2(f, src / f.name)
+    shutil.move(str(src / "express_launcher.py"), str(src / "_express_launcher_real.py"))
+    (src / "express_launcher.py").write_text(LAUNCHER_SHIM, encoding="utf-8")
+    (root / "appdata").mkdir()
+    return src
+
+
+def sandbox_env(root: Path, prewarm: bool = True) -> dict:
+    env = dict(os.environ)
+    env.update({"APPDATA": str(root / "appdata"), "EXPRESS_PREWARM": "1" if prewarm else "0",
+                "PYTHONDONTWRITEBYTECODE": "1"})
+    return env
+
+
+def write_sample_template(path: Path, rows: int) -> Path:
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Sheet1")
+    ws.append(TEMPLATE_COLUMNS)
+    for i in range(rows):
+        ws.append(["BKK", f"{1 + i % 28:02d}1125", "026959000", f"IV{i:09d}", "001", 1, 100.25 + i])
+    wb.save(path)
+    return path
+
+
+# ---- 1. import time ----
+def import_profile(top: int) -> None:
+    with tempfile.TemporaryDirectory() as d:
+        root = Path(d)
+        src = make_sandbox(root)
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=src,
+                              env=sandbox_env(root), capture_output=True, text=True)
+    entries = []
+    for line in proc.stderr.splitlines():
+        m = _RE_IMPORTTIME.match(line)
+        if m:
+            entries.append((int(m.group(2)), int(m.group(1)), (len(m.group(3)) - 1) // 2, m.group(4)))
+    if proc.returncode != 0:
+        print(f"[IMPORT] import main failed:\n{proc.stderr[-2000:]}")
+        return
+    total = sum(cum for cum, _self, depth, _name in entries if depth == 0)
+    print(f"[IMPORT] import main: {total / 1e6:.3f}s total incl. interpreter startup, {len(entries)} modules")
+    print(f"{'cumulative s':>12} | {'self s':>7} | module")
+    print("-" * 50)
+    for cum, self_us, depth, name in sorted(entries, reverse=True)[:top]:
+        print(f"{cum / 1e6:>12.3f} | {self_us / 1e6:>7.3f} | {'  ' * depth}{name}")
+
+
+# ---- 2 + 3. watcher run ----
+def run_watcher(rows: int, prewarm: bool, drop_after: float, timeout: float) -> dict:
+    """One watcher process: seconds to [WATCHING], [PREWARM] ready, and drop -> workflow call."""
+    markers = {"watching": "[WATCHING]", "prewarm": "[PREWARM] ready", "job": "[BENCH] workflow reached"}
+    seen = {}
+    lines: "queue.Queue[str]" = queue.Queue()
+
+    with tempfile.TemporaryDirectory() as d:
+        root = Path(d)
+        src = make_sandbox(root)
+        sample = write_sample_template(root / "EDS-2025-RR.xlsx", rows)
+        started = time.monotonic()
+        proc = subprocess.Popen([sys.executable, "-u", "main.py"], cwd=src, env=sandbox_env(root, prewarm),
+                                stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+
+        def reader():
+            for line in proc.stdout:
+                now = time.monotonic()
+                for key, marker in markers.items():
+                    if marker in line and key not in seen:
+                        seen[key] = now
+                lines.put(line)
+
+        threading.Thread(target=reader, daemon=True).start()
+        dropped = None
+        try:
+            deadline = started + timeout
+            while time.monotonic() < deadline and "job" not in seen and proc.poll() is None:
+                if dropped is None and "watching" in seen and time.monotonic() >= seen["watching"] + drop_after:
+                    os.replace(sample, root / "excel_templates" / sample.name)
+                    dropped = time.monotonic()
+                time.sleep(0.01)
+        finally:
+            proc.terminate()
+            try:
+                proc.wait(5)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+    if "job" not in seen:
+        output = "".join(lines.queue)
+        raise RuntimeError(f"watcher never reached the workflow (prewarm={prewarm}):\n{output[-2000:]}")
+    return {
+        "watching": seen["watching"] - started,
+        "prewarm": (seen["prewarm"] - started) if "prewarm" in seen else None,
+        "first_job": seen["job"] - dropped,
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Watcher startup / first-job benchmark")
+    ap.add_argument("--trials", type=int, default=3)
+    ap.add_argument("--rows", type=int, default=200, help="rows in the dropped template")
+    ap.add_argument("--drop-after", type=float, default=3.0,
+                    help="seconds after [WATCHING] before the template is dropped")
+    ap.add_argument("--timeout", type=float, default=120.0)
+    ap.add_argument("--top", type=int, default=15, help="heaviest imports to list")
+    args = ap.parse_args(argv)
+
+    import_profile(args.top)
+    print()
+    print(f"{'prewarm':<8} | {'to WATCHING s':>13} | {'to PREWARM s':>12} | {'first job s':>11}")
+    print("-" * 55)
+    for prewarm in (False, True):
+        runs = [run_watcher(args.rows, prewarm, args.drop_after, args.timeout) for _ in range(args.trials)]
+        watching = statistics.median(r["watching"] for r in runs)
+        warm = [r["prewarm"] for r in runs if r["prewarm"] is not None]
+        warm_s = f"{statistics.median(warm):>12.2f}" if warm else f"{'-':>12}"
+        first = statistics.median(r["first_job"] for r in runs)
+        print(f"{'on' if prewarm else 'off':<8} | {watching:>13.2f} | {warm_s} | {first:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+tools/bench_template_writer.py
+
+Compare the old template write path (DataFrame.to_excel, engine=openpyxl) with the
+streaming TemplateWriter used by convert_and_write: throughput (rows/s) and peak RSS.
+Every (mode, rows) case runs in a fresh subprocess so peak RSS is not shared between cases.
+
+Run:
+    python tools/bench_template_writer.py
+    python tools/bench_template_writer.py --rows 10000 100000 500000 --chunk 5000
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+TOOLS_DIR = Path(__file__).resolve().parent
+DEFAULT_ROWS = (10_000, 100_000, 500_000)
+MODES = ("to_excel", "streaming")
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None if it cannot be measured)."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KB, macOS bytes
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / (1024 * 1024)
+    except ImportError:
+        return None
+
+
+def make_mapped_chunk(start: int, n: int):
+    """Synthetic mapped rows shaped like map_frame_to_template output."""
+    import numpy as np
+    import pandas as pd
+    from export_watcher_converter import BRANCH_MAP, CODE_FIXED, QTY_FIXED, SUPPLIER_FIXED, TEMPLATE_COLUMNS
+
+    idx = np.arange(start, start + n)
+    depts = np.array(list(BRANCH_MAP.values()), dtype=object)
+    return pd.DataFrame({
+        "Dept": depts[idx % len(depts)],
+        "Date": [f"{1 + i % 28:02d}/11/25" for i in idx],
+        "Supplier": SUPPLIER_FIXED,
+        "Invoice": [f"INV{i:09d}" for i in idx],
+        "Code": CODE_FIXED,
+        "Qty": QTY_FIXED,
+        "UnitCost": (idx % 100_000) * 1.25,
+    }, columns=TEMPLATE_COLUMNS)
+
+
+def run_child(mode: str, rows: int, chunk: int) -> dict:
+    sys.path.insert(0, str(TOOLS_DIR))
+    import pandas as pd
+    from export_watcher_converter import TemplateWriter
+
+    with tempfile.TemporaryDirectory() as tmp:
+        target = Path(tmp) / "BENCH-2025-RR.xlsx"
+        rss_before = peak_rss_mb()
+        t0 = time.perf_counter()
+        if mode == "to_excel":
+            # old path: materialize the whole output frame, then to_excel via tmp + move
+            out_df = pd.concat([make_mapped_chunk(s, min(chunk, rows - s)) for s in range(0, rows, chunk)],
+                               ignore_index=True)
+            tmp_path = target.with_suffix(target.suffix + ".tmp")
+            out_df.to_excel(tmp_path, index=False, engine="openpyxl")
+            os.replace(tmp_path, target)
+        else:
+            with TemplateWriter(target) as writer:
+                for s in range(0, rows, chunk):
+                    writer.write_frame(make_mapped_chunk(s, min(chunk, rows - s)))
+        seconds = time.perf_counter() - t0
+        size = target.stat().st_size
+
+    return {"mode": mode, "rows": rows, "seconds": seconds, "rows_per_s": rows / seconds if seconds else 0.0,
+            "peak_rss_mb": peak_rss_mb(), "rss_before_mb": rss_before, "file_mb": size / (1024 * 1024)}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark template write paths")
+    ap.add_argument("--rows", type=int, nargs="+", default=list(DEFAULT_ROWS))
+    ap.add_argument("--chunk", type=int, default=5000, help="rows per mapped chunk")
+    ap.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    ap.add_argument("--child", nargs=2, metavar=("MODE", "ROWS"), help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_child(args.child[0], int(args.child[1]), args.chunk)))
+        return
+
+    results = []
+    for rows in args.rows:
+        for mode in args.modes:
+            cmd = [sys.executable, __file__, "--child", mode, str(rows), "--chunk", str(args.chunk)]
+            proc = subprocess.run(cmd, capture_output=True, text=True)
+            if proc.returncode != 0:
+                print(f"[ERROR] {mode} {rows}: {proc.stderr.strip()}")
+                continue
+            res = json.loads(proc.stdout.strip().splitlines()[-1])
+            results.append(res)
+            print(f"[BENCH] {mode:<9} rows={rows:>7}  {res['seconds']:7.2f}s  "
+                  f"{res['rows_per_s']:9.0f} rows/s  peak_rss={_fmt_mb(res['peak_rss_mb'])}")
+
+    print()
+    print(f"{'rows':>8} | {'mode':<9} | {'seconds':>8} | {'rows/s':>9} | {'peak RSS MB':>11} | {'file MB':>7}")
+    print("-" * 68)
+    for r in results:
+        print(f"{r['rows']:>8} | {r['mode']:<9} | {r['seconds']:>8.2f} | {r['rows_per_s']:>9.0f} | "
+              f"{_fmt_mb(r['peak_rss_mb']):>11} | {r['file_mb']:>7.1f}")
+
+
+def _fmt_mb(v):
+    return "n/a" if v is None else f"{v:.1f}"
+
+
+if __name__ == "__main__":
+    main()
@@ -7,17 +7,29 @@ and save to excel_templates/{COMPANY}-{YEAR}-{SUFFIX}.xlsx after user selects co
 
 Run:
     python tools/export_watcher_converter.py
+    python tools/export_watcher_converter.py watch --pipeline   # type into Express directly, no src/main.py
+    python tools/export_watcher_converter.py batch incoming_exports/ --company EDS --year 2025 --suffix RR
+    python tools/export_watcher_converter.py batch a.xls b.xls --rules converter.rules.json
 """
 
 import os
+import re
+import sys
+import json
 import time
 import shutil
+import fnmatch
+import argparse
 from pathlib import Path
 import threading
+import queue
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 import tkinter as tk
 from tkinter import simpledialog, messagebox
 from datetime import datetime
 
+import numpy as np
 import pandas as pd
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
@@ -26,6 +38,22 @@ from watchdog.events import FileSystemEventHandler
 # Config
 # ---------------------------
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+# shared helpers live in src/ (date_normalizer, ...) and next to this script (html_table_reader)
+SRC_DIR = PROJECT_ROOT / "src"
+TOOLS_DIR = Path(__file__).resolve().parent
+for _p in (SRC_DIR, TOOLS_DIR):
+    if str(_p) not in sys.path:
+        sys.path.insert(0, str(_p))
+
+import file_ready
+from express_profiling import profiled
+from date_normalizer import DateNormalizer
+from html_table_reader import read_first_html_table
+from express_template import TemplateData, normalize_dataframe
+from processed_registry import APP_DIR, ProcessedRegistry
+from job_queue import JobQueue
+
 INCOMING = PROJECT_ROOT / "incoming_exports"
 INCOMING.mkdir(parents=True, exist_ok=True)
 
@@ -37,6 +65,10 @@ TEMPLATE_FOLDER.mkdir(parents=True, exist_ok=True)
 
 TEMPLATE_NAME_DEFAULT = "express_import_template.xlsx"  # fallback
 
+# Pipeline mode: templates are typed straight from memory; the xlsx is only an audit copy,
+# written where src/main.py does not watch (it only looks at excel_templates/ itself)
+AUDIT_FOLDER = TEMPLATE_FOLDER / "processed"
+
 # Mapping for Ship-to-Branch-Code -> Dept
 BRANCH_MAP = {
     "0002198490": "BKK",
@@ -53,56 +85,40 @@ CODE_FIXED = "001"
 QTY_FIXED = 1
 
 # Watcher behavior
-MIN_STABLE_SECONDS = 1.0  # wait for file size to stabilize
-CHECK_INTERVAL = 0.5
+MIN_STABLE_SECONDS = 1.0  # wait for file size to stabilize (inotify close-write on Linux ends this early)
+CHECK_INTERVAL = 0.5      # longest poll interval on platforms without inotify
+
+# Parsed input frames kept between validation and conversion (LRU)
+SHEET_CACHE_MAX_ENTRIES = 4
+
+# Automatic company/year/suffix classification (see load_rules for the table format)
+KNOWN_COMPANIES = ("EDS", "FIX")
+RULES_FILE = PROJECT_ROOT / "converter.rules.json"
+CLASSIFY_MIN_CONFIDENCE = 0.8
+DIALOG_SECONDS_ESTIMATE = 15.0  # used for "saved ~Xs" until real dialog times are measured
+
+# Work queue: events are queued and handled by worker threads
+CONVERTER_WORKERS = 2
+QUEUE_MAX_SIZE = 256
+
+# Streaming read for big .xlsx exports (0 = always stream .xlsx)
+STREAM_READ_MIN_BYTES = 20 * 1024 * 1024
+STREAM_CHUNK_ROWS = 5000
 
 # ---------------------------
 # Utilities
 # ---------------------------
 def wait_file_ready(path: Path, timeout=20.0) -> bool:
-    """Wait until file size is stable for MIN_STABLE_SECONDS within timeout."""
-    start = time.time()
-    last_size = -1
-    stable_since = None
-    while time.time() - start < timeout:
-        if not path.exists():
-            return False
-        try:
-            size = path.stat().st_size
-        except Exception:
-            size = -1
-        now = time.time()
-        if size == last_size:
-            if stable_since is None:
-                stable_since = now
-            elif now - stable_since >= MIN_STABLE_SECONDS:
-                return True
-        else:
-            stable_since = None
-        last_size = size
-        time.sleep(CHECK_INTERVAL)
-    return False
+    """Wait until the export is completely written (size quiet for MIN_STABLE_SECONDS, see file_ready)."""
+    return file_ready.wait_file_ready(path, timeout=timeout, stable_seconds=MIN_STABLE_SECONDS,
+                                      max_interval=CHECK_INTERVAL)
+
+# Invoice Date parser shared by per-row and column-wise mapping (memoized per unique value)
+_DATES = DateNormalizer("ymd")
 
 def parse_yyyymmdd_to_ddmmyy(s):
-    s = str(s).strip()
-    if not s:
-        return ""
-    # Expect either numeric yyyymmdd (8 digits) or other parseable format
-    if s.isdigit() and len(s) == 8:
-        try:
-            dt = datetime.strptime(s, "%Y%m%d")
-            return dt.strftime("%d/%m/%y")
-        except Exception:
-            pass
-    # fallback: try pandas parse
-    try:
-        dt = pd.to_datetime(s, errors="coerce")
-        if not pd.isna(dt):
-            return dt.strftime("%d/%m/%y")
-    except Exception:
-        pass
-    # else return original
-    return s
+    """yyyymmdd (or any pandas-parseable date) -> dd/mm/yy; unparseable values are returned stripped."""
+    return _DATES.normalize_one(s)
 
 def map_row_to_template(row):
     """
@@ -133,16 +149,98 @@ def map_row_to_template(row):
         "UnitCost": unitcost,
     }
 
+# ---------------------------
+# Column-wise mapping (same result as map_row_to_template, whole columns at once)
+# ---------------------------
+def _column_or_blank(df: pd.DataFrame, name: str) -> np.ndarray:
+    """Object array of column values; "" for every row if the column is missing (like row.get)."""
+    if name in df.columns:
+        return df[name].to_numpy(dtype=object)
+    return np.full(len(df), "", dtype=object)
+
+def _to_unitcost(amount: np.ndarray) -> np.ndarray:
+    """
+    Vectorized version of the UnitCost rule in map_row_to_template:
+      - "" stays ""
+      - float(str(x).replace(",", "")) when parseable
+      - otherwise the original value is passed through unchanged
+    """
+    out = amount.copy()
+    todo = ~(amount == "")
+    if not todo.any():
+        return out
+    cleaned = pd.Series(amount[todo], dtype=object).astype(str).str.replace(",", "", regex=False)
+    cleaned = cleaned.to_numpy(dtype=object)
+    raw = amount[todo]
+    try:
+        # object -> float64 calls float() per element, so results are identical to the per-row path
+        out[todo] = cleaned.astype(np.float64)
+        return out
+    except (TypeError, ValueError):
+        pass
+
+    # some cells are unparseable: convert the obviously-numeric ones in bulk, the rest one by one
+    suspect = pd.to_numeric(pd.Series(cleaned), errors="coerce").isna().to_numpy()
+    values = np.empty(len(cleaned), dtype=object)
+    try:
+        values[~suspect] = cleaned[~suspect].astype(np.float64)
+    except (TypeError, ValueError):
+        suspect[:] = True
+    for i in np.flatnonzero(suspect):
+        try:
+            values[i] = float(cleaned[i])
+        except Exception:
+            values[i] = raw[i]
+    out[todo] = values
+    return out
+
+def map_frame_to_template(df_in: pd.DataFrame, date_stats: Counter = None) -> pd.DataFrame:
+    """
+    Column-wise equivalent of mapping every row with map_row_to_template.
+    Expects stripped headers (see convert_and_write). Date path counts go to date_stats when given.
+    """
+    n = len(df_in)
+    if n == 0:
+        return pd.DataFrame([], columns=TEMPLATE_COLUMNS)
+
+    # Dept: BRANCH_MAP lookup on stripped branch code
+    codes = pd.Series(_column_or_blank(df_in, "Ship-to-Branch-Code"), dtype=object).astype(str).str.strip()
+    dept = codes.map(BRANCH_MAP).fillna("").to_numpy(dtype=object)
+
+    # Date
+    dates = pd.Series(_column_or_blank(df_in, "Invoice Date"), dtype=object)
+    date_out = _DATES.normalize(dates, stats=date_stats).to_numpy(dtype=object)
+
+    # Invoice: Local Invoice No if truthy, else Invoice No (same `a or b` semantics as per-row)
+    local = _column_or_blank(df_in, "Local Invoice No")
+    fallback = _column_or_blank(df_in, "Invoice No")
+    invoice = np.where(local.astype(bool), local, fallback)
+    invoice = pd.Series(invoice, dtype=object).astype(str).to_numpy(dtype=object)
+
+    unitcost = _to_unitcost(_column_or_blank(df_in, "Amount"))
+
+    out_df = pd.DataFrame(
+        {
+            "Dept": dept,
+            "Date": date_out,
+            "Supplier": np.full(n, SUPPLIER_FIXED, dtype=object),
+            "Invoice": invoice,
+            "Code": np.full(n, CODE_FIXED, dtype=object),
+            "Qty": np.full(n, QTY_FIXED),
+            "UnitCost": unitcost,
+        },
+        columns=TEMPLATE_COLUMNS,
+    )
+    # match the dtypes pandas infers when building from a list of row dicts
+    return out_df.infer_objects()
+
 # ---------------------------
 # Robust sheet reader
 # ---------------------------
-def read_sheet_from_file(input_path: Path):
+def resolve_sheet_source(input_path: Path) -> Path:
     """
-    Read sheet named 'input' if exists; else read first sheet.
-    Supports:
-      - real .xls/.xlsx (via pandas.read_excel)
-      - HTML-based Excel (sheet001.htm or .xls that is HTML) via pandas.read_html
-      - if input_path is a directory (like LINE download), find .htm/.xls/.xlsx inside
+    Return the file that read_sheet_from_file will actually parse:
+    input_path itself, or for a directory (like LINE download) the .htm/.xls/.xlsx inside.
     """
     # If user passed a directory (e.g., extracted from LINE), try to find a usable file inside
     if input_path.is_dir():
@@ -164,26 +262,35 @@ def read_sheet_from_file(input_path: Path):
                     input_path = excel
                 else:
                     raise FileNotFoundError(f"No usable sheet/html/xls found inside folder: {input_path}")
+    return input_path
 
-    suffix = input_path.suffix.lower()
-
-    # Quick content sniff: check starting bytes to see if file is HTML
+def looks_like_html(input_path: Path) -> bool:
+    """Quick content sniff: check starting bytes to see if file is HTML."""
     try:
         with input_path.open("rb") as f:
             start = f.read(512)
         start_text = start.lstrip()[:10].lower()
-        looks_like_html = b"<html" in start.lower() or start_text.startswith(b'<!doctype') or start_text.startswith(b'<html')
+        return b"<html" in start.lower() or start_text.startswith(b'<!doctype') or start_text.startswith(b'<html')
     except Exception:
-        looks_like_html = False
+        return False
+
+@profiled("read_sheet_from_file")
+def read_sheet_from_file(input_path: Path):
+    """
+    Read sheet named 'input' if exists; else read first sheet.
+    Supports:
+      - real .xls/.xlsx (via pandas.read_excel)
+      - HTML-based Excel (sheet001.htm or .xls that is HTML) via html_table_reader (first table only)
+      - if input_path is a directory (like LINE download), find .htm/.xls/.xlsx inside
+    """
+    input_path = resolve_sheet_source(input_path)
+    suffix = input_path.suffix.lower()
 
     # If it's an HTML file (either .htm/.html or .xls that contains HTML), try read_html
-    if suffix in (".htm", ".html") or looks_like_html:
+    if suffix in (".htm", ".html") or looks_like_html(input_path):
         try:
-            # pandas.read_html returns list of dataframes - take first
-            tables = pd.read_html(input_path, header=0)
-            if not tables:
-                raise ValueError("No tables found in HTML")
-            df = tables[0]
+            # first table only, parsed incrementally (same frame as pd.read_html(header=0)[0])
+            df = read_first_html_table(input_path)
             # normalize headers
             df.columns = [str(c).strip() for c in df.columns]
             return df
@@ -207,40 +314,576 @@ def read_sheet_from_file(input_path: Path):
                            f"Hint: file may be HTML export or corrupt. Try opening in Excel and Save As .xlsx, "
                            f"or provide the extracted sheet (sheet001.htm).")
 
+# ---------------------------
+# Streaming xlsx reader (openpyxl read-only, target sheet only, fixed-size chunks)
+# ---------------------------
+# Strings pandas.read_excel turns into NaN by default (kept in sync with pandas' STR_NA_VALUES)
+_NA_STRINGS = frozenset([
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+])
+
+def _cell_to_str(value):
+    """Cell value as pd.read_excel(dtype=str) would give it (NaN for blanks/NA markers)."""
+    if value is None:
+        return np.nan
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    text = str(value)
+    if text in _NA_STRINGS:
+        return np.nan
+    return text
+
+def _header_names(cells) -> list:
+    """Header row -> column names, with read_excel's 'Unnamed: i' and 'X.1' de-duplication."""
+    names, seen = [], {}
+    for i, v in enumerate(cells):
+        name = f"Unnamed: {i}" if v is None or str(v) == "" else str(v)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        seen.setdefault(name, 0)
+        names.append(name)
+    return names
+
+def use_streaming_read(input_path: Path) -> bool:
+    """Large real .xlsx/.xlsm files are read row by row instead of via pd.read_excel."""
+    try:
+        source = resolve_sheet_source(input_path)
+        if source.suffix.lower() not in (".xlsx", ".xlsm") or looks_like_html(source):
+            return False
+        return source.stat().st_size >= STREAM_READ_MIN_BYTES
+    except Exception:
+        return False
+
+def iter_sheet_chunks(input_path: Path, chunk_rows: int = STREAM_CHUNK_ROWS):
+    """
+    Yield the 'input' sheet (or the first sheet) as DataFrames of at most chunk_rows rows.
+    Only the target sheet is parsed and only one chunk is held at a time, so memory stays
+    flat regardless of file size. Values match pd.read_excel(dtype=str): strings, NaN for blanks.
+    Trailing blank rows are dropped like read_excel does.
+    """
+    from openpyxl import load_workbook
+
+    source = resolve_sheet_source(input_path)
+    try:
+        wb = load_workbook(source, read_only=True, data_only=True, keep_links=False)
+    except Exception as e:
+        raise RuntimeError(f"Failed reading Excel file {source}: {e}")
+    try:
+        ws = wb["input"] if "input" in wb.sheetnames else wb.worksheets[0]
+        rows = ws.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        header = list(header)
+        while header and header[-1] is None:
+            header.pop()
+        columns = _header_names(header)
+        width = len(columns)
+
+        chunk, blanks = [], []
+        for raw in rows:
+            values = [_cell_to_str(v) for v in raw[:width]]
+            values += [np.nan] * (width - len(values))
+            if all(isinstance(v, float) for v in values):
+                # hold blank rows back until we know they are not trailing
+                blanks.append(values)
+                continue
+            if blanks:
+                chunk.extend(blanks)
+                blanks = []
+            chunk.append(values)
+            if len(chunk) >= chunk_rows:
+                yield pd.DataFrame(chunk, columns=columns, dtype=object)
+                chunk = []
+        if chunk:
+            yield pd.DataFrame(chunk, columns=columns, dtype=object)
+    finally:
+        wb.close()
+
+# ---------------------------
+# Parsed-sheet cache (validation read is reused by conversion)
+# ---------------------------
+class SheetCache:
+    """
+    Small LRU of parsed input frames keyed by (resolved file, size, mtime_ns).
+    A file that changes on disk gets a new key, so stale frames are never returned.
+    """
+
+    def __init__(self, max_entries: int = SHEET_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, pd.DataFrame]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(input_path: Path) -> tuple:
+        source = resolve_sheet_source(input_path)
+        st = source.stat()
+        return (str(source.resolve()), st.st_size, st.st_mtime_ns)
+
+    def get(self, input_path: Path) -> pd.DataFrame:
+        """Return the parsed sheet for input_path, reading it only on a miss."""
+        key = self._key(input_path)
+        with self._lock:
+            df = self._entries.get(key)
+            if df is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return df
+            self.misses += 1
+
+        df = read_sheet_from_file(input_path)
+        with self._lock:
+            self._entries[key] = df
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return df
+
+    def discard(self, input_path: Path) -> None:
+        """Drop every cached version of input_path (e.g. after it was moved to processed/)."""
+        try:
+            name = str(resolve_sheet_source(input_path).resolve())
+        except Exception:
+            name = str(Path(input_path).resolve())
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == name]:
+                del self._entries[key]
+
+    def report(self) -> str:
+        return (f"[CACHE] sheets hits={self.hits} misses={self.misses} "
+                f"evictions={self.evictions} size={len(self._entries)}/{self.max_entries}")
+
+_SHEET_CACHE = SheetCache()
+
+def read_sheet_cached(input_path: Path) -> pd.DataFrame:
+    """read_sheet_from_file through the shared parsed-sheet cache."""
+    return _SHEET_CACHE.get(input_path)
+
+# ---------------------------
+# Streaming template writer (openpyxl write-only)
+# ---------------------------
+class TemplateWriter:
+    """
+    Write express templates row by row with an openpyxl write-only workbook, so the
+    full cell model is never held in memory. Rows go to `<target>.tmp`; commit()
+    moves the finished file into place (atomic for the watcher), abort() removes it.
+    The sheet looks like DataFrame.to_excel(index=False): 'Sheet1', bold bordered header.
+
+        with TemplateWriter(target) as w:
+            for chunk in mapped_chunks:
+                w.write_frame(chunk)
+    """
+
+    def __init__(self, target_path: Path, columns=TEMPLATE_COLUMNS):
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Alignment, Border, Font, Side
+
+        self.target_path = Path(target_path)
+        self.tmp_path = self.target_path.with_suffix(self.target_path.suffix + ".tmp")
+        self.columns = list(columns)
+        self.rows_written = 0
+        self._wb = Workbook(write_only=True)
+        self._ws = self._wb.create_sheet("Sheet1")
+
+        thin = Side(style="thin")
+        header = []
+        for name in self.columns:
+            cell = WriteOnlyCell(self._ws, value=name)
+            cell.font = Font(bold=True)
+            cell.border = Border(left=thin, right=thin, top=thin, bottom=thin)
+            cell.alignment = Alignment(horizontal="center", vertical="top")
+            header.append(cell)
+        self._ws.append(header)
+
+    def write_frame(self, df: pd.DataFrame) -> None:
+        """Append a mapped chunk (columns in template order); NaN cells are left empty."""
+        df = df.reindex(columns=self.columns).astype(object)
+        df = df.where(df.notna(), None)
+        append = self._ws.append
+        for row in df.itertuples(index=False, name=None):
+            append(row)
+        self.rows_written += len(df)
+
+    def commit(self) -> Path:
+        self._wb.save(self.tmp_path)
+        # Move tmp → final path to trigger watchdog event
+        shutil.move(str(self.tmp_path), str(self.target_path))
+        return self.target_path
+
+    def abort(self) -> None:
+        try:
+            self.tmp_path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+        return False
+
 # ---------------------------
 # Convert + write
 # ---------------------------
-def convert_and_write(input_path: Path, company_choice: str, year: str, suffix_tag: str) -> Path:
-    # read
-    df_in = read_sheet_from_file(input_path)
-    # normalize headers (strip)
-    df_in.columns = [str(c).strip() for c in df_in.columns]
+_TARGET_LOCKS: dict = {}
+_TARGET_LOCKS_GUARD = threading.Lock()
 
-    # Map rows
-    rows = []
-    for _, r in df_in.iterrows():
-        mapped = map_row_to_template(r)
-        rows.append(mapped)
+def _target_lock(target_path: Path) -> threading.Lock:
+    with _TARGET_LOCKS_GUARD:
+        return _TARGET_LOCKS.setdefault(str(target_path).lower(), threading.Lock())
 
-    out_df = pd.DataFrame(rows, columns=TEMPLATE_COLUMNS)
+def template_path(company_choice: str, year: str, suffix_tag: str) -> Path:
+    """excel_templates/{COMPANY}-{YEAR}-{SUFFIX}.xlsx"""
+    return TEMPLATE_FOLDER / f"{company_choice}-{year}-{suffix_tag}.xlsx"
 
-    # assemble filename
-    filename = f"{company_choice}-{year}-{suffix_tag}.xlsx"
-    target_path = TEMPLATE_FOLDER / filename
+def input_chunks(input_path: Path, df_in: pd.DataFrame = None):
+    """Frames to convert: df_in when given (parsed during validation), streamed chunks for big xlsx, else one frame."""
+    if df_in is not None:
+        return [df_in]
+    if use_streaming_read(input_path):
+        print(f"[INFO] Streaming read ({STREAM_CHUNK_ROWS} rows/chunk): {input_path.name}")
+        return iter_sheet_chunks(input_path)
+    return [read_sheet_cached(input_path)]
 
-    # atomic write: write to tmp first
-    tmp = target_path.with_suffix(target_path.suffix + ".tmp")
-    out_df.to_excel(tmp, index=False, engine="openpyxl")
+def mapped_chunks(chunks, date_stats: Counter = None):
+    """Map rows column-wise (same output as map_row_to_template per row), one chunk at a time."""
+    for chunk in chunks:
+        # normalize headers (strip) without touching the cached frame
+        chunk = chunk.set_axis([str(c).strip() for c in chunk.columns], axis=1)
+        yield map_frame_to_template(chunk, date_stats=date_stats)
 
-    # Move tmp → final path to trigger watchdog event
-    shutil.move(str(tmp), str(target_path))
+def write_template(input_path: Path, target_path: Path, df_in: pd.DataFrame = None) -> int:
+    """Convert input_path (or an already parsed df_in) into target_path; returns rows written."""
+    # Stream mapped chunks into the template; the writer writes to tmp first and moves it
+    # into place on success. Workers writing the same template name take turns on its tmp file.
+    # per-file date counts: _DATES (and its cache) is shared by all converter workers
+    date_stats = Counter()
+    with _target_lock(target_path), TemplateWriter(target_path) as writer:
+        for mapped in mapped_chunks(input_chunks(input_path, df_in), date_stats=date_stats):
+            writer.write_frame(mapped)
+    print(_DATES.report(date_stats))
+    print(f"[INFO] Wrote {writer.rows_written} rows")
+    return writer.rows_written
 
+@profiled("convert_and_write")
+def convert_and_write(input_path: Path, company_choice: str, year: str, suffix_tag: str,
+                      df_in: pd.DataFrame = None) -> Path:
+    target_path = template_path(company_choice, year, suffix_tag)
+    write_template(input_path, target_path, df_in=df_in)
     return target_path
 
+def move_to_processed(path: Path) -> Path:
+    """Move an original export into incoming_exports/processed (timestamped if the name is taken)."""
+    dest = INCOMING_PROCESSED / path.name
+    if dest.exists():
+        ts = datetime.now().strftime("%Y%m%d-%H%M%S")
+        dest = INCOMING_PROCESSED / f"{path.stem}-{ts}{path.suffix}"
+    shutil.move(str(path), str(dest))
+    return dest
+
+# ---------------------------
+# Pipeline mode: converter -> Express entry in one process
+# ---------------------------
+def _template_cell_text(value) -> str:
+    """A mapped cell as pd.read_excel(dtype=str) sees it after the xlsx round trip."""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))  # Excel keeps 100.0 as the number 100
+    return str(value)
+
+def template_from_frame(mapped: pd.DataFrame) -> pd.DataFrame:
+    """
+    Entry-ready frame from a mapped template frame: what read_excel_data() would return
+    for the xlsx TemplateWriter writes from `mapped` (blanks -> '', text cells, normalized).
+    """
+    df = mapped.reindex(columns=TEMPLATE_COLUMNS).astype(object)
+    df = df.where(df.notna(), "")
+    for c in df.columns:
+        df[c] = df[c].map(_template_cell_text)
+    return normalize_dataframe(df)
+
+def audit_path(company_choice: str, year: str, suffix_tag: str) -> Path:
+    """excel_templates/processed/{COMPANY}-{YEAR}-{SUFFIX}.xlsx (timestamped if the name is taken)."""
+    target = AUDIT_FOLDER / template_path(company_choice, year, suffix_tag).name
+    if target.exists():
+        ts = datetime.now().strftime("%Y%m%d-%H%M%S")
+        target = target.with_name(f"{target.stem}-{ts}{target.suffix}")
+    return target
+
+PIPELINE_DB = APP_DIR / "pipeline_jobs.sqlite3"
+PIPELINE_METRICS = APP_DIR / "pipeline_metrics.json"
+
+class EntryPipeline:
+    """
+    Converted frames go straight to the Express workflow (run_full_workflow with a
+    TemplateData) instead of excel_templates/*.xlsx -> src/main.py -> ready-wait -> re-read.
+    One entry thread (Express runs one workflow at a time).
+
+    Entries are durable: each one is a job in a JobQueue of its own (path = the original
+    export, name = the template name COMPANY-YEAR-SUFFIX.xlsx), so after a crash or restart
+    the export is converted again and entered. The original stays in incoming_exports/ until
+    its entry succeeded; only then is it moved to processed/ and the audit xlsx written
+    (background thread) and recorded in the processed registry.
+    """
+
+    def __init__(self, db_path: Path = PIPELINE_DB, metrics_path: Path = PIPELINE_METRICS):
+        AUDIT_FOLDER.mkdir(parents=True, exist_ok=True)
+        self._jobs = JobQueue(db_path, metrics_path=metrics_path)
+        self._frames = {}                     # job id -> (export path, mapped, frame, seconds, detected_at)
+        self._frames_lock = threading.Lock()
+        self._audit = ThreadPoolExecutor(max_workers=1, thread_name_prefix="audit")
+        self._registry = ProcessedRegistry()
+        depth = self._jobs.depth()
+        if depth:
+            print(f"[PIPELINE] {depth} entries still queued from a previous run "
+                  f"(recovered running={self._jobs.recovered})")
+        threading.Thread(target=self._entry_worker, name="express-entry", daemon=True).start()
+
+    @staticmethod
+    def _convert(input_path: Path) -> tuple:
+        """(mapped template frame, entry-ready frame, seconds)."""
+        started = time.monotonic()
+        date_stats = Counter()
+        chunks = list(mapped_chunks(input_chunks(input_path), date_stats=date_stats))
+        mapped = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame([], columns=TEMPLATE_COLUMNS)
+        print(_DATES.report(date_stats))
+        return mapped, template_from_frame(mapped), time.monotonic() - started
+
+    def submit(self, input_path: Path, company: str, year: str, suffix_tag: str, detected_at: float) -> int:
+        """Convert input_path in the calling worker and queue it for entry; returns the row count."""
+        mapped, frame, seconds = self._convert(input_path)
+        name = template_path(company, year, suffix_tag).name
+        with self._frames_lock:
+            job_id = self._jobs.enqueue(input_path, rows=len(frame), mtime=input_path.stat().st_mtime, name=name)
+            self._frames[job_id] = (input_path, mapped, frame, seconds, detected_at)
+        print(f"[PIPELINE] {input_path.name} -> {len(frame)} rows for {company}{year} "
+              f"converted in {seconds:.2f}s (entry queue={self._jobs.depth()})")
+        return len(frame)
+
+    def _write_audit(self, mapped: pd.DataFrame, target: Path) -> None:
+        try:
+            with _target_lock(target), TemplateWriter(target) as writer:
+                writer.write_frame(mapped)
+            # the audit copy must never be typed again if someone drops it into excel_templates/
+            self._registry.mark(target)
+            print(f"[PIPELINE] audit copy written: {target}")
+        except Exception as e:
+            print(f"[WARN] Audit copy not written/recorded for {target.name}: {e}")
+
+    def _enter(self, job: dict, cached) -> str:
+        """Enter one queued export; returns the job state."""
+        path = Path(job["path"])
+        company, year, suffix_tag = Path(job["name"]).stem.split("-", 2)
+        if cached is None:
+            # queued before a restart: the frame is gone, convert the export again
+            if not path.exists():
+                print(f"[SKIP] queued export is gone: {path.name}")
+                return "gone"
+            print(f"[PIPELINE] re-converting {path.name} (queued {job['wait']:.0f}s ago)")
+            mapped, frame, seconds = self._convert(path)
+            since = f"{job['wait']:.1f}s after queueing"
+        else:
+            # same process: the frame converted in submit()
+            path, mapped, frame, seconds, detected_at = cached
+            since = f"{time.monotonic() - detected_at:.2f}s after detection"
+        target = audit_path(company, year, suffix_tag)
+        template = TemplateData(target, frame, mtime=None, parse_seconds=seconds)
+        print(f"[PIPELINE] entry starts {since}: {job['name']} ({path.name})")
+
+        from express_launcher import run_full_workflow  # GUI stack only once entry is needed
+        result = run_full_workflow(file_path=str(target), search_key=f"{company}{year}", template=template)
+        if result is None:
+            print(f"[WARN] {path.name} was not entered; it stays in {INCOMING.name}/ (save or drop it again to retry)")
+            return "failed"
+
+        try:
+            dest = move_to_processed(path)
+            print(f"[INFO] Moved original to: {dest}")
+        except Exception as e:
+            print(f"[WARN] Could not move original: {e}")
+        self._audit.submit(self._write_audit, mapped, target)
+        return "done"
+
+    def _entry_worker(self):
+        while True:
+            job = self._jobs.claim()
+            with self._frames_lock:
+                cached = self._frames.pop(job["id"], None)
+            state, error = "failed", None
+            try:
+                state = self._enter(job, cached)
+            except Exception as e:
+                error = repr(e)
+                print(f"[ERROR] Express entry failed for {job['name']}: {e}")
+            finally:
+                self._jobs.finish(job["id"], state, error)
+            print(self._jobs.report())
+
+# ---------------------------
+# Rules + automatic company/year/suffix classification
+# ---------------------------
+def load_rules(rules_path: Path = RULES_FILE) -> dict:
+    """
+    Rules table (JSON). Every key is optional:
+        {
+          "min_confidence": 0.8,           # below this the watcher still asks with dialogs
+          "default_suffix": "RR",
+          "default_suffix_confidence": 0.8,
+          "dept_company": {"BKK": "EDS"},  # Dept (via BRANCH_MAP) -> company
+          "rules": [                       # filename globs, first match wins
+            {"match": "*FIX*", "company": "FIX", "year": "2025", "suffix": "RR"}
+          ]
+        }
+    """
+    with Path(rules_path).open("r", encoding="utf-8") as f:
+        rules = json.load(f)
+    if not isinstance(rules.get("rules", []), list):
+        raise ValueError(f"{rules_path}: 'rules' must be a list")
+    return rules
+
+_RULES_CACHE = {"mtime": None, "rules": {}}
+
+def current_rules() -> dict:
+    """RULES_FILE contents, re-read only when the file changes; {} if it does not exist."""
+    try:
+        mtime = RULES_FILE.stat().st_mtime
+    except FileNotFoundError:
+        return {}
+    if _RULES_CACHE["mtime"] != mtime:
+        try:
+            _RULES_CACHE["rules"] = load_rules(RULES_FILE)
+        except Exception as e:
+            print(f"[WARN] Cannot read {RULES_FILE}: {e}")
+            _RULES_CACHE["rules"] = {}
+        _RULES_CACHE["mtime"] = mtime
+    return _RULES_CACHE["rules"]
+
+def match_rule(filename: str, rules) -> dict:
+    """First rule whose 'match' glob fits filename (case-insensitive), else None."""
+    for rule in (rules or {}).get("rules", []):
+        if fnmatch.fnmatch(filename.lower(), str(rule.get("match", "")).lower()):
+            return rule
+    return None
+
+def _pick(candidates):
+    """
+    candidates: [(value, confidence, reason)] -> (value, confidence, reason).
+    Agreeing signals raise confidence a little; conflicting signals make it low.
+    """
+    if not candidates:
+        return None, 0.0, "no signal"
+    best = max(candidates, key=lambda c: c[1])
+    values = {c[0] for c in candidates}
+    reason = "; ".join(c[2] for c in candidates)
+    if len(values) > 1:
+        return best[0], max(0.0, best[1] - 0.5), f"conflict: {reason}"
+    return best[0], min(1.0, best[1] + 0.05 * (len(candidates) - 1)), reason
+
+def _invoice_years(df: pd.DataFrame):
+    """Gregorian years of yyyymmdd Invoice Dates (Buddhist-era converted) and the min/max raw date."""
+    if df is None or "Invoice Date" not in df.columns:
+        return pd.Series([], dtype="int64"), None, None
+    raw = df["Invoice Date"].astype(str).str.strip()
+    raw = raw[raw.str.fullmatch(r"[0-9]{8}")]
+    if raw.empty:
+        return pd.Series([], dtype="int64"), None, None
+    years = raw.str[:4].astype("int64")
+    years = years.where(years < 2400, years - 543)
+    return years, raw.min(), raw.max()
+
+def classify_export(path: Path, df: pd.DataFrame = None, rules: dict = None) -> dict:
+    """
+    Infer company/year/suffix for an export from its filename and content:
+      - filename rules from the rules table, COMPANY-YYYY-SUFFIX style names, EDS/FIX tokens
+      - Ship-to-Branch-Code -> BRANCH_MAP Dept -> rules['dept_company']
+      - Invoice Date range (yyyymmdd, Buddhist-era aware) for the year
+    Returns {"company", "year", "suffix", "confidence", "reasons"}; confidence is the weakest field's.
+    """
+    rules = current_rules() if rules is None else rules
+    path = Path(path)
+    company_c, year_c, suffix_c = [], [], []
+
+    rule = match_rule(path.name, rules)
+    if rule:
+        tag = f"rule {rule.get('match')}"
+        if rule.get("company"):
+            company_c.append((str(rule["company"]).upper(), 0.9, tag))
+        if rule.get("year"):
+            year_c.append((str(rule["year"]), 0.9, tag))
+        if rule.get("suffix"):
+            suffix_c.append((str(rule["suffix"]), 0.9, tag))
+
+    m = re.match(r"^([A-Za-z]+)-(\d{4})-([A-Za-z0-9._-]+)$", path.stem)
+    if m and m.group(1).upper() in KNOWN_COMPANIES:
+        company_c.append((m.group(1).upper(), 0.9, "filename pattern"))
+        year_c.append((m.group(2), 0.9, "filename pattern"))
+        suffix_c.append((m.group(3), 0.9, "filename pattern"))
+    else:
+        tokens = set(re.split(r"[^A-Za-z0-9]+", path.stem.upper()))
+        named = [c for c in KNOWN_COMPANIES if c in tokens]
+        if len(named) == 1:
+            company_c.append((named[0], 0.8, f"filename token {named[0]}"))
+        years_in_name = [t for t in tokens if re.fullmatch(r"(19|20|25)\d{2}", t)]
+        if len(years_in_name) == 1:
+            y = int(years_in_name[0])
+            year_c.append((str(y - 543 if y >= 2400 else y), 0.7, "filename year"))
+
+    dept_company = {str(k).upper(): str(v).upper() for k, v in (rules.get("dept_company") or {}).items()}
+    if df is not None and dept_company and "Ship-to-Branch-Code" in df.columns:
+        depts = df["Ship-to-Branch-Code"].astype(str).str.strip().map(BRANCH_MAP).dropna()
+        companies = depts.map(dept_company).dropna()
+        if not companies.empty:
+            counts = companies.value_counts()
+            share = counts.iloc[0] / len(companies)
+            company_c.append((counts.index[0], 0.9 * share,
+                              f"depts {','.join(sorted(depts.unique()))} ({share:.0%})"))
+
+    years, first, last = _invoice_years(df)
+    if not years.empty:
+        counts = years.value_counts()
+        share = counts.iloc[0] / len(years)
+        year_c.append((str(counts.index[0]), 0.95 if share == 1 else 0.6 * share,
+                       f"invoice dates {first}..{last}"))
+
+    if not suffix_c:
+        suffix_c.append((str(rules.get("default_suffix", "RR")),
+                         float(rules.get("default_suffix_confidence", 0.8)), "default suffix"))
+
+    company, c_conf, c_why = _pick(company_c)
+    year, y_conf, y_why = _pick(year_c)
+    suffix, s_conf, s_why = _pick(suffix_c)
+    return {
+        "company": company, "year": year, "suffix": suffix,
+        "confidence": min(c_conf, y_conf, s_conf),
+        "reasons": {"company": c_why, "year": y_why, "suffix": s_why},
+    }
+
+# Running average of how long the company/year/suffix dialogs keep a file waiting
+_DIALOG_TIMING = {"count": 0, "total": 0.0}
+
+def dialog_seconds_estimate() -> float:
+    if _DIALOG_TIMING["count"]:
+        return _DIALOG_TIMING["total"] / _DIALOG_TIMING["count"]
+    return DIALOG_SECONDS_ESTIMATE
+
+def record_dialog_seconds(seconds: float) -> None:
+    _DIALOG_TIMING["count"] += 1
+    _DIALOG_TIMING["total"] += seconds
+
 # ---------------------------
 # Simple GUI: sequential dialogs (more robust across threads)
 # ---------------------------
-def ask_user_choose_company(default_year=None):
+def ask_user_choose_company(default_year=None, default_company="EDS", default_suffix="RR"):
     """
     Use simpledialog sequentially to collect:
       - company (EDS or FIX)
@@ -253,12 +896,13 @@ def ask_user_choose_company(default_year=None):
 
     # Company
     while True:
-        company = simpledialog.askstring("Company", "Enter company (EDS or FIX):", initialvalue="EDS", parent=root)
+        company = simpledialog.askstring("Company", "Enter company (EDS or FIX):",
+                                          initialvalue=default_company or "EDS", parent=root)
         if company is None:
             root.destroy()
             return None
         company = company.strip().upper()
-        if company in ("EDS", "FIX"):
+        if company in KNOWN_COMPANIES:
             break
         messagebox.showerror("Invalid", "Please enter EDS or FIX.", parent=root)
 
@@ -275,7 +919,8 @@ def ask_user_choose_company(default_year=None):
         messagebox.showerror("Invalid", "Please enter 4-digit year, e.g. 2025", parent=root)
 
     # Suffix
-    suffix = simpledialog.askstring("Suffix", "Enter suffix (e.g. RR):", initialvalue="RR", parent=root)
+    suffix = simpledialog.askstring("Suffix", "Enter suffix (e.g. RR):",
+                                    initialvalue=default_suffix or "RR", parent=root)
     if suffix is None:
         root.destroy()
         return None
@@ -287,12 +932,180 @@ def ask_user_choose_company(default_year=None):
 # ---------------------------
 # Watcher handler
 # ---------------------------
-class ExportHandler(FileSystemEventHandler):
+class QueueMetrics:
+    """Counters for the converter work queue (depth, merged events, wait/service time)."""
+
     def __init__(self):
-        super().__init__()
         self._lock = threading.Lock()
+        self.enqueued = 0
+        self.merged = 0
+        self.done = 0
+        self.max_depth = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.service_total = 0.0
 
-    def _process(self, src_path: str, event_name: str):
+    def on_enqueue(self, depth: int):
+        with self._lock:
+            self.enqueued += 1
+            self.max_depth = max(self.max_depth, depth)
+
+    def on_merge(self):
+        with self._lock:
+            self.merged += 1
+
+    def on_done(self, wait: float, service: float):
+        with self._lock:
+            self.done += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+            self.service_total += service
+
+    def snapshot(self, depth: int) -> dict:
+        with self._lock:
+            n = self.done or 1
+            return {
+                "depth": depth,
+                "max_depth": self.max_depth,
+                "enqueued": self.enqueued,
+                "merged": self.merged,
+                "done": self.done,
+                "wait_avg_s": self.wait_total / n,
+                "wait_max_s": self.wait_max,
+                "service_avg_s": self.service_total / n,
+            }
+
+    def report(self, depth: int) -> str:
+        m = self.snapshot(depth)
+        return (f"[QUEUE] depth={m['depth']} max_depth={m['max_depth']} enqueued={m['enqueued']} "
+                f"merged={m['merged']} done={m['done']} wait_avg={m['wait_avg_s']:.2f}s "
+                f"wait_max={m['wait_max_s']:.2f}s service_avg={m['service_avg_s']:.2f}s")
+
+class ExportHandler(FileSystemEventHandler):
+    """
+    Watchdog events are queued (bounded) and handled by CONVERTER_WORKERS threads, so a
+    burst of exports is converted one after another instead of being skipped while busy.
+    Events for a file that is still waiting in the queue are merged into its job; events
+    for a file that is being converted are merged into one follow-up run, which the same
+    worker does afterwards unless the file was moved away or has not changed since.
+    """
+
+    def __init__(self, workers: int = CONVERTER_WORKERS, max_queue: int = QUEUE_MAX_SIZE,
+                 pipeline: "EntryPipeline" = None):
+        super().__init__()
+        self.pipeline = pipeline              # set: hand frames to Express in-process (no template xlsx)
+        self._queue: "queue.Queue[dict]" = queue.Queue(maxsize=max_queue)
+        self._pending: dict = {}              # key -> job still waiting in the queue
+        self._running: dict = {}              # key -> follow-up job (or None) of a file being converted
+        self._pending_lock = threading.Lock()
+        self._dialog_lock = threading.Lock()  # one set of Tk dialogs at a time
+        self.metrics = QueueMetrics()
+        for i in range(workers):
+            threading.Thread(target=self._worker, name=f"converter-{i + 1}", daemon=True).start()
+
+    def submit(self, src_path: str, event_name: str):
+        path = Path(src_path)
+        key = os.path.normcase(str(path.absolute()))
+        with self._pending_lock:
+            job = self._pending.get(key)
+            if job is not None:
+                job["events"] += 1
+                job["event_name"] = event_name
+                self.metrics.on_merge()
+                print(f"[QUEUE] merged {event_name} event into pending job: {path.name}")
+                return
+            job = {"key": key, "path": src_path, "event_name": event_name,
+                   "events": 1, "enqueued_at": time.monotonic()}
+            if key in self._running:
+                # กำลังแปลงไฟล์นี้อยู่: รวมเป็นรอบถัดไปรอบเดียว (worker เดิมทำต่อ ไม่ให้อีก worker แปลงซ้ำพร้อมกัน)
+                follow_up = self._running[key]
+                if follow_up is None:
+                    self._running[key] = job
+                else:
+                    follow_up["events"] += 1
+                    follow_up["event_name"] = event_name
+                self.metrics.on_merge()
+                print(f"[QUEUE] {path.name} is being converted; {event_name} event kept for one follow-up run")
+                return
+            self._pending[key] = job
+
+        if self._queue.full():
+            print(f"[QUEUE] full ({self._queue.maxsize}); waiting for a free slot: {path.name}")
+        self._queue.put(job)  # blocks the observer thread when full (back-pressure, no lost events)
+        self.metrics.on_enqueue(self._queue.qsize())
+
+    @staticmethod
+    def _signature(path: str):
+        try:
+            st = Path(path).stat()
+        except OSError:
+            return None
+        return (st.st_size, st.st_mtime_ns)
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            with self._pending_lock:
+                self._pending.pop(job["key"], None)
+                self._running[job["key"]] = None
+            try:
+                while job is not None:
+                    job = self._run(job)
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job: dict):
+        """Convert one job; returns its follow-up job when events came in meanwhile and the file changed."""
+        before = self._signature(job["path"])
+        started = time.monotonic()
+        try:
+            self._process(job["path"], job["event_name"], job["enqueued_at"])
+        except Exception as e:
+            print(f"[ERROR] Unexpected failure for {job['path']}: {e}")
+        finally:
+            self.metrics.on_done(started - job["enqueued_at"], time.monotonic() - started)
+            print(self.metrics.report(self._queue.qsize()))
+        with self._pending_lock:
+            follow_up = self._running.pop(job["key"], None)
+            if follow_up is None:
+                return None
+            name = Path(follow_up["path"]).name
+            after = self._signature(follow_up["path"])
+            if after is None:
+                print(f"[SKIP] follow-up run: {name} was already moved")
+                return None
+            if after == before:
+                print(f"[SKIP] follow-up run: {name} has not changed")
+                return None
+            self._running[job["key"]] = None
+        print(f"[QUEUE] follow-up run for {name} ({follow_up['events']} events)")
+        return follow_up
+
+    def _classify(self, path: Path, sample: pd.DataFrame):
+        """Automatic company/year/suffix when confident enough, else the dialogs (pre-filled with the guess)."""
+        rules = current_rules()
+        guess = classify_export(path, sample, rules)
+        threshold = float(rules.get("min_confidence", CLASSIFY_MIN_CONFIDENCE))
+        why = ", ".join(f"{k}: {v}" for k, v in guess["reasons"].items())
+        label = f"{guess['company']}-{guess['year']}-{guess['suffix']}"
+        if guess["company"] in KNOWN_COMPANIES and guess["year"] and guess["confidence"] >= threshold:
+            print(f"[CLASSIFY] {path.name} -> {label} confidence={guess['confidence']:.2f} ({why}); "
+                  f"dialog skipped, saved ~{dialog_seconds_estimate():.1f}s")
+            return {"company": guess["company"], "year": guess["year"], "suffix": guess["suffix"]}
+
+        print(f"[CLASSIFY] {path.name} -> {label} confidence={guess['confidence']:.2f} < {threshold:.2f} "
+              f"({why}); asking user")
+        with self._dialog_lock:
+            started = time.monotonic()
+            choice = ask_user_choose_company(
+                default_year=guess["year"] or datetime.now().year,
+                default_company=guess["company"] if guess["company"] in KNOWN_COMPANIES else "EDS",
+                default_suffix=guess["suffix"] or "RR",
+            )
+            record_dialog_seconds(time.monotonic() - started)
+        return choice
+
+    def _process(self, src_path: str, event_name: str, detected_at: float = None):
         path = Path(src_path)
         if not path.exists():
             return
@@ -308,11 +1121,6 @@ class ExportHandler(FileSystemEventHandler):
             print(f"[SKIP] Not an Excel/HTML file or folder: {path.name}")
             return
 
-        # avoid concurrent processing
-        if not self._lock.acquire(blocking=False):
-            print("[SKIP] Converter busy; skipping event.")
-            return
-
         try:
             print(f"[EVENT:{event_name}] Detected: {path.name}")
             ready = wait_file_ready(path, timeout=30.0)
@@ -320,15 +1128,21 @@ class ExportHandler(FileSystemEventHandler):
                 print(f"[WARN] File not stable/ready: {path}")
                 return
 
-            # Quick try to read a small sample to validate
+            # Parse once to validate; conversion below gets the same frame from the sheet cache.
+            # Large xlsx files are streamed, so only their first chunk is checked here.
             try:
-                df_sample = read_sheet_from_file(path)
+                if use_streaming_read(path):
+                    sample = next(iter_sheet_chunks(path), None)
+                else:
+                    sample = read_sheet_cached(path)
+                if sample is not None:
+                    sample = sample.set_axis([str(c).strip() for c in sample.columns], axis=1)
             except Exception as e:
                 print(f"[ERROR] Failed reading file {path}: {e}")
                 return
 
-            # Prompt user for company/year/suffix (sequential dialogs)
-            choice = ask_user_choose_company(default_year=datetime.now().year)
+            # Classify from filename/content; only ask the user when confidence is low
+            choice = self._classify(path, sample)
             if not choice:
                 print("[INFO] User cancelled conversion.")
                 return
@@ -337,48 +1151,161 @@ class ExportHandler(FileSystemEventHandler):
             year = choice['year']
             suffix_tag = choice['suffix']
 
-            # Convert and write
+            # Convert: pipeline mode hands the frame straight to Express entry (the xlsx is only
+            # written as an audit copy); otherwise write excel_templates/ for src/main.py
             try:
-                out = convert_and_write(path, company, year, suffix_tag)
-                print(f"[DONE] Converted to template: {out}")
+                if self.pipeline is not None:
+                    self.pipeline.submit(path, company, year, suffix_tag, detected_at or time.monotonic())
+                else:
+                    out = convert_and_write(path, company, year, suffix_tag)
+                    print(f"[DONE] Converted to template: {out}")
+                print(_SHEET_CACHE.report())
             except Exception as e:
                 print(f"[ERROR] Conversion failed: {e}")
                 return
 
-            # move original to processed
-            try:
-                dest = INCOMING_PROCESSED / path.name
-                if dest.exists():
-                    ts = datetime.now().strftime("%Y%m%d-%H%M%S")
-                    dest = INCOMING_PROCESSED / f"{path.stem}-{ts}{path.suffix}"
-                shutil.move(str(path), str(dest))
-                print(f"[INFO] Moved original to: {dest}")
-            except Exception as e:
-                print(f"[WARN] Could not move original: {e}")
+            # move original to processed (pipeline mode: EntryPipeline moves it once it was entered)
+            if self.pipeline is None:
+                try:
+                    dest = move_to_processed(path)
+                    print(f"[INFO] Moved original to: {dest}")
+                except Exception as e:
+                    print(f"[WARN] Could not move original: {e}")
 
         finally:
-            self._lock.release()
+            # the frame is only needed for this event; free it even if the user cancelled
+            _SHEET_CACHE.discard(path)
 
     def on_created(self, event):
         if not event.is_directory:
-            self._process(event.src_path, "created")
+            self.submit(event.src_path, "created")
         else:
             # folder created - process folder too
-            self._process(event.src_path, "created")
+            self.submit(event.src_path, "created")
 
     def on_moved(self, event):
         if not event.is_directory:
-            self._process(event.dest_path, "moved")
+            self.submit(event.dest_path, "moved")
         else:
-            self._process(event.dest_path, "moved")
+            self.submit(event.dest_path, "moved")
+
+# ---------------------------
+# Headless batch conversion (no watcher, no dialogs)
+# ---------------------------
+EXPORT_SUFFIXES = (".xls", ".xlsx", ".htm", ".html")
+
+def collect_export_files(inputs) -> list:
+    """Expand files/directories into export paths; a folder holding sheet001.htm counts as one export."""
+    found = []
+    for raw in inputs:
+        p = Path(raw)
+        if p.is_dir():
+            if any((p / n).exists() for n in ("sheet001.htm", "sheet001.html")):
+                found.append(p)
+                continue
+            for child in sorted(p.iterdir()):
+                if child.is_file() and child.suffix.lower() in EXPORT_SUFFIXES:
+                    found.append(child)
+                elif child.is_dir() and child != INCOMING_PROCESSED and any(child.glob("*")):
+                    found.append(child)
+        elif p.is_file():
+            found.append(p)
+        else:
+            print(f"[WARN] Not found, skipped: {p}")
+    return found
+
+def plan_batch(files, company=None, year=None, suffix=None, rules=None) -> list:
+    """
+    Decide company/year/suffix and target template for each file.
+    Files that would land on the same template get '-2', '-3', ... appended to the suffix.
+    Returns [{"path", "company", "year", "suffix", "target", "error"}].
+    """
+    plan, used = [], {}
+    for path in files:
+        choice = {"company": company, "year": year, "suffix": suffix}
+        rule = match_rule(path.name, rules)
+        if rule:
+            choice.update({k: rule[k] for k in ("company", "year", "suffix") if rule.get(k)})
+        item = {"path": path, **choice, "target": None, "error": None}
+        if not choice["company"] or not choice["year"]:
+            item["error"] = "no company/year (pass --company/--year or a matching rule)"
+        else:
+            item["company"] = str(choice["company"]).strip().upper()
+            item["year"] = str(choice["year"]).strip()
+            item["suffix"] = str(choice["suffix"] or "RR").strip()
+            base = (item["company"], item["year"], item["suffix"])
+            n = used[base] = used.get(base, 0) + 1
+            if n > 1:
+                item["suffix"] = f"{item['suffix']}-{n}"
+            item["target"] = template_path(item["company"], item["year"], item["suffix"])
+        plan.append(item)
+    return plan
+
+def _batch_convert_one(path: str, target: str) -> dict:
+    """Process-pool worker: convert one export; never raises."""
+    started = time.perf_counter()
+    try:
+        rows = write_template(Path(path), Path(target))
+        return {"rows": rows, "seconds": time.perf_counter() - started, "error": None}
+    except Exception as e:
+        return {"rows": 0, "seconds": time.perf_counter() - started, "error": str(e)}
+
+def run_batch(inputs, company=None, year=None, suffix=None, rules_path=None,
+              workers=None, move_processed=False) -> int:
+    """Convert many exports in parallel; prints a per-file summary and returns the number of failures."""
+    rules = load_rules(rules_path) if rules_path else None
+    plan = plan_batch(collect_export_files(inputs), company, year, suffix, rules)
+    if not plan:
+        print("[BATCH] No export files found.")
+        return 0
+
+    todo = [item for item in plan if not item["error"]]
+    workers = workers or min(len(todo) or 1, os.cpu_count() or 1)
+    print(f"[BATCH] {len(plan)} file(s), {len(todo)} to convert with {workers} worker process(es)")
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_batch_convert_one, str(item["path"]), str(item["target"])): item for item in todo}
+        for fut in as_completed(futures):
+            item = futures[fut]
+            try:
+                item.update(fut.result())
+            except Exception as e:  # worker process died
+                item.update({"rows": 0, "seconds": 0.0, "error": str(e)})
+            status = "FAIL" if item["error"] else "OK"
+            print(f"[BATCH:{status}] {item['path'].name} -> {item['target'].name} ({item['seconds']:.2f}s)")
+    wall = time.perf_counter() - started
+
+    if move_processed:
+        for item in todo:
+            if not item["error"]:
+                try:
+                    move_to_processed(item["path"])
+                except Exception as e:
+                    print(f"[WARN] Could not move original {item['path'].name}: {e}")
+
+    # summary
+    print()
+    print(f"{'status':<6} | {'rows':>7} | {'seconds':>7} | {'input':<40} | output / error")
+    print("-" * 100)
+    for item in plan:
+        status = "FAIL" if item["error"] else "OK"
+        detail = item["error"] or str(item["target"].name)
+        print(f"{status:<6} | {item.get('rows', 0):>7} | {item.get('seconds', 0.0):>7.2f} | "
+              f"{item['path'].name[:40]:<40} | {detail}")
+    failures = sum(1 for item in plan if item["error"])
+    busy = sum(item.get("seconds", 0.0) for item in todo)
+    print(f"[BATCH] done: {len(plan) - failures} ok, {failures} failed, wall {wall:.2f}s "
+          f"(sum of per-file {busy:.2f}s)")
+    return failures
 
 # ---------------------------
 # Main runner
 # ---------------------------
-def main():
-    print(f"[WATCHING] {INCOMING}")
+def watch(pipeline: bool = False):
+    print(f"[WATCHING] {INCOMING}" + (" (pipeline: straight to Express entry)" if pipeline else ""))
     observer = Observer()
-    handler = ExportHandler()
+    handler = ExportHandler(pipeline=EntryPipeline() if pipeline else None)
     observer.schedule(handler, str(INCOMING), recursive=False)
     observer.start()
     try:
@@ -389,5 +1316,29 @@ def main():
         observer.stop()
     observer.join()
 
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Convert supplier exports into Express templates")
+    sub = ap.add_subparsers(dest="command")
+    wp = sub.add_parser("watch", help="watch incoming_exports/ and ask for company/year/suffix (default)")
+    wp.add_argument("--pipeline", action="store_true",
+                    help="enter converted data into Express in this process; the template xlsx is only "
+                         "written to excel_templates/processed/ as an audit copy")
+    bp = sub.add_parser("batch", help="convert files/folders without dialogs, in parallel")
+    bp.add_argument("inputs", nargs="+", help="export files or directories")
+    bp.add_argument("--company", help="EDS or FIX")
+    bp.add_argument("--year", help="YYYY")
+    bp.add_argument("--suffix", default=None, help="template suffix (default RR)")
+    bp.add_argument("--rules", type=Path, help="JSON rules file choosing company/year/suffix per filename "
+                                               "(same format as converter.rules.json)")
+    bp.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    bp.add_argument("--move-processed", action="store_true", help="move originals to incoming_exports/processed")
+    args = ap.parse_args(argv)
+
+    if args.command == "batch":
+        failures = run_batch(args.inputs, args.company, args.year, args.suffix, args.rules,
+                             args.workers, args.move_processed)
+        sys.exit(1 if failures else 0)
+    watch(pipeline=getattr(args, "pipeline", False))
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
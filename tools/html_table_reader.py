@@ -0,0 +1,285 @@
+"""
+tools/html_table_reader.py
+
+Incremental reader for HTML-disguised Excel exports (sheet001.htm, or .xls files that are
+really HTML). Only the first <table> is parsed: the file is decoded in blocks, scanned with
+a regex tokenizer (tags, comments, text) and reading stops at that table's closing tag, so
+the rest of the document is never decoded or turned into a DOM.
+
+The resulting frame matches pd.read_html(path, header=0)[0]:
+  - cell text like lxml's text_content(), <br> as a line break, then read_html's
+    whitespace clean-up (strip, collapse newlines / runs of whitespace)
+  - colspan / rowspan expanded the same way, short rows padded with ""
+  - elements styled display:none are dropped (displayed_only=True)
+  - first row is the header; values typed by the same TextParser (thousands=",")
+Known difference: <tfoot> rows stay in document order instead of being moved to the end.
+"""
+
+import codecs
+import html
+import re
+from pathlib import Path
+
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+READ_BLOCK_BYTES = 256 * 1024
+
+# same clean-up as pandas.io.html._remove_whitespace
+_RE_WHITESPACE = re.compile(r"[\r\n]+|\s{2,}")
+_RE_HIDDEN = re.compile(r"display:\s*none")
+# comment / <!doctype> / <?xml?> | <script>/<style> with its raw body (groups 1-2)
+# | start or end tag (group 3 "/", 4 name, 5 attributes)
+_RE_TOKEN = re.compile(
+    r"<!--.*?-->|<[!?][^>]*>"
+    r"|<(script|style)\b[^>]*>(.*?)</\1\s*>"
+    r"|<(/?)([A-Za-z][A-Za-z0-9]*)((?:[^>\"']|\"[^\"]*\"|'[^']*')*)>",
+    re.S | re.I,
+)
+# a whole plain row: <tr>, then <td>/<th> without attributes holding only text (no tags, no entities)
+_RE_PLAIN_ROW = re.compile(r"\s*<tr>((?:\s*<t([dh])>[^<&]*</t\2>)*)\s*</tr>", re.I)
+_RE_PLAIN_CELL = re.compile(r"<t[dh]>([^<]*)</t[dh]>", re.I)
+_RE_ATTR = re.compile(r"""([^\s=/>"']+)(?:\s*=\s*("[^"]*"|'[^']*'|[^\s>]+))?""")
+_RE_CHARSET = re.compile(rb"""charset\s*=\s*["']?([A-Za-z0-9_\-:.]+)""", re.IGNORECASE)
+
+# charset labels browsers/Excel use that Python's codecs don't know (Thai Excel exports: windows-874)
+_CHARSET_ALIASES = {"windows-874": "cp874", "x-windows-874": "cp874"}
+
+# elements that never have a closing tag (must not open a hidden scope)
+_VOID = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param",
+         "source", "track", "wbr"}
+
+
+def _remove_whitespace(s: str) -> str:
+    return _RE_WHITESPACE.sub(" ", s.strip())
+
+
+def _span(attrs: dict, name: str) -> int:
+    try:
+        return max(1, int(attrs.get(name) or 1))
+    except ValueError:
+        return 1
+
+
+class _FirstTableScanner:
+    """
+    Collects expanded row texts of the first top-level <table>; sets .done at its end.
+
+    A regex tokenizer instead of html.parser: only tag names and three attributes
+    (style, rowspan, colspan) matter here, and the per-tag Python overhead of
+    HTMLParser was slower than pd.read_html's C parser.
+    """
+
+    def __init__(self):
+        self.rows = []
+        self.done = False
+        self._depth = 0          # <table> nesting, 1 = the table we read
+        self._hidden = 0         # >0 while inside a display:none element
+        self._hidden_tags = []   # tag names that opened a hidden scope
+        self._row = None         # [(text, rowspan, colspan)] for the current <tr>
+        self._cell = None        # text parts of the current <td>/<th>
+        self._cell_spans = (1, 1)
+        self._remainder = []     # rowspan carry-over: (col index, text, rows left)
+
+    # ---- rows / cells ----
+    def _close_cell(self):
+        if self._cell is not None and self._row is not None:
+            text = "".join(self._cell)
+            if "&" in text:
+                text = html.unescape(text)
+            self._row.append((_remove_whitespace(text),) + self._cell_spans)
+        self._cell = None
+
+    def _close_row(self):
+        self._close_cell()
+        if self._row is not None:
+            self.rows.append(self._expand(self._row))
+        self._row = None
+
+    def _expand(self, cells):
+        """colspan/rowspan expansion (pandas.io.html._HtmlFrameParser._expand_colspan_rowspan)."""
+        remainder = self._remainder
+        if not remainder and all(r == 1 and c == 1 for _, r, c in cells):
+            return [text for text, _, _ in cells]
+        texts, next_remainder, index = [], [], 0
+        for text, rowspan, colspan in cells:
+            while remainder and remainder[0][0] <= index:
+                _, prev_text, prev_rowspan = remainder.pop(0)
+                texts.append(prev_text)
+                if prev_rowspan > 1:
+                    next_remainder.append((len(texts) - 1, prev_text, prev_rowspan - 1))
+                index += 1
+            for _ in range(colspan):
+                texts.append(text)
+                if rowspan > 1:
+                    next_remainder.append((len(texts) - 1, text, rowspan - 1))
+                index += 1
+        for _, prev_text, prev_rowspan in remainder:
+            texts.append(prev_text)
+            if prev_rowspan > 1:
+                next_remainder.append((len(texts) - 1, prev_text, prev_rowspan - 1))
+        self._remainder = next_remainder
+        return texts
+
+    def _finish(self):
+        self._close_row()
+        # rows still owed by rowspans after the last <tr>
+        while self._remainder:
+            self._row = []
+            self._close_row()
+        self.done = True
+
+    # ---- tokens ----
+    def _data(self, data):
+        if self._cell is not None and not self._hidden:
+            self._cell.append(data)
+
+    def _start(self, tag, attr_text):
+        attrs = _attrs(attr_text) if attr_text and ("style" in attr_text or "span" in attr_text) else {}
+        if self._hidden or _RE_HIDDEN.search(attrs.get("style") or ""):
+            if tag not in _VOID:
+                self._hidden += 1
+                self._hidden_tags.append(tag)
+            return
+        if tag == "table":
+            self._depth += 1
+            return
+        if self._depth != 1:
+            if tag == "br" and self._cell is not None:
+                self._cell.append("\n")
+            return
+        if tag == "tr":
+            self._close_row()
+            self._row = []
+        elif tag in ("td", "th"):
+            self._close_cell()
+            if self._row is None:
+                self._row = []
+            self._cell = []
+            self._cell_spans = (_span(attrs, "rowspan"), _span(attrs, "colspan"))
+        elif tag == "br" and self._cell is not None:
+            self._cell.append("\n")
+
+    def _end(self, tag):
+        if self._hidden:
+            if tag == self._hidden_tags[-1]:
+                self._hidden_tags.pop()
+                self._hidden -= 1
+            return
+        if tag == "table":
+            self._depth -= 1
+            if self._depth == 0:
+                self._finish()
+            return
+        if self._depth != 1:
+            return
+        if tag in ("td", "th"):
+            self._close_cell()
+        elif tag == "tr":
+            self._close_row()
+
+    def feed(self, text: str, final: bool = False) -> str:
+        """Scan the complete tokens of `text`; returns the unscanned tail to prepend to the next block."""
+        end = len(text)
+        if not final:
+            # never scan a tag or comment cut off at the block boundary
+            end = text.rfind("<")
+            if end < 0:
+                end = 0
+            comment = text.rfind("<!--", 0, end + 1)
+            if comment >= 0 and text.find("-->", comment) < 0:
+                end = comment
+        pos = 0
+        while True:
+            if self._depth == 1 and self._row is None and not self._hidden and not self._remainder:
+                # fast path: plain rows are split with two regexes instead of token by token
+                m = _RE_PLAIN_ROW.match(text, pos, end)
+                if m is not None:
+                    self.rows.append([_remove_whitespace(c) for c in _RE_PLAIN_CELL.findall(m.group(1))])
+                    pos = m.end()
+                    continue
+            m = _RE_TOKEN.search(text, pos, end)
+            if m is None:
+                break
+            start = m.start()
+            if start > pos and self._cell is not None:
+                self._data(text[pos:start])
+            pos = m.end()
+            name = m.group(4)
+            if name is not None:
+                if m.group(3):
+                    self._end(name.lower())
+                else:
+                    self._start(name.lower(), m.group(5))
+            elif m.group(1):
+                # <script>/<style>: the body is text, not markup
+                self._start(m.group(1).lower(), "")
+                if m.group(2):
+                    self._data(m.group(2))
+                self._end(m.group(1).lower())
+            if self.done:
+                return ""
+        if final:
+            if pos < len(text):
+                self._data(text[pos:])
+            return ""
+        return text[pos:]
+
+
+def _attrs(attr_text: str) -> dict:
+    """Attribute dict like HTMLParser gives it (lower-case names, unquoted + unescaped values)."""
+    attrs = {}
+    for name, value in _RE_ATTR.findall(attr_text):
+        if value[:1] in ("'", '"'):
+            value = value[1:-1]
+        attrs[name.lower()] = html.unescape(value) if "&" in value else value
+    return attrs
+
+
+def _sniff_encoding(head: bytes, default: str = "utf-8") -> str:
+    for bom, enc in ((codecs.BOM_UTF8, "utf-8-sig"), (codecs.BOM_UTF16_LE, "utf-16"), (codecs.BOM_UTF16_BE, "utf-16")):
+        if head.startswith(bom):
+            return enc
+    m = _RE_CHARSET.search(head)
+    if m:
+        name = m.group(1).decode("ascii", "ignore").lower()
+        name = _CHARSET_ALIASES.get(name, name)
+        try:
+            return codecs.lookup(name).name
+        except LookupError:
+            pass
+    return default
+
+
+def iter_first_table_rows(path: Path, block_bytes: int = READ_BLOCK_BYTES):
+    """Yield expanded text rows of the first table as they are parsed."""
+    scanner = _FirstTableScanner()
+    with Path(path).open("rb") as f:
+        head = f.read(max(block_bytes, 4096))
+        decoder = codecs.getincrementaldecoder(_sniff_encoding(head[:4096]))(errors="replace")
+        block, tail = head, ""
+        while block and not scanner.done:
+            tail = scanner.feed(tail + decoder.decode(block))
+            yield from scanner.rows
+            scanner.rows.clear()
+            block = f.read(block_bytes)
+        if not scanner.done:
+            scanner.feed(tail + decoder.decode(b"", final=True), final=True)
+            if scanner._depth:
+                scanner._finish()
+            yield from scanner.rows
+            scanner.rows.clear()
+
+def read_first_html_table(path: Path) -> pd.DataFrame:
+    """Fast equivalent of pd.read_html(path, header=0)[0]; raises ValueError if there is no table."""
+    rows = list(iter_first_table_rows(path))
+    if not rows:
+        raise ValueError("No tables found in HTML")
+    width = max(len(r) for r in rows)
+    for r in rows:
+        if len(r) < width:
+            r.extend([""] * (width - len(r)))
+    with TextParser(rows, header=0, index_col=None, skiprows=None, parse_dates=False,
+                    thousands=",", decimal=".", converters=None, na_values=None,
+                    keep_default_na=True) as tp:
+        return tp.read()